@@ -0,0 +1,126 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+"""
+Benchmark of branch decomposition of the family graph
+
+Compares Forest, which FamilyGraph._create uses to find the branching, its
+removed edges, the graph components and a graph per branch, against the
+networkx pipeline it replaced: a DiGraph, maximum_branching, copying node
+data, diffing edge sets, weakly connected components of the graph and
+component subgraphs of the branching. Both run on the vertex graph of
+synthetic pedigrees, without parsing GEDCOM, and must find branchings with
+the same number of edges and trees.
+
+Usage: python benchmarks/bench_forest.py [--sizes 1000 10000 100000] [--repeat 3] [--json out.json]
+"""
+
+import argparse, json, logging, os, sys, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import networkx as nx
+from genoplot.forest import Forest
+from genoplot.synthetic import SyntheticPedigree
+logger = logging.getLogger("genoplot")
+
+
+def networkx_branches(vertices, children):
+    """Returns branching edge count and branch graphs from the networkx pipeline"""
+    graph = nx.DiGraph()
+    for vid in vertices:
+        graph.add_node(vid, el=vid)
+    for vid in vertices:
+        graph.add_edges_from((vid, child) for child in children[vid])
+    branched = nx.maximum_branching(graph)
+    for v, d in graph.nodes(data=True):
+        branched.add_node(v, **d)
+    removed_edges = set(graph.edges()) - set(branched.edges())
+    components = {}
+    for i, component in enumerate(nx.weakly_connected_components(graph)):
+        for vid in component:
+            components[vid] = i
+    branches = [branched.subgraph(component) for component in nx.weakly_connected_components(branched)]
+    return graph.number_of_edges() - len(removed_edges), branches
+
+
+def forest_branches(vertices, children):
+    """Returns branching edge count and branch graphs as FamilyGraph._create builds them"""
+    forest = Forest(vertices, children)
+    components = forest.components()
+    branches = []
+    for tree in forest.trees():
+        graph = nx.DiGraph()
+        for vid in tree:
+            graph.add_node(vid, el=vid)
+        for vid in tree:
+            graph.add_edges_from((vid, child) for child in forest.children[vid])
+        branches.append(graph)
+    return len(forest.parent), branches
+
+
+def best_time(function, args, repeat):
+    """Returns result and best time in seconds of function over repeat runs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def bench_size(size, args):
+    """Returns vertex and edge counts and time of each pipeline on synthetic pedigree of specified size"""
+    pedigree = SyntheticPedigree(individuals=size, fanout=args.fanout, remarriage_rate=args.remarriage_rate,
+                                    collapse_rate=args.collapse_rate, branches=max(1, size // args.branch_size), seed=args.seed)
+    vertices, children = pedigree.vertex_graph()
+    (nx_edges, nx_branches), nx_seconds = best_time(networkx_branches, (vertices, children), args.repeat)
+    (forest_edges, forest_trees), forest_seconds = best_time(forest_branches, (vertices, children), args.repeat)
+    if nx_edges != forest_edges or len(nx_branches) != len(forest_trees):
+        raise Exception("Branchings differ: networkx has {0} edges in {1} branches, forest {2} edges in {3} branches".format(
+                        nx_edges, len(nx_branches), forest_edges, len(forest_trees)))
+    return {
+        "vertices": len(vertices),
+        "edges": sum(len(c) for c in children.values()),
+        "branches": len(forest_trees),
+        "networkx_seconds": nx_seconds,
+        "forest_seconds": forest_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--fanout", type=float, default=3)
+    parser.add_argument("--remarriage-rate", type=float, default=0.1)
+    parser.add_argument("--collapse-rate", type=float, default=0.05)
+    parser.add_argument("--branch-size", type=int, default=2000, help="Individuals per disconnected branch")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Write results to JSON file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logger.setLevel(logging.WARNING)
+
+    results = {}
+    print("{0:>8} {1:>10} {2:>10} {3:>9} {4:>14} {5:>12} {6:>8}".format(
+            "size", "vertices", "edges", "branches", "networkx (s)", "forest (s)", "speedup"))
+    for size in args.sizes:
+        result = bench_size(size, args)
+        results[str(size)] = result
+        print("{0:>8} {1:>10} {2:>10} {3:>9} {4:>14.3f} {5:>12.3f} {6:>7.1f}x".format(
+                size, result["vertices"], result["edges"], result["branches"], result["networkx_seconds"],
+                result["forest_seconds"], result["networkx_seconds"] / max(result["forest_seconds"], 1e-9)))
+
+    if not args.json is None:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+"""
+Benchmark of genoplot import time
+
+Imports each genoplot module in a fresh interpreter and records the best
+wall time over several runs, and which heavy dependencies (networkx,
+svgwrite, dateparser, gedcom, coloredlogs) the import loaded. Results can
+be saved as JSON and compared against a previous run to catch regressions.
+
+Usage: python benchmarks/bench_import.py [--modules genoplot genoplot.genoplot] [--repeat 5] [--json out.json] [--compare base.json]
+"""
+
+import argparse, json, os, subprocess, sys
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+MODULES = ("genoplot", "genoplot.genoplot", "genoplot.pedigree", "genoplot.familygraph")
+HEAVY = ("networkx", "svgwrite", "dateparser", "gedcom", "coloredlogs")
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def bench_module(module, repeat):
+    """Returns best import time of module in a fresh interpreter and heavy dependencies it loaded, or None if it fails"""
+    best = None
+    for i in range(repeat):
+        probe = PROBE.format(module=module, heavy=HEAVY)
+        result = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                universal_newlines=True)
+        if result.returncode != 0:
+            print("Import of {0} failed: {1}".format(module, result.stderr.strip().splitlines()[-1]), file=sys.stderr)
+            return None
+        run = json.loads(result.stdout)
+        if best is None or run["seconds"] < best["seconds"]:
+            best = run
+    return best
+
+
+def compare(results, baseline, tolerance):
+    """Returns list of modules slower to import than baseline by more than tolerance"""
+    regressions = []
+    for module, result in results.items():
+        base = baseline.get(module)
+        if base is None or result is None:
+            continue
+        if result["seconds"] > base["seconds"] * (1 + tolerance):
+            regressions.append((module, base["seconds"], result["seconds"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=list(MODULES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Write results to JSON file")
+    parser.add_argument("--compare", help="Compare against results JSON file from a previous run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown against --compare")
+    args = parser.parse_args()
+
+    results = {}
+    print("{0:<24} {1:>10}  {2}".format("module", "time (ms)", "heavy dependencies loaded"))
+    for module in args.modules:
+        result = bench_module(module, args.repeat)
+        results[module] = result
+        if result is None:
+            print("{0:<24} {1:>10}".format(module, "failed"))
+        else:
+            print("{0:<24} {1:>10.1f}  {2}".format(module, result["seconds"]*1000, ", ".join(result["loaded"]) or "-"))
+
+    if not args.json is None:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if not args.compare is None:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for module, before, after in regressions:
+            print("Regression: import of {0}: {1:.1f}ms -> {2:.1f}ms".format(module, before*1000, after*1000))
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+"""
+Benchmark of the GenoPlot pipeline on synthetic pedigrees
+
+Records wall time and peak traced memory of each phase: Pedigree (GEDCOM
+parsing), FamilyGraph._create, FamilyGraph._layout and GenoPlot.draw. The
+draw phase includes the graph phases, which it runs. Results can be saved
+as JSON and compared against a previous run to catch regressions.
+
+Usage: python benchmarks/bench_pipeline.py [--sizes 1000 10000 100000] [--json out.json] [--compare base.json]
+"""
+
+import argparse, json, logging, os, sys, tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from genoplot.genoplot import GenoPlot
+from genoplot.profiling import profiling
+from genoplot.synthetic import generate_gedcom
+logger = logging.getLogger("genoplot")
+
+PHASES = ("Pedigree", "FamilyGraph._create", "FamilyGraph._layout", "GenoPlot.draw")
+# Allowed difference between requested and generated number of individuals
+SIZE_TOLERANCE = 0.01
+
+
+def bench_size(size, args):
+    """Runs pipeline on synthetic pedigree of specified size and returns time and peak memory of each phase"""
+    with tempfile.TemporaryDirectory() as tmp:
+        gedcom_file = os.path.join(tmp, "synthetic.ged")
+        generate_gedcom(gedcom_file, individuals=size, fanout=args.fanout, remarriage_rate=args.remarriage_rate,
+                        collapse_rate=args.collapse_rate, branches=max(1, size // args.branch_size), seed=args.seed)
+
+        with profiling(trace_memory=not args.no_memory) as profiler:
+            with profiler.span("Pedigree"):
+                plot = GenoPlot("synthetic", gedcom_file, output_file=os.path.join(tmp, "synthetic.svg"))
+            # Timings are only comparable between runs if the pedigree has the requested size
+            individuals = len(plot._pedigree)
+            if abs(individuals - size) > size * SIZE_TOLERANCE:
+                raise Exception("Synthetic pedigree has {0} individuals, {1} were requested".format(individuals, size))
+            plot.draw()
+
+    report = profiler.report(plot)
+    return {name: {"seconds": report.phase(name)["seconds"], "peak_bytes": report.phase(name)["peak_bytes"]} for name in PHASES}
+
+
+def compare(results, baseline, tolerance):
+    """Returns list of phases slower than baseline by more than tolerance"""
+    regressions = []
+    for size, phases in results.items():
+        for name, result in phases.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                continue
+            if result["seconds"] > base["seconds"] * (1 + tolerance):
+                regressions.append((size, name, base["seconds"], result["seconds"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--fanout", type=float, default=3)
+    parser.add_argument("--remarriage-rate", type=float, default=0.1)
+    parser.add_argument("--collapse-rate", type=float, default=0.05)
+    parser.add_argument("--branch-size", type=int, default=2000, help="Individuals per disconnected branch")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true", help="Do not trace memory (faster)")
+    parser.add_argument("--json", help="Write results to JSON file")
+    parser.add_argument("--compare", help="Compare against results JSON file from a previous run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown against --compare")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logger.setLevel(logging.WARNING)
+
+    results = {}
+    print("{0:>8} {1:<22} {2:>12} {3:>12}".format("size", "phase", "time (s)", "peak (MB)"))
+    for size in args.sizes:
+        results[str(size)] = bench_size(size, args)
+        for name in PHASES:
+            result = results[str(size)][name]
+            peak = "-" if result["peak_bytes"] is None else "{0:.1f}".format(result["peak_bytes"] / 2**20)
+            print("{0:>8} {1:<22} {2:>12.3f} {3:>12}".format(size, name, result["seconds"], peak))
+
+    if not args.json is None:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if not args.compare is None:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for size, name, before, after in regressions:
+            print("Regression: {0} at size {1}: {2:.3f}s -> {3:.3f}s".format(name, size, before, after))
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+"""
+Benchmark of Branch._sort_children on wide sibships
+
+Each child of the root family is married, so every sort key resolves a
+family-to-family link and checks consanguinity of up to four parent pairs.
+
+Usage: python benchmarks/bench_sort_children.py [--widths 100 1000 5000] [--repeat 5]
+"""
+
+import argparse, logging, os, sys, tempfile, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from genoplot.pedigree import Pedigree
+from genoplot.familygraph import FamilyGraph
+from genoplot.vertex import family_vertex
+logger = logging.getLogger("genoplot")
+
+
+def write_sibship_gedcom(path, width):
+    """Writes GEDCOM with a single couple having specified number of married children"""
+    lines = ["0 HEAD", "1 CHAR UTF-8"]
+    children = []
+    families = []
+    lines.extend(["0 @P1@ INDI", "1 NAME Root /Father/", "1 SEX M", "1 FAMS @F1@"])
+    lines.extend(["0 @P2@ INDI", "1 NAME Root /Mother/", "1 SEX F", "1 FAMS @F1@"])
+    pid = 3
+    for i in range(width):
+        child, spouse, fid = pid, pid + 1, i + 2
+        pid += 2
+        children.append(child)
+        families.append((fid, child, spouse))
+        lines.extend(["0 @P{0}@ INDI".format(child), "1 NAME Child{0} /Father/".format(i), "1 SEX M",
+                      "1 BIRT", "2 DATE {0}".format(1900 + i % 50), "2 PLAC Here",
+                      "1 FAMC @F1@", "1 FAMS @F{0}@".format(fid)])
+        lines.extend(["0 @P{0}@ INDI".format(spouse), "1 NAME Spouse{0} /Other/".format(i), "1 SEX F",
+                      "1 FAMS @F{0}@".format(fid)])
+    lines.extend(["0 @F1@ FAM", "1 HUSB @P1@", "1 WIFE @P2@"])
+    lines.extend("1 CHIL @P{0}@".format(child) for child in children)
+    for fid, husband, wife in families:
+        lines.extend(["0 @F{0}@ FAM".format(fid), "1 HUSB @P{0}@".format(husband), "1 WIFE @P{0}@".format(wife)])
+    lines.append("0 TRLR")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def bench_width(width, repeat):
+    """Returns best time in seconds to sort children of root family of specified width"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sibship.ged")
+        write_sibship_gedcom(path, width)
+        pedigree = Pedigree("sibship", path)
+        graph = FamilyGraph(pedigree, font_size=10)
+
+    root = family_vertex(1)
+    branch = next(b for b in graph._branches if root in b)
+    children = list(branch._graph.edge[root].keys())
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sorted(children, key=branch._sort_children)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(children), best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--widths", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logger.setLevel(logging.WARNING)
+
+    print("{0:>10} {1:>10} {2:>12} {3:>14}".format("width", "children", "sort (ms)", "per key (us)"))
+    for width in args.widths:
+        n, best = bench_width(width, args.repeat)
+        print("{0:>10} {1:>10} {2:>12.3f} {3:>14.3f}".format(width, n, best*1e3, best*1e6/max(n, 1)))
+
+
+if __name__ == "__main__":
+    main()
@@ -21,28 +21,66 @@ __copyright__ = """
 __author__ = "David D. Newell <david@newell.at>"
 
 import logging, time
-import networkx as nx
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger("genoplot")
-import coloredlogs
-coloredlogs.install(level="INFO")
+# Logging is configured by applications, or by setup_logging()
+logger.addHandler(logging.NullHandler())
 
-from .genoplot import GenoPlot
+# Public names and the modules that define them; modules are imported on first access
+_LAZY_ATTRIBUTES = {
+    "GenoPlot": ".genoplot",
+}
 
-def main():
-    pstart = time.time()
-    # p = GenoPlot("sample", "sample.ged")
-    # p.create_graph()
-    # g = p.create_grandalf()
-    p.draw()
 
-    logger.info("Total time to build GenoPlot: %.2fs", time.time() - pstart)
-    logger.info("Total time to process: %.2fs", time.time() - pstart)
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        import importlib
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
 
-    return p
 
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
 
 
-# Test code
+def setup_logging(level="INFO"):
+    """Installs coloured log output for the genoplot logger
 
-# import genoplot; import networkx as nx; p = genoplot.main()
+    :param level: Log level
+    :type level: str
+    """
+    import coloredlogs
+    coloredlogs.install(level=level, logger=logger)
+
+
+def main(argv=None):
+    """Renders plots of the jobs in a batch manifest and returns exit status, 1 if any job failed
+
+    :param argv: Command line arguments; sys.argv if not specified
+    :type argv: list
+    """
+    import argparse
+    from . import batch
+    parser = argparse.ArgumentParser(prog="genoplot", description="Renders pedigree plots of the jobs in a batch manifest")
+    parser.add_argument("manifest", help="JSON manifest of jobs: GEDCOM file, proband, options and output of each plot")
+    parser.add_argument("--workers", type=int, help="Number of worker processes; number of CPUs if not specified")
+    parser.add_argument("--cache-dir", help="Directory of processed pedigree cache shared by jobs; a temporary directory if not specified")
+    parser.add_argument("--max-memory", type=int, help="Address space limit of each worker process in MB")
+    parser.add_argument("--max-jobs-per-worker", type=int, help="Jobs a worker process runs before it is replaced")
+    parser.add_argument("--report", help="Write result of each job as JSON to file")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+
+    setup_logging(args.log_level)
+    start = time.time()
+    report = batch.run_batch(batch.load_manifest(args.manifest),
+                                workers=args.workers,
+                                cache_dir=args.cache_dir,
+                                memory_limit=args.max_memory*2**20 if not args.max_memory is None else None,
+                                max_jobs_per_worker=args.max_jobs_per_worker)
+    print(report)
+    if not args.report is None:
+        report.save(args.report)
+    logger.info("Total time to process batch: %.2fs", time.time() - start)
+    return 0 if len(report.failures()) == 0 else 1
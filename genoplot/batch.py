@@ -0,0 +1,299 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+"""
+Batch rendering of plots listed in a manifest
+
+A manifest is a JSON list of jobs, or an object with a list of "jobs" and
+"defaults" for their options:
+
+    {
+        "defaults": {"generations": 3, "packing": "row"},
+        "jobs": [
+            {"gedcom": "smith.ged", "proband": 12, "output": "charts/smith_12.svg"},
+            {"gedcom": "smith.ged", "proband": 40, "options": {"direction": "ancestors"}},
+            {"gedcom": "jones.ged", "name": "Jones family"}
+        ]
+    }
+
+Options are GenoPlot parameters. Relative paths are relative to the manifest,
+and output defaults to the job name, which defaults to the GEDCOM file name
+and proband. As in GenoPlot, ".svg" is appended to output paths without it
+unless the job is tiled.
+
+Each GEDCOM is parsed once, into the processed pedigree cache, before jobs
+are run on a process pool; jobs then load the memory-mapped pedigree instead
+of parsing. A job which fails is reported and the batch goes on.
+"""
+
+import logging, concurrent.futures, io, json, os, tempfile, time, traceback
+from concurrent.futures.process import BrokenProcessPool
+from . import cache
+logger = logging.getLogger("genoplot")
+
+
+def load_manifest(manifest):
+    """Returns jobs of batch manifest
+
+    :param manifest: Manifest file path or file-like object
+    :type manifest: str
+    """
+    if hasattr(manifest, "read"):
+        data = json.load(manifest)
+        base = os.getcwd()
+    else:
+        with io.open(manifest, mode="r", encoding="utf-8") as f:
+            data = json.load(f)
+        base = os.path.dirname(os.path.abspath(manifest))
+    if type(data) is list:
+        data = {"jobs": data}
+
+    defaults = data.get("defaults", {})
+    jobs = []
+    outputs = {}
+    for i, entry in enumerate(data.get("jobs", [])):
+        if not "gedcom" in entry:
+            raise Exception("Job {0} of manifest has no GEDCOM file".format(i))
+        gedcom_file = os.path.join(base, entry["gedcom"])
+        proband = entry.get("proband")
+        name = entry.get("name")
+        if name is None:
+            name = os.path.splitext(os.path.basename(gedcom_file))[0]
+            if not proband is None:
+                name = "{0}_{1}".format(name, proband)
+        options = dict(defaults)
+        options.update(entry.get("options", {}))
+        output = os.path.join(base, entry.get("output", name))
+        # As GenoPlot does, so that the result reports the file which is written
+        if options.get("tile_size") is None and ".svg" not in output:
+            output += ".svg"
+        if output in outputs:
+            raise Exception("Jobs {0} and {1} of manifest have the same output: {2}".format(outputs[output], i, output))
+        outputs[output] = i
+        jobs.append({
+            "index": i,
+            "name": name,
+            "gedcom": gedcom_file,
+            "proband": proband,
+            "output": output,
+            "options": options,
+        })
+    return jobs
+
+
+def prepare_pedigrees(jobs, cache_dir):
+    """Parses GEDCOM file of each job into the pedigree cache, once per file, and returns error of each file which could not be parsed
+
+    :param jobs: Jobs from load_manifest()
+    :type jobs: list
+    :param cache_dir: Pedigree cache directory
+    :type cache_dir: str
+    """
+    errors = {}
+    for gedcom_file in sorted(set(job["gedcom"] for job in jobs)):
+        try:
+            cache.cached_pedigree(gedcom_file, cache_dir)
+        except Exception as e:
+            errors[gedcom_file] = "{0}: {1}".format(type(e).__name__, e)
+            logger.error("Could not parse GEDCOM '%s': %s", gedcom_file, errors[gedcom_file])
+    return errors
+
+
+def _job_result(job, status, seconds=None, individuals=None, error=None):
+    return {
+        "index": job["index"],
+        "name": job["name"],
+        "gedcom": job["gedcom"],
+        "proband": job["proband"],
+        "output": job["output"],
+        "status": status,
+        "seconds": seconds,
+        "individuals": individuals,
+        "error": error,
+    }
+
+
+def run_job(job, cache_dir=None):
+    """Renders plot of job and returns its result; errors are returned in the result rather than raised
+
+    :param job: Job from load_manifest()
+    :type job: dict
+    :param cache_dir: Pedigree cache directory
+    :type cache_dir: str
+    """
+    from .genoplot import GenoPlot
+    start = time.perf_counter()
+    try:
+        plot = GenoPlot(job["name"], job["gedcom"], output_file=job["output"], proband=job["proband"],
+                        cache_dir=cache_dir, **job["options"])
+        # Outputs may be in subdirectories of the manifest directory which do not exist yet
+        os.makedirs(os.path.dirname(job["output"]), exist_ok=True)
+        plot.draw()
+        individuals = len(plot.scene())
+    except Exception as e:
+        logger.debug("Job '%s' failed:\n%s", job["name"], traceback.format_exc())
+        return _job_result(job, "failed", seconds=time.perf_counter() - start, error="{0}: {1}".format(type(e).__name__, e))
+    return _job_result(job, "ok", seconds=time.perf_counter() - start, individuals=individuals)
+
+
+def _log_result(result, done, total):
+    if result["status"] == "ok":
+        logger.info("[%i/%i] Rendered '%s' (%i individuals) in %.2fs", done, total, result["name"], result["individuals"], result["seconds"])
+    else:
+        logger.error("[%i/%i] Failed '%s': %s", done, total, result["name"], result["error"])
+
+
+def _init_worker(memory_limit):
+    """Limits address space of worker process, so a job which exceeds it fails with MemoryError"""
+    if memory_limit is None:
+        return
+    try:
+        import resource
+    except ImportError:
+        logger.warn("Memory limit of batch workers is not supported on this platform")
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        memory_limit = min(memory_limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, hard))
+
+
+def run_batch(jobs, workers=None, cache_dir=None, memory_limit=None, max_jobs_per_worker=None):
+    """Renders plots of jobs on a process pool and returns BatchReport of their results
+
+    :param jobs: Jobs from load_manifest()
+    :type jobs: list
+    :param workers: Number of worker processes; number of CPUs if not specified
+    :type workers: int
+    :param cache_dir: Pedigree cache directory, which can be kept between batches; a temporary directory if not specified
+    :type cache_dir: str
+    :param memory_limit: Address space limit of each worker process in bytes, on platforms which support it
+    :type memory_limit: int
+    :param max_jobs_per_worker: Number of jobs a worker process runs before it is replaced, releasing its memory (Python 3.11+)
+    :type max_jobs_per_worker: int
+    """
+    start = time.perf_counter()
+    temporary = None
+    if cache_dir is None:
+        temporary = tempfile.TemporaryDirectory(prefix="genoplot-")
+        cache_dir = temporary.name
+    try:
+        errors = prepare_pedigrees(jobs, cache_dir)
+        logger.info("Prepared %i pedigrees for %i jobs in %.2fs", len(set(job["gedcom"] for job in jobs)), len(jobs),
+                    time.perf_counter() - start)
+
+        results = [None]*len(jobs)
+        pending = []
+        for i, job in enumerate(jobs):
+            if job["gedcom"] in errors:
+                results[i] = _job_result(job, "failed", error=errors[job["gedcom"]])
+            else:
+                pending.append(i)
+
+        pool_options = {}
+        if not max_jobs_per_worker is None:
+            pool_options["max_tasks_per_child"] = max_jobs_per_worker
+        done = len(jobs) - len(pending)
+        broken = []
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                    initargs=(memory_limit,), **pool_options) as executor:
+            futures = dict((executor.submit(run_job, jobs[i], cache_dir), i) for i in pending)
+            for future in concurrent.futures.as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except BrokenProcessPool:
+                    broken.append(i)
+                    continue
+                except Exception as e:
+                    # run_job() returns errors, so this is a failure to run the job or return its result
+                    results[i] = _job_result(jobs[i], "failed", error="{0}: {1}".format(type(e).__name__, e))
+                done += 1
+                _log_result(results[i], done, len(jobs))
+
+        # A worker which dies, e.g. when killed for its memory use, breaks the pool and every job
+        # not yet finished; those are run again one per pool, so only the job which kills its worker fails
+        if len(broken) > 0:
+            logger.warn("Worker process died; running %i unfinished jobs one at a time", len(broken))
+        for i in sorted(broken):
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1, initializer=_init_worker,
+                                                        initargs=(memory_limit,)) as executor:
+                try:
+                    results[i] = executor.submit(run_job, jobs[i], cache_dir).result()
+                except BrokenProcessPool as e:
+                    results[i] = _job_result(jobs[i], "failed", error="Worker process died: {0}".format(e))
+                except Exception as e:
+                    results[i] = _job_result(jobs[i], "failed", error="{0}: {1}".format(type(e).__name__, e))
+            done += 1
+            _log_result(results[i], done, len(jobs))
+    finally:
+        if not temporary is None:
+            temporary.cleanup()
+    return BatchReport(results, time.perf_counter() - start)
+
+
+class BatchReport(object):
+    def __init__(self, results, seconds):
+        """
+        BatchReport - defines result of each job of a batch and its throughput
+
+        :param results: Result of each job, in manifest order
+        :type results: list
+        :param seconds: Wall time of batch
+        :type seconds: float
+        """
+        self.results = results
+        self.seconds = seconds
+
+    def failures(self):
+        """Returns results of jobs which failed"""
+        return [result for result in self.results if result["status"] != "ok"]
+
+    def summary(self):
+        """Returns job counts and throughput of batch"""
+        succeeded = [result for result in self.results if result["status"] == "ok"]
+        individuals = sum(result["individuals"] for result in succeeded)
+        seconds = max(self.seconds, 1e-9)
+        return {
+            "jobs": len(self.results),
+            "succeeded": len(succeeded),
+            "failed": len(self.results) - len(succeeded),
+            "seconds": self.seconds,
+            "jobs_per_second": len(succeeded) / seconds,
+            "individuals": individuals,
+            "individuals_per_second": individuals / seconds,
+        }
+
+    def to_dict(self):
+        """Returns report as a dictionary which can be serialized as JSON"""
+        return {"summary": self.summary(), "jobs": self.results}
+
+    def save(self, output):
+        """Writes report as JSON to file path or file-like object
+
+        :param output: Output file path or file-like object
+        :type output: str
+        """
+        if hasattr(output, "write"):
+            json.dump(self.to_dict(), output, indent=1)
+        else:
+            with io.open(output, mode="w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, indent=1)
+
+    def __str__(self):
+        lines = ["{0:<40} {1:>8} {2:>10} {3:>12}  {4}".format("job", "status", "time (s)", "individuals", "output / error")]
+        for result in self.results:
+            seconds = "-" if result["seconds"] is None else "{0:.2f}".format(result["seconds"])
+            individuals = "-" if result["individuals"] is None else result["individuals"]
+            detail = result["output"] if result["status"] == "ok" else result["error"]
+            lines.append("{0:<40} {1:>8} {2:>10} {3:>12}  {4}".format(result["name"], result["status"], seconds, individuals, detail))
+        summary = self.summary()
+        lines.append("{0} of {1} jobs rendered, {2} failed, in {3:.2f}s: {4:.2f} jobs/s, {5:.0f} individuals/s".format(
+                        summary["succeeded"], summary["jobs"], summary["failed"], summary["seconds"],
+                        summary["jobs_per_second"], summary["individuals_per_second"]))
+        return "\n".join(lines)
@@ -0,0 +1,238 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import logging, hashlib, mmap, os, struct, sys, tempfile, time
+from array import array
+from .compact import CompactPedigree, ARRAY_COLUMNS, TEXT_COLUMNS
+logger = logging.getLogger("genoplot")
+
+# Version of GEDCOM processing; increment when parsed fields change so cached pedigrees are rebuilt
+PARSER_VERSION = 3
+FORMAT_VERSION = 2
+MAGIC = b"GPLC"
+BYTEORDER = b"<" if sys.byteorder == "little" else b">"
+
+# Magic, format version, parser version, byte order, section count
+HEADER = struct.Struct("<4sII1s3xI")
+# Name, typecode, offset and size in bytes of a section
+SECTION = struct.Struct("<32s4sQQ")
+ALIGNMENT = 8
+
+
+class TextColumn(object):
+    """
+    TextColumn - defines a column of strings stored as UTF-8 in a buffer
+
+    Strings are decoded when accessed, so opening a column costs nothing.
+
+    :param offsets: Start of each string in blob, followed by end of last string
+    :type offsets: memoryview
+    :param nulls: 1 for each missing (None) value
+    :type nulls: memoryview
+    :param blob: UTF-8 encoded strings
+    :type blob: memoryview
+    """
+    __slots__ = ("_offsets", "_nulls", "_blob")
+
+    def __init__(self, offsets, nulls, blob):
+        self._offsets = offsets
+        self._nulls = nulls
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._nulls)
+
+    def __getitem__(self, i):
+        if self._nulls[i]:
+            return None
+        return str(self._blob[self._offsets[i]:self._offsets[i+1]], "utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+def cache_key(gedcom_file):
+    """Returns cache key for GEDCOM file: hash of its content and the parser version
+
+    :param gedcom_file: GEDCOM file path
+    :type gedcom_file: str
+    """
+    digest = hashlib.sha256()
+    digest.update("genoplot-{0}-{1}".format(FORMAT_VERSION, PARSER_VERSION).encode("utf-8"))
+    with open(gedcom_file, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_path(cache_dir, gedcom_file, key=None):
+    """Returns path of cached pedigree for GEDCOM file
+
+    Entries are keyed by content, so a changed file maps to a new entry; entries of
+    old content are left in place and can be deleted at any time.
+
+    :param cache_dir: Cache directory
+    :type cache_dir: str
+    :param gedcom_file: GEDCOM file path
+    :type gedcom_file: str
+    :param key: Cache key of GEDCOM file, if already known
+    :type key: str
+    """
+    if key is None:
+        key = cache_key(gedcom_file)
+    return os.path.join(cache_dir, "{0}.gpc".format(key))
+
+
+def _stat_path(cache_dir, gedcom_file):
+    """Returns path of the file recording cache key of GEDCOM file with its modification time and size"""
+    name = hashlib.sha256(os.path.abspath(gedcom_file).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, "{0}.key".format(name))
+
+
+def _stat_signature(stat):
+    return "{0} {1} {2}-{3}".format(stat.st_mtime_ns, stat.st_size, FORMAT_VERSION, PARSER_VERSION)
+
+
+def _known_key(cache_dir, gedcom_file, stat):
+    """Returns cache key recorded for GEDCOM file if its modification time and size are unchanged, otherwise None"""
+    try:
+        with open(_stat_path(cache_dir, gedcom_file), "r") as f:
+            signature, _, key = f.read().rpartition(" ")
+    except OSError:
+        return None
+    if signature != _stat_signature(stat) or len(key) != hashlib.sha256().digest_size*2:
+        return None
+    return key
+
+
+def _record_key(cache_dir, gedcom_file, stat, key):
+    """Records cache key of GEDCOM file with its modification time and size"""
+    path = _stat_path(cache_dir, gedcom_file)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write("{0} {1}".format(_stat_signature(stat), key))
+        os.replace(tmp, path)
+    except:
+        os.remove(tmp)
+        raise
+
+
+def _text_sections(name, column):
+    offsets = array("q", [0])
+    nulls = array("b")
+    blob = bytearray()
+    for value in column:
+        nulls.append(1 if value is None else 0)
+        if not value is None:
+            blob.extend(value.encode("utf-8"))
+        offsets.append(len(blob))
+    return [(name + ".offsets", offsets), (name + ".nulls", nulls), (name + ".blob", blob)]
+
+
+def save(store, path):
+    """Writes compact pedigree to cache file
+
+    The file is written to a temporary file and moved into place, so concurrent
+    readers never see a partial file.
+
+    :param store: Pedigree store
+    :type store: CompactPedigree
+    :param path: Cache file path
+    :type path: str
+    """
+    sections = [(name, column) for name, column in store.arrays().items()]
+    [sections.extend(_text_sections(name, getattr(store, name))) for name in TEXT_COLUMNS]
+
+    table = []
+    offset = HEADER.size + SECTION.size*len(sections)
+    for name, column in sections:
+        data = memoryview(column)
+        offset += -offset % ALIGNMENT
+        table.append((name, data.format, offset, data.nbytes))
+        offset += data.nbytes
+
+    directory = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, PARSER_VERSION, BYTEORDER, len(sections)))
+            [f.write(SECTION.pack(name.encode("ascii"), typecode.encode("ascii"), offset, size)) for name, typecode, offset, size in table]
+            for (name, column), (_, _, offset, _) in zip(sections, table):
+                f.write(b"\0" * (offset - f.tell()))
+                f.write(memoryview(column).cast("B"))
+        os.replace(tmp, path)
+    except:
+        os.remove(tmp)
+        raise
+
+
+def load(path):
+    """Returns compact pedigree memory-mapped from cache file, or None if file is not a valid cache for this version
+
+    Numeric columns are memoryviews of the mapped file and text is decoded on access.
+
+    :param path: Cache file path
+    :type path: str
+    """
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, parser_version, byteorder, count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or parser_version != PARSER_VERSION or byteorder != BYTEORDER:
+            logger.info("Ignoring pedigree cache from other version: %s", path)
+            return None
+
+        view = memoryview(buffer)
+        sections = {}
+        for i in range(count):
+            name, typecode, offset, size = SECTION.unpack_from(buffer, HEADER.size + SECTION.size*i)
+            if offset + size > len(buffer):
+                raise ValueError("Section {0} is truncated".format(name))
+            sections[name.rstrip(b"\0").decode("ascii")] = view[offset:offset+size].cast(typecode.rstrip(b"\0").decode("ascii"))
+
+        columns = {name: sections[name] for name in ARRAY_COLUMNS}
+        for name in TEXT_COLUMNS:
+            columns[name] = TextColumn(sections[name + ".offsets"], sections[name + ".nulls"], sections[name + ".blob"])
+    except (OSError, ValueError, KeyError, TypeError, struct.error):
+        logger.warn("Ignoring invalid pedigree cache: %s", path)
+        return None
+    return CompactPedigree.from_columns(columns)
+
+
+def cached_pedigree(gedcom_file, cache_dir):
+    """Returns compact pedigree of GEDCOM file from cache, parsing and caching the file if it is not cached
+
+    The content hash of a file is recorded with its modification time and size, so
+    the file is only read and hashed again once either of them changes.
+
+    The returned store is memory-mapped, so a warm start opens it in about a
+    millisecond. Building a Pedigree from it creates every Individual and Family,
+    which costs far more; read the store directly where views are enough.
+
+    :param gedcom_file: GEDCOM file path
+    :type gedcom_file: str
+    :param cache_dir: Cache directory
+    :type cache_dir: str
+    """
+    start = time.time()
+    stat = os.stat(gedcom_file)
+    known_key = _known_key(cache_dir, gedcom_file, stat)
+    key = cache_key(gedcom_file) if known_key is None else known_key
+    path = cache_path(cache_dir, gedcom_file, key)
+    store = load(path) if os.path.exists(path) else None
+    if store is None:
+        store = CompactPedigree.from_gedcom(gedcom_file)
+        os.makedirs(cache_dir, exist_ok=True)
+        save(store, path)
+        logger.info("Cached pedigree in %.4fs: %s", time.time()-start, path)
+    else:
+        logger.info("Loaded cached pedigree in %.4fs: %s", time.time()-start, path)
+    if known_key is None:
+        _record_key(cache_dir, gedcom_file, stat, key)
+    return store
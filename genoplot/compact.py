@@ -0,0 +1,622 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import logging, time
+from array import array
+from . import gedcomstream
+from .family import birth_sort_key
+from .gedcomdate import GedcomDate, parse_date, format_key
+from .utils import stripName
+logger = logging.getLogger("genoplot")
+
+# Sort key stored for unknown dates; sorts before all known dates
+NO_DATE = -2**62
+# Index stored for missing individuals
+NONE = -1
+# Numeric columns, as returned by arrays()
+ARRAY_COLUMNS = ("individual_ids", "father", "mother", "sex", "birth_key", "death_key",
+                 "family_ids", "husband", "wife", "child_offsets", "child_indices",
+                 "parent_family_offsets", "parent_family_indices",
+                 "child_family_offsets", "child_family_indices")
+# Codes of GEDCOM SEX values in the sex column; other values are stored as unknown
+SEX_CODES = {"U": 0, "M": 1, "F": 2, "X": 3}
+SEX_VALUES = ("U", "M", "F", "X")
+# Text columns, with None for missing values
+TEXT_COLUMNS = ("first", "last", "birth_date", "birth_place", "death_date", "death_place")
+
+
+def encode_date_key(key):
+    """Returns integer encoding of (year, month, day) date key, or NO_DATE"""
+    if key is None:
+        return NO_DATE
+    year, month, day = key
+    return year*10000 + month*100 + day
+
+
+def decode_date_key(value):
+    """Returns (year, month, day) date key from integer encoding, or None"""
+    if value == NO_DATE:
+        return None
+    year, rest = divmod(value, 10000)
+    month, day = divmod(rest, 100)
+    return year, month, day
+
+
+class CompactPedigree(object):
+    def __init__(self):
+        """
+        CompactPedigree - defines a pedigree stored in integer-indexed arrays
+
+        Individuals and families are numbered from 0 in file order. Per-individual
+        fields are arrays or lists indexed by individual number; family membership
+        is stored in compressed sparse row (CSR) form, where the members of row i are
+        indices[offsets[i]:offsets[i+1]]. IndividualView and FamilyView objects give
+        read access through the Individual and Family API.
+
+        Build with from_gedcom() or from_pedigree().
+        """
+        # Individuals
+        self.individual_ids = array("q")
+        self.father = array("q")
+        self.mother = array("q")
+        self.sex = array("B")
+        self.birth_key = array("q")
+        self.death_key = array("q")
+        self.first = []
+        self.last = []
+        self.birth_date = []
+        self.birth_place = []
+        self.death_date = []
+        self.death_place = []
+
+        # Families
+        self.family_ids = array("q")
+        self.husband = array("q")
+        self.wife = array("q")
+        self.child_offsets = array("q", [0])
+        self.child_indices = array("q")
+
+        # Families of individuals, by role
+        self.parent_family_offsets = array("q", [0])
+        self.parent_family_indices = array("q")
+        self.child_family_offsets = array("q", [0])
+        self.child_family_indices = array("q")
+
+        self._individual_index = {}
+        self._family_index = {}
+
+    @classmethod
+    def from_gedcom(cls, gedcom_file):
+        """Returns CompactPedigree read from GEDCOM file without creating Individual or Family objects
+
+        :param gedcom_file: GEDCOM file path or file-like object
+        :type gedcom_file: str
+        """
+        start = time.time()
+        store = cls()
+        families = []
+        for record in gedcomstream.iter_records(gedcom_file):
+            if type(record) is gedcomstream.FamilyRecord:
+                try:
+                    fid = int(record.id.replace("@", "").replace("F", ""))
+                    husband = wife = None
+                    parents = []
+                    for person in record.partners:
+                        pid = int(person.value.replace("@", "").replace("P", ""))
+                        parents.append(pid)
+                        if person.tag == "HUSB":
+                            husband = pid
+                        elif person.tag == "WIFE":
+                            wife = pid
+                    children = [int(el.value.replace("@", "").replace("P", "")) for el in record.child_elements if el.tag == "CHIL"]
+                except (AttributeError, ValueError):
+                    logger.warn("Error adding family: %s", record.id)
+                    continue
+                families.append((fid, husband, wife, parents, children))
+                continue
+
+            try:
+                pid = int(record.id.replace("@", "").replace("P", ""))
+            except (AttributeError, ValueError):
+                logger.warn("Error adding individual: %s", record.id)
+                continue
+            first, last = record.name
+            birth = store._event(record.birth)
+            death = store._event(record.death)
+            store._add_individual(pid, first, last, record.sex, birth, death)
+
+        store._add_families(families)
+        logger.info("Building compact pedigree took %.4fs: %i individuals and %i families", time.time()-start, len(store), store.family_count())
+        return store
+
+    @classmethod
+    def from_pedigree(cls, pedigree):
+        """Returns CompactPedigree with the individuals and families of a Pedigree
+
+        :param pedigree: Pedigree to copy
+        :type pedigree: Pedigree
+        """
+        store = cls()
+        for individual in pedigree._individuals.values():
+            birth = death = None
+            if not individual.birthDate is None:
+                birth = (individual.birth_key, individual.birthDate[2:], individual.birthPlace)
+            if not individual.deathDate is None:
+                death = (individual.death_key, individual.deathDate[2:], individual.deathPlace)
+            store._add_individual(individual.id, individual.first, individual.last, individual.sex, birth, death)
+        store._add_families(
+            (family.id, family.father_id(), family.mother_id(), family.parent_ids(), family.children_ids())
+            for family in pedigree._families.values()
+        )
+        # Parents as set on individuals, which need not come from their first family
+        for individual in pedigree._individuals.values():
+            i = store._individual_index[individual.id]
+            store.father[i] = store._individual_index.get(individual.father, NONE)
+            store.mother[i] = store._individual_index.get(individual.mother, NONE)
+        return store
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Returns CompactPedigree over existing columns, e.g. read from a pedigree cache
+
+        Columns may be any sequences supporting indexing and slicing, such as memoryviews.
+
+        :param columns: Columns by name, as returned by columns()
+        :type columns: dict
+        """
+        store = cls()
+        [setattr(store, name, columns[name]) for name in ARRAY_COLUMNS + TEXT_COLUMNS]
+        store._individual_index = {pid: i for i, pid in enumerate(store.individual_ids)}
+        store._family_index = {fid: f for f, fid in enumerate(store.family_ids)}
+        return store
+
+    def _event(self, event):
+        """Returns date key, display date and place of event record, or None"""
+        if event is None or event.date is None or event.place is None:
+            return None
+        date = parse_date(event.date)
+        return date.key, date.display, event.place.strip()
+
+    def _add_individual(self, pid, first, last, sex, birth, death):
+        self._individual_index[pid] = len(self.individual_ids)
+        self.individual_ids.append(pid)
+        self.father.append(NONE)
+        self.mother.append(NONE)
+        self.sex.append(SEX_CODES.get(sex, 0))
+        self.first.append(first)
+        self.last.append(last)
+        for event, keys, dates, places in ((birth, self.birth_key, self.birth_date, self.birth_place),
+                                           (death, self.death_key, self.death_date, self.death_place)):
+            if event is None:
+                keys.append(NO_DATE)
+                dates.append(None)
+                places.append(None)
+            else:
+                keys.append(encode_date_key(event[0]))
+                dates.append(event[1])
+                places.append(event[2])
+
+    def _add_families(self, families):
+        """Adds (id, husband, wife, parents, children) families and builds membership rows"""
+        parent_families = {}
+        child_families = {}
+        for fid, husband, wife, parents, children in families:
+            f = len(self.family_ids)
+            self._family_index[fid] = f
+            self.family_ids.append(fid)
+            self.husband.append(self._individual_index.get(husband, NONE))
+            self.wife.append(self._individual_index.get(wife, NONE))
+            # Children are stored in the order Family sorts them, so records can skip sorting
+            rows = [self._individual_index[pid] for pid in children if pid in self._individual_index]
+            rows.sort(key=lambda i: birth_sort_key(IndividualView(self, i).birth))
+            for i in rows:
+                self.child_indices.append(i)
+                child_families.setdefault(i, []).append(f)
+            self.child_offsets.append(len(self.child_indices))
+            for pid in parents:
+                if pid in self._individual_index:
+                    parent_families.setdefault(self._individual_index[pid], []).append(f)
+
+        for i in range(len(self.individual_ids)):
+            self.parent_family_indices.extend(parent_families.get(i, ()))
+            self.parent_family_offsets.append(len(self.parent_family_indices))
+            self.child_family_indices.extend(child_families.get(i, ()))
+            self.child_family_offsets.append(len(self.child_family_indices))
+            # Parents come from first family listing individual as a child
+            if i in child_families:
+                f = child_families[i][0]
+                self.father[i] = self.husband[f]
+                self.mother[i] = self.wife[f]
+
+    def __len__(self):
+        """Returns number of individuals in pedigree"""
+        return len(self.individual_ids)
+
+    def family_count(self):
+        """Returns number of families in pedigree"""
+        return len(self.family_ids)
+
+    def individual_index(self, pid):
+        """Returns array index of individual ID, or None"""
+        return self._individual_index.get(pid)
+
+    def family_index(self, fid):
+        """Returns array index of family ID, or None"""
+        return self._family_index.get(fid)
+
+    def individual(self, pid):
+        """Returns IndividualView for specified individual ID
+
+        :param pid: Individual ID
+        :type pid: int
+        """
+        if pid not in self._individual_index:
+            logger.warn("Individual not found in pedigree: %s", pid)
+            return None
+        return IndividualView(self, self._individual_index[pid])
+
+    def family(self, fid):
+        """Returns FamilyView for specified family ID
+
+        :param fid: Family ID
+        :type fid: int
+        """
+        if fid not in self._family_index:
+            return None
+        return FamilyView(self, self._family_index[fid])
+
+    def individuals(self):
+        """Returns IndividualView for each individual"""
+        return [IndividualView(self, i) for i in range(len(self.individual_ids))]
+
+    def families(self):
+        """Returns FamilyView for each family"""
+        return [FamilyView(self, f) for f in range(len(self.family_ids))]
+
+    def _row(self, offsets, indices, i):
+        return indices[offsets[i]:offsets[i+1]]
+
+    def family_rows(self, i, role="parent"):
+        """Returns family indices of individual index in specified role"""
+        if role == "parent":
+            return self._row(self.parent_family_offsets, self.parent_family_indices, i)
+        elif role == "child":
+            return self._row(self.child_family_offsets, self.child_family_indices, i)
+        rows = list(self._row(self.parent_family_offsets, self.parent_family_indices, i))
+        rows.extend(f for f in self._row(self.child_family_offsets, self.child_family_indices, i) if f not in rows)
+        return rows
+
+    def children_rows(self, f):
+        """Returns individual indices of children of family index"""
+        return self._row(self.child_offsets, self.child_indices, f)
+
+    def is_parent(self, pid):
+        """Returns whether specified individual ID is a parent in a family in this pedigree"""
+        i = self._individual_index.get(pid)
+        return not i is None and self.parent_family_offsets[i+1] > self.parent_family_offsets[i]
+
+    def is_child(self, pid):
+        """Returns whether specified individual ID is a child in a family in this pedigree"""
+        i = self._individual_index.get(pid)
+        return not i is None and self.child_family_offsets[i+1] > self.child_family_offsets[i]
+
+    def individual_families(self, pid, role="parent"):
+        """Returns FamilyView for families in which specified individual ID belongs
+
+        :param pid: Individual ID
+        :type pid: int
+        :param role: Role in family
+        :type: str
+        """
+        i = self._individual_index.get(pid)
+        if i is None:
+            return []
+        return [FamilyView(self, f) for f in self.family_rows(i, role)]
+
+    def families_with_parent(self, parents=[]):
+        """Returns FamilyView for families with parent IDs specified
+
+        :param parents: Parent(s) to find in family
+        :type parents: int or list
+        """
+        if type(parents) is int:
+            return self.individual_families(parents, role="parent")
+        elif type(parents) is list:
+            rows = None
+            for parent in parents:
+                i = self._individual_index.get(parent)
+                parent_rows = set() if i is None else set(self.family_rows(i, "parent"))
+                rows = parent_rows if rows is None else rows & parent_rows
+            return [FamilyView(self, f) for f in sorted(rows or ())]
+        else:
+            return []
+
+    def born_between(self, start, end):
+        """Returns individual IDs with known birth year between start and end, inclusive
+
+        :param start: First year
+        :type start: int
+        :param end: Last year
+        :type end: int
+        """
+        low = start*10000
+        high = end*10000 + 9999
+        ids = self.individual_ids
+        return [ids[i] for i, key in enumerate(self.birth_key) if low <= key <= high]
+
+    def founders(self):
+        """Returns individual IDs without known parents"""
+        ids = self.individual_ids
+        return [ids[i] for i in range(len(ids)) if self.father[i] == NONE and self.mother[i] == NONE]
+
+    def arrays(self):
+        """Returns numeric arrays by name, e.g. for numpy.frombuffer()"""
+        return {name: getattr(self, name) for name in ARRAY_COLUMNS}
+
+    def columns(self):
+        """Returns numeric arrays and text columns by name"""
+        columns = self.arrays()
+        columns.update((name, getattr(self, name)) for name in TEXT_COLUMNS)
+        return columns
+
+    def _event_record(self, i, keys, dates, places):
+        if dates[i] is None:
+            return None
+        event = gedcomstream.EventRecord()
+        event.date = dates[i]
+        event.place = places[i]
+        event.parsed = GedcomDate(decode_date_key(keys[i]), dates[i])
+        return event
+
+    def iter_records(self):
+        """Yields IndividualRecord and FamilyRecord objects for each individual and family
+
+        Records carry parsed dates and children in the order Family sorts them, as
+        stored by _add_families(), so Individual and Family objects can be created
+        from them without parsing or sorting.
+        """
+        ids = self.individual_ids
+        for i in range(len(ids)):
+            record = gedcomstream.IndividualRecord("@P{0}@".format(ids[i]))
+            record.name = (self.first[i], self.last[i])
+            record.sex = SEX_VALUES[self.sex[i]]
+            record.birth = self._event_record(i, self.birth_key, self.birth_date, self.birth_place)
+            record.death = self._event_record(i, self.death_key, self.death_date, self.death_place)
+            yield record
+
+        for f in range(len(self.family_ids)):
+            record = gedcomstream.FamilyRecord("@F{0}@".format(self.family_ids[f]))
+            record.partners = [gedcomstream.GedcomElement(tag, "@P{0}@".format(ids[i]))
+                               for tag, i in (("HUSB", self.husband[f]), ("WIFE", self.wife[f])) if i != NONE]
+            record.child_elements = [gedcomstream.GedcomElement("CHIL", "@P{0}@".format(ids[i])) for i in self.children_rows(f)]
+            record.children_sorted = True
+            yield record
+
+
+class IndividualView(object):
+    """
+    IndividualView - defines read access to an individual of a CompactPedigree with the Individual API
+
+    Views are read-only and have no label size or coordinates, so they cannot be
+    laid out by FamilyGraph, which needs the Individual and Family objects of a
+    Pedigree built from the store's records.
+
+    :param store: Pedigree store
+    :type store: CompactPedigree
+    :param index: Individual array index
+    :type index: int
+    """
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    def __eq__(self, other):
+        return type(other) is IndividualView and other._store is self._store and other._index == self._index
+
+    def __hash__(self):
+        return hash((id(self._store), self._index))
+
+    def __repr__(self):
+        return "<IndividualView {0}: {1}>".format(self.id, self.name)
+
+    def _individual_id(self, i):
+        return None if i == NONE else self._store.individual_ids[i]
+
+    @property
+    def id(self):
+        return self._store.individual_ids[self._index]
+
+    @property
+    def first(self):
+        return stripName(self._store.first[self._index])
+
+    @property
+    def last(self):
+        return stripName(self._store.last[self._index])
+
+    @property
+    def name(self):
+        first = self._store.first[self._index]
+        name = self._store.last[self._index] or ""
+        if not first is None and len(first) > 0:
+            name = first + " " + name
+        return stripName(name)
+
+    @property
+    def sex(self):
+        return SEX_VALUES[self._store.sex[self._index]]
+
+    @property
+    def father(self):
+        return self._individual_id(self._store.father[self._index])
+
+    @property
+    def mother(self):
+        return self._individual_id(self._store.mother[self._index])
+
+    def _date(self, keys, dates):
+        if dates[self._index] is None:
+            return None
+        key = decode_date_key(keys[self._index])
+        return dates[self._index] if key is None else format_key(key)
+
+    @property
+    def birth(self):
+        return self._date(self._store.birth_key, self._store.birth_date)
+
+    @property
+    def birth_key(self):
+        return decode_date_key(self._store.birth_key[self._index])
+
+    @property
+    def birthDate(self):
+        date = self._store.birth_date[self._index]
+        return None if date is None else "* {0}".format(date).strip()
+
+    @property
+    def birthPlace(self):
+        return self._store.birth_place[self._index]
+
+    @property
+    def death(self):
+        return self._date(self._store.death_key, self._store.death_date)
+
+    @property
+    def death_key(self):
+        return decode_date_key(self._store.death_key[self._index])
+
+    @property
+    def deathDate(self):
+        date = self._store.death_date[self._index]
+        return None if date is None else "✝ {0}".format(date).strip()
+
+    @property
+    def deathPlace(self):
+        return self._store.death_place[self._index]
+
+    def is_parent(self):
+        """Returns whether individual is a parent in this pedigree"""
+        return self._store.is_parent(self.id)
+
+    def is_child(self):
+        """Returns whether individual is a child in this pedigree"""
+        return self._store.is_child(self.id)
+
+    def families(self, role="parent"):
+        """Returns families in which individual belongs
+
+        :param role: Role in family
+        :type: str
+        """
+        return [FamilyView(self._store, f) for f in self._store.family_rows(self._index, role)]
+
+
+class FamilyView(object):
+    """
+    FamilyView - defines read access to a family of a CompactPedigree with the Family API
+
+    Like IndividualView, views have no label size or coordinates for layout.
+
+    :param store: Pedigree store
+    :type store: CompactPedigree
+    :param index: Family array index
+    :type index: int
+    """
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    def __eq__(self, other):
+        return type(other) is FamilyView and other._store is self._store and other._index == self._index
+
+    def __hash__(self):
+        return hash((id(self._store), self._index))
+
+    def __repr__(self):
+        return "<FamilyView {0}>".format(self.id)
+
+    def _individual_id(self, i):
+        return None if i == NONE else self._store.individual_ids[i]
+
+    def _individual(self, i):
+        return None if i == NONE else IndividualView(self._store, i)
+
+    @property
+    def id(self):
+        return self._store.family_ids[self._index]
+
+    def father_id(self):
+        """Returns father individual ID"""
+        return self._individual_id(self._store.husband[self._index])
+
+    def mother_id(self):
+        """Returns mother individual ID"""
+        return self._individual_id(self._store.wife[self._index])
+
+    def father(self):
+        """Returns father individual view"""
+        return self._individual(self._store.husband[self._index])
+
+    def mother(self):
+        """Returns mother individual view"""
+        return self._individual(self._store.wife[self._index])
+
+    def _parent_rows(self):
+        return [i for i in (self._store.husband[self._index], self._store.wife[self._index]) if i != NONE]
+
+    def parent_count(self):
+        """Returns number of parents in family"""
+        return len(self._parent_rows())
+
+    def parent_ids(self):
+        """Returns IDs of parents in family"""
+        return [self._store.individual_ids[i] for i in self._parent_rows()]
+
+    def parents(self):
+        """Returns individual views for parents in family"""
+        return [IndividualView(self._store, i) for i in self._parent_rows()]
+
+    def children_count(self):
+        """Returns number of children in family"""
+        return len(self._store.children_rows(self._index))
+
+    def children_ids(self):
+        """Returns IDs of children in family"""
+        return [self._store.individual_ids[i] for i in self._store.children_rows(self._index)]
+
+    def children(self):
+        """Returns individual views for children in family"""
+        return [IndividualView(self._store, i) for i in self._store.children_rows(self._index)]
+
+    def contains_parent(self, pid):
+        """Returns whether specified id is a parent in this family
+
+        :param pid: Individual ID
+        :type pid: int
+        """
+        return pid in self.parent_ids()
+
+    def contains_child(self, pid):
+        """Returns whether specified id is a child in this family
+
+        :param pid: Individual ID
+        :type pid: int
+        """
+        return pid in self.children_ids()
+
+    def __contains__(self, pid):
+        """Returns whether specified id is in this family (either parent or child)
+
+        :param pid: Individual ID
+        :type pid: int
+        """
+        return self.contains_child(pid) or self.contains_parent(pid)
@@ -0,0 +1,124 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import logging, bisect, heapq
+logger = logging.getLogger("genoplot")
+
+
+def assign_tracks(intervals):
+    """Returns track number for each interval so that intervals on a track do not overlap
+
+    Intervals are swept by start coordinate and each takes the lowest track freed
+    by an interval ending before it starts, which colours the interval graph with
+    the minimum number of tracks in O(n log n).
+
+    :param intervals: (start, end) x intervals, with start <= end
+    :type intervals: list
+    """
+    tracks = [0]*len(intervals)
+    active = []
+    free = []
+    count = 0
+    for i in sorted(range(len(intervals)), key=lambda i: intervals[i][0]):
+        start, end = intervals[i]
+        # Release tracks of intervals which end before this one starts
+        while len(active) > 0 and active[0][0] < start:
+            heapq.heappush(free, heapq.heappop(active)[1])
+        if len(free) > 0:
+            track = heapq.heappop(free)
+        else:
+            track = count
+            count += 1
+        tracks[i] = track
+        heapq.heappush(active, (end, track))
+    return tracks
+
+
+class ConnectorIndex(object):
+    def __init__(self):
+        """
+        ConnectorIndex - defines an index of straight line connectors drawn on a plot
+
+        Segments are kept in a set for constant-time duplicate checks. Horizontal
+        segments are also kept per y value as a sorted list of disjoint x intervals,
+        so overlap queries take logarithmic time in the number of connectors.
+        """
+        self._segments = set()
+        self._horizontal = {}
+
+    def __len__(self):
+        """Returns number of connector segments in index"""
+        return len(self._segments)
+
+    def __contains__(self, segment):
+        """Returns whether specified (start, end) segment is in index"""
+        return segment in self._segments
+
+    def __iter__(self):
+        return iter(self._segments)
+
+    def add(self, start, end):
+        """Adds segment between specified coordinates to index
+
+        :param start: Start coordinate
+        :type start: tuple
+        :param end: End coordinate
+        :type end: tuple
+        """
+        self._segments.add((start, end))
+        if start[1] == end[1]:
+            self._add_interval(start[1], min(start[0], end[0]), max(start[0], end[0]))
+
+    def _add_interval(self, y, x1, x2):
+        """Merges x interval into disjoint intervals at specified y"""
+        if y not in self._horizontal:
+            self._horizontal[y] = ([], [])
+        starts, ends = self._horizontal[y]
+        # First interval which ends at or after start of new interval
+        i = bisect.bisect_left(ends, x1)
+        # First interval which starts after end of new interval
+        j = bisect.bisect_right(starts, x2)
+        if i < j:
+            x1 = min(x1, starts[i])
+            x2 = max(x2, ends[j-1])
+        starts[i:j] = [x1]
+        ends[i:j] = [x2]
+
+    def overlaps(self, x1, x2, y):
+        """Returns whether a horizontal connector at y overlaps the x range
+
+        :param x1: First x coordinate
+        :type x1: float
+        :param x2: Second x coordinate
+        :type x2: float
+        :param y: Y coordinate
+        :type y: float
+        """
+        if y not in self._horizontal:
+            return False
+        if x1 > x2:
+            x1, x2 = x2, x1
+        starts, ends = self._horizontal[y]
+        i = bisect.bisect_left(ends, x1)
+        return i < len(starts) and starts[i] <= x2
+
+    def free_y(self, x1, x2, y, step):
+        """Returns first y, moving up from specified y by step, without an overlapping horizontal connector
+
+        :param x1: First x coordinate
+        :type x1: float
+        :param x2: Second x coordinate
+        :type x2: float
+        :param y: Starting y coordinate
+        :type y: float
+        :param step: Distance between connector tracks
+        :type step: float
+        """
+        while self.overlaps(x1, x2, y):
+            y -= step
+        return y
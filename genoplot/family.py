@@ -7,10 +7,21 @@
 # @author david@newell.at
 
 import logging
+from .individual import LABEL_LAYOUT_ATTRIBUTES, label_changed
 from .utils import calculate_text_size
 logger = logging.getLogger("genoplot")
 
 
+def birth_sort_key(birth):
+    """Returns key by which children are sorted, from the birth attribute of an individual"""
+    if birth is None:
+        return 0
+    elif type(birth) is str:
+        return 0
+    else:
+        return birth
+
+
 class Family(object):
     """
     Family - defines a family in a pedigree
@@ -49,7 +60,20 @@ class Family(object):
         [setattr(self, k, v) for k, v in kwargs.items()]
 
         self._setup()
-        self.width, self.height = self.size()
+        # Raw GEDCOM element is only needed during setup
+        self._raw = None
+        # Label is measured when width or height is first read, not when the pedigree is built
+        self._first_size = None
+
+    def __setattr__(self, name, value):
+        # Labels of parents which show layout fields show those of their families
+        if name in LABEL_LAYOUT_ATTRIBUTES and "_parent_ids" in self.__dict__ and not self._pedigree is None \
+                and label_changed(self, name, value):
+            for pid in self._parent_ids:
+                parent = self._pedigree._individuals.get(pid)
+                if not parent is None:
+                    parent.invalidate_label()
+        object.__setattr__(self, name, value)
 
     def _setup(self):
         self.id = int(self._raw.id.replace("@", "").replace("F", ""))
@@ -67,7 +91,8 @@ class Family(object):
             if el.tag == "CHIL":
                 pid = int(el.value.replace("@", "").replace("P", ""))
                 self._children_ids.append(pid)
-        self._sort_children()
+        if not getattr(self._raw, "children_sorted", False):
+            self._sort_children()
 
     def _sort_children(self):
         self._children_ids.sort(key=self._sort_by_birth)
@@ -77,17 +102,14 @@ class Family(object):
         if cid is None or child is None:
             logger.critical("Individual %s does not exist, cannot continue sorting children in family %s", cid, self.id)
             return 0
-        if child.birth is None:
-            return 0
-        elif type(child.birth) is str:
-            return 0
-        else:
-            return child.birth
+        return birth_sort_key(child.birth)
 
     def add_child(self, pid):
         """Adds specified individual to family"""
         self._children_ids.append(pid)
         self._sort_children()
+        if not self._pedigree is None:
+            self._pedigree._index_family_child(self, pid)
 
     def set_coordinates(self, x, y, add_to_history=False):
         """Sets coordinates for parents
@@ -151,6 +173,10 @@ class Family(object):
             raise Exception("Pedigree is not defined")
         return [self._pedigree.individual(pid) for pid in self._parent_ids]
 
+    def shows_layout_fields(self):
+        """Returns whether label of either parent shows layout fields, so that its size changes during layout"""
+        return any(not parent is None and parent.shows_layout_fields() for parent in self.parents())
+
     def children_count(self):
         """Returns number of children in family"""
         return len(self._children_ids)
@@ -189,6 +215,21 @@ class Family(object):
         """
         return self.contains_child(pid) or self.contains_parent(pid)
 
+    @property
+    def width(self):
+        """Label width when first measured"""
+        return self._measure()[0]
+
+    @property
+    def height(self):
+        """Label height when first measured"""
+        return self._measure()[1]
+
+    def _measure(self):
+        if self._first_size is None:
+            self._first_size = self.size()
+        return self._first_size
+
     def size(self):
         """
         Returns label size of indivdual at specified font size
@@ -201,9 +242,6 @@ class Family(object):
         height = 0
         width = 0
 
-        mother = self.mother()
-        father = self.father()
-
         for parent in self.parents():
             if not parent is None:
                 pw, ph = parent.size()
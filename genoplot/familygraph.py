@@ -6,14 +6,63 @@
 # into with Welded Anvil Technologies (David D. Newell).
 # @author david@newell.at
 
-import logging, pygraphviz, time, itertools, sys, traceback
+import logging, time, itertools, sys, traceback
+import concurrent.futures
 import networkx as nx
 from .family import Family
 from .pedigree import Pedigree
-from . import buchheim
+from .layoutcache import layout_signature
+from .packing import shelf_pack
+from .spatial import SpatialIndex
+from .vertex import FAMILY_TAG, family_vertex, individual_vertex
+from .forest import Forest
 from .utils import calculate_text_size
+from . import trace
 logger = logging.getLogger("genoplot")
 
+# Element attributes set by Branch.layout()
+LAYOUT_ATTRIBUTES = ("x", "y", "layout_prelim", "layout_mod", "layout_change", "layout_shift", "layout_number",
+                        "layout_ancestor", "layout_thread", "layout_lsibling", "layout_lmost_sibling")
+# Layout attributes whose values are node IDs
+LAYOUT_REFERENCES = ("layout_ancestor", "layout_thread", "layout_lsibling", "layout_lmost_sibling")
+
+
+class BranchNode(object):
+    """
+    BranchNode - defines a stand-in for an element laid out in a worker process
+
+    :param width: Element width
+    :type width: float
+    :param height: Element height
+    :type height: float
+    """
+    __slots__ = LAYOUT_ATTRIBUTES + ("width", "height", "layout_branch")
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        for attr in LAYOUT_ATTRIBUTES:
+            setattr(self, attr, None)
+        self.x = self.y = 0
+        self.layout_prelim = self.layout_mod = self.layout_change = self.layout_shift = self.layout_number = 0
+        self.layout_branch = None
+
+    def size(self):
+        """Returns element width and height"""
+        return self.width, self.height
+
+
+def _layout_branch(inputs):
+    """Lays out branch from Branch.layout_inputs() and returns its layout state and extremes"""
+    id, nodes, edges, font_size, hmargin, node_height = inputs
+    graph = nx.DiGraph()
+    for vid, width, height, sort_key in nodes:
+        graph.add_node(vid, el=BranchNode(width, height), sort_key=sort_key)
+    graph.add_edges_from(edges)
+    branch = Branch(id, graph, None, font_size, hmargin=hmargin, node_height=node_height)
+    branch.layout()
+    return branch.layout_state(), branch.extremes()
+
 
 class Branch(object):
     def __init__(self, id, subgraph, parent, font_size, hmargin=10, node_height=50):
@@ -106,9 +155,7 @@ class Branch(object):
             logger.critical("Could not find parent node to layout branch %i: stopping", self.id)
             exit(1)
 
-        post_order = list(nx.dfs_postorder_nodes(self._graph, v))
-
-        logger.debug("<Branch %i> First Element: %s; post-order: %s", self.id, v, post_order)
+        logger.debug("<Branch %i> First Element: %s", self.id, v)
         heights = self.layout_preprocessing(v)
         self.layout_first_walk(v)
 
@@ -146,20 +193,25 @@ class Branch(object):
         self.height = self._extremes[3] - self._extremes[2]
 
     def layout_preprocessing(self, v, prev=None, n=1, lmost_sibling=None, lsibling=None):
-        el = self._graph.node[v]["el"]
-        el.layout_ancestor = prev
-        el.layout_number = n
-        el.layout_lmost_sibling = lmost_sibling
-        el.layout_lsibling = lsibling
-        el.layout_thread = None
-        heights = [el.height]
-        self._graph.node[v]["children"] = tuple(sorted(self._graph.edge[v].keys(), key=self._sort_children))
-        # for n, child in enumerate(self._graph.edge[v]):
-        for n, child in enumerate(self._graph.node[v]["children"]):
-            lsibling = self._graph.node[v]["children"][n-1] if n > 0 else None
-            lmost_sibling = self._graph.node[v]["children"][0] if n > 0 else None # TODO: verify that we don't need to set self to left most sibling
-            child_heights = self.layout_preprocessing(child, v, n+1, lmost_sibling, lsibling)
-            heights.extend(child_heights)
+        """Numbers elements, records siblings and sorts children in pre-order from v; returns element heights"""
+        heights = []
+        stack = [(v, prev, n, lmost_sibling, lsibling)]
+        while len(stack) > 0:
+            v, prev, n, lmost_sibling, lsibling = stack.pop()
+            el = self._graph.node[v]["el"]
+            el.layout_ancestor = prev
+            el.layout_number = n
+            el.layout_lmost_sibling = lmost_sibling
+            el.layout_lsibling = lsibling
+            el.layout_thread = None
+            heights.append(el.height)
+            children = tuple(sorted(self._graph.edge[v].keys(), key=self._sort_children))
+            self._graph.node[v]["children"] = children
+            # Push in reverse so that children are visited in order
+            for n in range(len(children)-1, -1, -1):
+                lsibling = children[n-1] if n > 0 else None
+                lmost_sibling = children[0] if n > 0 else None # TODO: verify that we don't need to set self to left most sibling
+                stack.append((children[n], v, n+1, lmost_sibling, lsibling))
         return heights
 
     def _reconcile_birth_date(self, bdate):
@@ -174,6 +226,9 @@ class Branch(object):
         n = self._graph.node[v]
         if n is None:
             logger.critical("Node %s does not exist, cannot continue sorting children in layout", v)
+        if "sort_key" in n:
+            # Sort key precomputed by layout_inputs()
+            return n["sort_key"]
         in_edges = self._graph.in_edges(v)
         if len(in_edges) == 0:
             logger.critical("No edges into node %s, cannot continue sorting children in layout", v)
@@ -217,13 +272,27 @@ class Branch(object):
         return 0
 
     def layout_first_walk(self, v):
+        """Calculates preliminary positions of elements in post-order from v"""
+        # Stack entries are element, index of next child to walk and default ancestor
+        stack = [(v, 0, None)]
+        while len(stack) > 0:
+            v, i, default_ancestor = stack.pop()
+            children = self._graph.node[v].get("children", ())
+            if i == 0 and len(children) > 0:
+                default_ancestor = children[0]
+            elif i > 0:
+                default_ancestor = self.layout_apportion(children[i-1], default_ancestor)
+            if i < len(children):
+                stack.append((v, i+1, default_ancestor))
+                stack.append((children[i], 0, None))
+            else:
+                self._layout_first_walk_element(v)
+
+    def _layout_first_walk_element(self, v):
+        """Calculates preliminary position of element after its children have been walked"""
         el = self._graph.node[v]["el"]
         if "children" in self._graph.node[v] and len(self._graph.node[v]["children"]) > 0:
             children = self._graph.node[v]["children"]
-            default_ancestor = children[0]
-            for child in children:
-                self.layout_first_walk(child)
-                default_ancestor = self.layout_apportion(child, default_ancestor)
             self.layout_execute_shift(v)
             first_child = self._graph.node[children[0]]["el"]
             last_child = self._graph.node[children[-1]]["el"]
@@ -242,15 +311,12 @@ class Branch(object):
             else:
                 el.layout_prelim = 0
 
-        logger.debug("<Branch %i> Element: %s prelim: %.1f, mod: %.1f, change: %.1f", self.id, v, el.layout_prelim, el.layout_mod, el.layout_change)
-
     def layout_apportion(self, v, default_ancestor):
         # o = outside, i = inside, l/- = left, r/+ = right
         # v = vertex
         # s = sum(vertex mod properties)
         el = self._graph.node[v]["el"]
         left_sibling = el.layout_lsibling
-        logger.debug("<Branch %i> layout_apportion - older_sibling: %s", self.id, left_sibling)
         if not left_sibling is None:
             vir = vor = v
             vil = left_sibling
@@ -284,7 +350,7 @@ class Branch(object):
 
                 width = vir_el.size()[0] + self.hmargin * 2
                 shift = (vil_el.layout_prelim + sil) - (vir_el.layout_prelim + sir) + width
-                logger.info("<Branch %i> Loop #%i... shift: %i", self.id, loop_i, shift)
+                loop_i += 1
                 if shift > 0:
                     local_ancestor = self.layout_left_ancestor(vil, v, default_ancestor)
                     self.layout_move_subtree(local_ancestor, v, shift)
@@ -298,15 +364,17 @@ class Branch(object):
                 # if not vor is None:
                 sor += vor_el.layout_mod
 
+            if not trace.tracer is None:
+                trace.tracer.count("layout.apportion_calls")
+                trace.tracer.count("layout.apportion_iterations", loop_i)
+
             vil_next_right = self.layout_next_element(vil, direction="right")
             if not vil_next_right is None and self.layout_next_element(vor, direction="right") is None:# and not vil_next_right == vor:
-                logger.debug("<Branch %i> Setting thread from %s to %s", self.id, vor, vil_next_right)
                 vor_el.layout_thread = vil_next_right
                 vor_el.layout_mod += sil - sor
             else:
                 vir_next_left = self.layout_next_element(vir, direction="left")
                 if not vir_next_left is None and self.layout_next_element(vol, direction="left") is None:# and not vir_next_left == vol:
-                    logger.debug("<Branch %i> Setting thread from %s to %s", self.id, vol, vir_next_left)
                     vol_el.layout_thread = vir_next_left
                     vol_el.layout_mod += sir - sol
                 default_ancestor = v
@@ -314,13 +382,11 @@ class Branch(object):
         return default_ancestor
 
     def layout_oldest_sibling(self, v):
-        logger.debug("<Branch %i> layout_oldest_sibling - v: %s", self.id, v)
         if "children" in self._graph.node[v]:
             return self._graph.node[v]["children"][0]
         return None
 
     def layout_left_sibling(self, v):
-        logger.debug("<Branch %i> layout_left_sibling - v: %s", self.id, v)
         in_edges = self._graph.in_edges(nbunch=(v))
         if len(in_edges) > 0:
             parent = in_edges[0][0]
@@ -333,7 +399,6 @@ class Branch(object):
         return None
 
     def layout_next_element(self, v, direction="left"):
-        logger.debug("<Branch %i> layout_next_element - Element: %s direction: %s", self.id, v, direction)
         if not self._graph.has_node(v):
             logger.error("<Branch %i> layout_next_element - Graph does not contain node: %s", self.id, v)
             return None
@@ -344,10 +409,8 @@ class Branch(object):
                 index = -1
             else:
                 index = 0
-            logger.debug("<Branch %i> layout_next_element - Element: %s returning %s child at index %i: %s", self.id, v, direction, index, str(self._graph.node[v]["children"][index]))
             return self._graph.node[v]["children"][index]
         else:
-            logger.debug("<Branch %i> layout_next_element - Element: %s returning thread: %s", self.id, v, str(self._graph.node[v]["el"].layout_thread))
             return self._graph.node[v]["el"].layout_thread
 
     def layout_move_subtree(self, vl, vr, shift):
@@ -358,7 +421,8 @@ class Branch(object):
         # subtrees = max(1, vr_el.layout_number - vl_el.layout_number)
         # subtrees = 1
         subtrees = vr_el.layout_number - vl_el.layout_number
-        logger.info("<Branch %i> layout_move_subtree - vl: %s, vr: %s, shift: %.2f, subtrees: %i", self.id, vl, vr, shift, subtrees)
+        if not trace.tracer is None:
+            trace.tracer.count("layout.subtree_moves")
         vr_el.layout_change -= shift / subtrees
         vr_el.layout_shift += shift
         vl_el.layout_change -= shift / subtrees
@@ -367,7 +431,6 @@ class Branch(object):
 
     def layout_execute_shift(self, v):
         if "children" in self._graph.node[v]:
-            logger.debug("<Branch %i, node %s> Executing shift", self.id, v)
             shift = 0
             change = 0
             for child in reversed(self._graph.node[v]["children"]):
@@ -378,7 +441,6 @@ class Branch(object):
                 shift += child_el.layout_shift + change
 
     def layout_left_ancestor(self, vil, v, default_ancestor):
-        logger.info("<Branch %i> layout_left_ancestor - vil: %s  v: %s  default_ancestor: %s", self.id, vil, v, default_ancestor)
         if self._graph.has_node(vil):
             vil_ancestor = self._graph.node[vil]["el"].layout_ancestor
             if not vil_ancestor is None:
@@ -391,22 +453,24 @@ class Branch(object):
         return default_ancestor
 
     def layout_second_walk(self, v, shift, depth, height=0):
-        el = self._graph.node[v]["el"]
-        el.x = el.layout_prelim + shift
-        el.y = depth
-        logger.debug("<Branch %i> Element: %s (%.1f, %.1f)", self.id, v, el.x, el.y)
-        logger.debug("<Branch %i> Element: %s (%.1f, %.1f) prelim: %.1f, mod: %.1f, change: %.1f", self.id, v, el.x, el.y, el.layout_prelim, el.layout_mod, el.layout_change)
-        if self._extremes[0] is None or el.x < self._extremes[0]:
-            self._extremes[0] = el.x
-        if self._extremes[1] is None or el.x > self._extremes[1]:
-            self._extremes[1] = el.x
-        if self._extremes[2] is None or el.y < self._extremes[2]:
-            self._extremes[2] = el.y
-        if self._extremes[3] is None or el.y > self._extremes[3]:
-            self._extremes[3] = el.y
-        if "children" in self._graph.node[v]:
-            for child in self._graph.node[v]["children"]:
-                self.layout_second_walk(child, shift + el.layout_mod, depth + height, height)
+        """Sets final coordinates of elements in pre-order from v and updates extremes"""
+        stack = [(v, shift, depth)]
+        while len(stack) > 0:
+            v, shift, depth = stack.pop()
+            el = self._graph.node[v]["el"]
+            el.x = el.layout_prelim + shift
+            el.y = depth
+            if self._extremes[0] is None or el.x < self._extremes[0]:
+                self._extremes[0] = el.x
+            if self._extremes[1] is None or el.x > self._extremes[1]:
+                self._extremes[1] = el.x
+            if self._extremes[2] is None or el.y < self._extremes[2]:
+                self._extremes[2] = el.y
+            if self._extremes[3] is None or el.y > self._extremes[3]:
+                self._extremes[3] = el.y
+            if "children" in self._graph.node[v]:
+                for child in reversed(self._graph.node[v]["children"]):
+                    stack.append((child, shift + el.layout_mod, depth + height))
 
     def set_coordinates(self, x, y):
         """Sets coordinates for branch and applies changes to all nodes"""
@@ -437,6 +501,39 @@ class Branch(object):
             for vid, data in self._graph.nodes(data=True)
         ]
 
+    def layout_inputs(self):
+        """Returns picklable structure, node sizes and child sort keys of branch for _layout_branch()"""
+        nodes = []
+        edges = []
+        for vid, data in self._graph.nodes_iter(data=True):
+            # Layout measures widths with size() and heights with the height attribute
+            width = data["el"].size()[0]
+            height = data["el"].height
+            sort_key = self._sort_children(vid) if len(self._graph.in_edges(vid)) > 0 else None
+            nodes.append((vid, width, height, sort_key))
+            # Preserve child order so that ties in sort keys resolve as in a local layout
+            edges.extend((vid, child) for child in self._graph.edge[vid])
+        return self.id, nodes, edges, self.font_size, self.hmargin, self.node_height
+
+    def layout_state(self):
+        """Returns layout attributes of each node in branch"""
+        return {
+            vid: tuple(getattr(data["el"], attr) for attr in LAYOUT_ATTRIBUTES)
+            for vid, data in self._graph.nodes_iter(data=True)
+        }
+
+    def apply_layout_state(self, state, extremes):
+        """Applies layout attributes from layout_state() and updates branch extremes and size"""
+        for vid, values in state.items():
+            el = self._graph.node[vid]["el"]
+            for attr, value in zip(LAYOUT_ATTRIBUTES, values):
+                setattr(el, attr, value)
+        self.x = 0
+        self.y = 0
+        self._extremes = list(extremes)
+        self.width = self._extremes[1] - self._extremes[0]
+        self.height = self._extremes[3] - self._extremes[2]
+
     def extremes(self):
         """Returns coordinate extremes for branch"""
         return self._extremes
@@ -445,28 +542,68 @@ class Branch(object):
         """Returns overall width and height for branch"""
         return self.width, self.height
 
+    def shows_layout_fields(self):
+        """Returns whether any label in branch shows layout fields, so that node sizes change during layout"""
+        return any(data["el"].shows_layout_fields() for vid, data in self._graph.nodes_iter(data=True))
+
 
 class FamilyGraph(object):
-    def __init__(self, pedigree, font_size, hmargin=10, node_height=50, page_margin=10):
+    def __init__(self, pedigree, font_size, hmargin=10, node_height=50, page_margin=10, layout_workers=None,
+                    proband=None, direction="both", generations=None, layout_cache=None, packing="shelf", aspect_ratio=2**0.5):
+        """
+        FamilyGraph - defines the graph of families and individuals in a pedigree and its layout
+
+        :param pedigree: Pedigree to lay out
+        :type pedigree: Pedigree
+        :param layout_workers: Number of processes used to lay out branches in parallel; lays out in this process if not specified.
+            Parallel layout uses node sizes from before layout, so branches whose labels show layout fields are laid out serially.
+        :type layout_workers: int
+        :param proband: Individual ID whose neighbourhood is graphed; whole pedigree is graphed if not specified
+        :type proband: int
+        :param direction: Relatives of proband to graph: "ancestors", "descendants" or "both"
+        :type direction: str
+        :param generations: Maximum number of generations from proband; unlimited if not specified
+        :type generations: int
+        :param layout_cache: Cache of branch layouts from previous builds; only branches not in the cache are laid out.
+            Like parallel layout, cached layouts use node sizes from before layout, so branches whose labels show layout fields are not cached.
+        :type layout_cache: LayoutCache
+        :param packing: Placement of branches on the canvas: "shelf" packs them onto rows of similar height, "row" places them in a single row
+        :type packing: str
+        :param aspect_ratio: Target width to height ratio of the canvas for shelf packing
+        :type aspect_ratio: float
+        """
         self._pedigree = pedigree
         self.hmargin = hmargin
         self.node_height = node_height
         self.page_margin = page_margin
         self.font_size = font_size
+        self.layout_workers = layout_workers
+        self.proband = proband
+        self.direction = direction
+        self.generations = generations
+        self.layout_cache = layout_cache
+        self.packing = packing
+        self.aspect_ratio = aspect_ratio
         self._branches = []
         self._duplicate_people = set()
-        self._graph = None
-        self._branched_graph = None
-        self._undirected_graph = None
+        self._forest = None
+        self._nodes = {}
+        self._components = {}
         self._branch_links = set()
-        self._create()
-        self._layout()
+        self._spatial_index = None
+        with trace.span("FamilyGraph._create"):
+            self._create()
+        with trace.span("FamilyGraph._layout", branches=len(self._branches)):
+            self._layout()
+
+    def __len__(self):
+        return len(self._nodes)
 
     def has_node(self, node):
-        return self._branched_graph.has_node(node)
+        return node in self._nodes
 
     def has_edge(self, u, v):
-        return self._branched_graph.has_edge(u, v)
+        return self._forest.has_edge(u, v)
 
     def extremes(self):
         """Returns coordinate extremes for familygraph"""
@@ -476,53 +613,37 @@ class FamilyGraph(object):
             for i in range(4):
                 if bext[i] is None: #TODO
                     continue
-                if extremes[i] is None or (i%2 == 0 and bext[i] < extremes[i]) or (bext[i] > extremes[i]):
+                if extremes[i] is None or (i%2 == 0 and bext[i] < extremes[i]) or (i%2 == 1 and bext[i] > extremes[i]):
                     extremes[i] = bext[i]
         return extremes
 
+    def branch_extremes(self):
+        """Returns coordinate extremes of each branch"""
+        return [branch.extremes() for branch in self._branches]
+
     def is_consanguineous(self, pid1, pid2):
         """Returns whether the specified individual IDs share a bloodline"""
         # Check for basic path between individuals, otherwise have to look at families
-        graph_pid1 = "P{0}".format(pid1)
-        graph_pid2 = "P{0}".format(pid2)
-        if graph_pid1 in self._undirected_graph and \
-                    graph_pid2 in self._undirected_graph and \
-                    nx.has_path(self._undirected_graph, graph_pid1, graph_pid2):
-            return True
-        # Get individuals
-        p1 = self._pedigree.individual(pid1)
-        p2 = self._pedigree.individual(pid2)
-
-        if graph_pid1 not in self._undirected_graph and graph_pid2 in self._undirected_graph:
-            # Get first person's families
-            f1 = ["F{0}".format(family.id) for family in p1.families()]
-            # Check for path from first person's families to second person
-            if any(nx.has_path(self._undirected_graph, f, graph_pid2) for f in f1 if f in self._undirected_graph):
-                return True
-
-        if graph_pid1 in self._undirected_graph and graph_pid2 not in self._undirected_graph:
-            # Get second person's families
-            f2 = ["F{0}".format(family.id) for family in p2.families()]
-            # Check for path from first person families to second person
-            if any(nx.has_path(self._undirected_graph, f, graph_pid1) for f in f2 if f in self._undirected_graph):
-                return True
-
-        if graph_pid1 not in self._undirected_graph and graph_pid2 not in self._undirected_graph:
-            # Get families
-            f1 = ["F{0}".format(family.id) for family in p1.families()]
-            f2 = ["F{0}".format(family.id) for family in p2.families()]
-            # If if one of the individuals has no families, don't continue
-            if len(f1) == 0 or len(f2) == 0:
-                return False
-            # Check for paths between combinations of families, otherwise, individuals are not consanguineous
-            return any(nx.has_path(self._undirected_graph, family1, family2)
-                        for family1, family2 in itertools.product(f1, f2)
-                        if family1 in self._undirected_graph and family2 in self._undirected_graph)
-
-        return False
+        graph_pid1 = pid1 << 1
+        graph_pid2 = pid2 << 1
+        if graph_pid1 in self._components and graph_pid2 in self._components:
+            return self._components[graph_pid1] == self._components[graph_pid2]
+
+        # Get components of individuals, or of their families if not a vertex
+        c1 = self._individual_components(graph_pid1, pid1)
+        c2 = self._individual_components(graph_pid2, pid2)
+        # If one of the individuals has no families, individuals are not consanguineous
+        return not c1.isdisjoint(c2)
+
+    def _individual_components(self, vid, pid):
+        """Returns component labels of individual vertex or of individual's families"""
+        if vid in self._components:
+            return set([self._components[vid]])
+        families = (family_vertex(family.id) for family in self._pedigree.individual(pid).families())
+        return set(self._components[f] for f in families if f in self._components)
 
     def items(self):
-        return self._branched_graph.nodes_iter(data=True)
+        return ((vid, self._nodes[vid]) for vid in self._forest.vertices)
 
     def branch_links(self):
         return self._branch_links
@@ -532,50 +653,72 @@ class FamilyGraph(object):
 
     def node(self, id):
         try:
-            return self._branched_graph.node[id]
+            return self._nodes[id]
         except:
             logger.warn("Could not retrieve %s node from familygraph", id)
             return None
 
+    def spatial_index(self):
+        """Returns SpatialIndex of laid out individuals and families, built on first call
+
+        Items are vertex IDs; parents, which are drawn as part of their family vertex,
+        are indexed by their own individual vertex ID. Each element is indexed by its
+        layout box, from its coordinates to its label width and the node height.
+        """
+        if self._spatial_index is None:
+            index = SpatialIndex(cell_size=self.node_height*2)
+            for vid, data in self.items():
+                el = data["el"]
+                index.add(vid, el.x, el.y, el.x + el.size()[0], el.y + self.node_height)
+                if type(el) is Family:
+                    for parent in el.parents():
+                        if not parent is None:
+                            index.add(individual_vertex(parent.id), parent.x, parent.y,
+                                        parent.x + parent.size()[0], parent.y + self.node_height)
+            self._spatial_index = index
+            logger.debug("Indexed %i laid out elements", len(index))
+        return self._spatial_index
+
     def _create(self):
-        """Returns NetworkX directed graph of vertices in pedigree"""
+        """Creates branching of graph of vertices in pedigree and its branches"""
         logger.info("Creating family graph")
         create_start = time.time()
-        self._graph = nx.DiGraph()
 
         vertices = {}
+        children = {}
         self._branch_links = set()
 
-        # Create vertices
-        for el in self._pedigree.vertices():
+        # Create vertices, of the proband's neighbourhood only if specified
+        neighbourhood = None
+        if not self.proband is None:
+            neighbourhood = self._pedigree.neighbourhood(self.proband, self.direction, self.generations)
+            logger.info("Graphing %i individuals and %i families within %s generations of proband %s",
+                        len(neighbourhood[0]), len(neighbourhood[1]), self.generations, self.proband)
+        for el in self._pedigree.vertices(neighbourhood):
             if type(el) is Family:
-                vid = "F{0}".format(el.id)
+                vid = (el.id << 1) | FAMILY_TAG
             else:
-                vid = "P{0}".format(el.id)
-            # Add node to graph
-            self._graph.add_node(vid, el=el)
+                vid = el.id << 1
             vertices[vid] = el
+            # Children are kept in edge order, without repeated edges
+            children[vid] = {}
 
         for vid, v in vertices.items():
-            logger.debug("Adding vertex %s of type %s", vid, type(v))
             if type(v) is Family:
                 # Note: don't have to reach up to parent's families because they are captured in another family's down edges
                 # A family typed vertex has children, which may be in families
-                logger.debug("Family has %i children", v.children_count())
-                children = v.children()
-                for child in children:
+                for child in v.children():
                     if child.is_parent():
-                        logger.debug("Child is parent: %s", child.id)
                         for family in self._pedigree.families_with_parent(child.id):
-                            fid = "F{0}".format(family.id)
-                            self._graph.add_edge(vid, fid, link="standard")
-                            # self._graph.node[fid]["sibling"] = children.index(child)
-                            logger.debug("Adding edge %s to %s", vid, fid)
+                            fid = (family.id << 1) | FAMILY_TAG
+                            if not fid in vertices:
+                                continue
+                            children[vid][fid] = None
                     else:
-                        cid = "P{0}".format(child.id)
-                        self._graph.add_edge(vid, cid, link="standard")
-                        # self._graph.node[cid]["sibling"] = children.index(child)
-                        logger.debug("Adding edge %s to %s", vid, cid)
+                        cid = child.id << 1
+                        if not cid in vertices:
+                            continue
+                        children[vid][cid] = None
             else:
                 # An individual typed vertex does not have any children; get family for edges into vertex
                 mother = v.mother
@@ -590,58 +733,54 @@ class FamilyGraph(object):
                 else:
                     families = self._pedigree.families_with_parent([mother, father])
 
-                logger.debug("Number of families for vertex %s: %i", vid, len(families))
-
                 for family in families:
-                    self._graph.add_edge("F{0}".format(family.id), vid, link="standard")
-                    logger.debug("Adding edge %s to %s", "F{0}".format(family.id), vid)
+                    fid = (family.id << 1) | FAMILY_TAG
+                    if not fid in vertices:
+                        continue
+                    children[fid][vid] = None
 
         # Create branched graph
-        self._branched_graph = nx.maximum_branching(self._graph)
-
-        for v, d in self._graph.nodes_iter(data=True):
-            for k, val in d.items():
-                self._branched_graph.node[v][k] = val
+        self._forest = Forest(vertices, children)
 
         # Add duplicate children to support cross-branch links
-        removed_edges = set(self._graph.edges_iter()) - set(self._branched_graph.edges_iter())
-        for (nid1, nid2) in removed_edges:
-            # Update original graph
-            self._graph[nid1][nid2]["link"] = "branch"
+        for (nid1, nid2) in self._forest.removed_edges:
             # Create cross-branch links
-            if nid2[0] == "F":
-                children = self._pedigree.family(int(nid2[1:])).parents()
+            if nid2 & FAMILY_TAG:
+                duplicated = self._pedigree.family(nid2 >> 1).parents()
             else:
-                children = [self._pedigree.individual(int(nid2[1:]))]
+                duplicated = [self._pedigree.individual(nid2 >> 1)]
 
-            if nid1[0] == "F":
-                family = self._pedigree.family(int(nid1[1:]))
-                for child in children:
+            if nid1 & FAMILY_TAG:
+                family = self._pedigree.family(nid1 >> 1)
+                for child in duplicated:
                     if family.contains_child(child.id):
                         duplicate_child = self._pedigree.duplicate_individual(child)
                         # vwidth = calculate_text_size(el.output_text(), self._font_size)[0]
-                        self._branched_graph.add_node("P{0}".format(duplicate_child.id), el=duplicate_child)
-                        self._branched_graph.add_edge(nid1, "P{0}".format(duplicate_child.id))
+                        vertices[duplicate_child.id << 1] = duplicate_child
+                        self._forest.add_leaf(nid1, duplicate_child.id << 1)
                         self._branch_links.add((child.id, duplicate_child.id))
                         logger.debug("Added duplicate child: %i, %i", child.id, duplicate_child.id)
 
-        # Create an undirected copy of graph
-        self._undirected_graph = self._graph.to_undirected()
-
-        # logger.info("Family graph creation took %.2fs", time.time()-create_start)
-        # logger.info("Creating branches")
-        # branch_start = time.time()
+        # Label connected components of graph for constant-time path lookups
+        self._components = self._forest.components()
 
-        # Create branches
-        self._branches = [Branch(id=i,
-                                subgraph=component,
-                                parent=self,
-                                font_size=self.font_size,
-                                hmargin=self.hmargin,
-                                node_height=self.node_height)
-                            for i, component in enumerate(nx.weakly_connected_component_subgraphs(self._branched_graph, copy=False))]
-
-        # logger.info("Branch creation took %.4fs", time.time()-branch_start)
+        # Create branches, each with its own graph of its tree
+        self._nodes = {}
+        self._branches = []
+        for i, tree in enumerate(self._forest.trees()):
+            graph = nx.DiGraph()
+            for vid in tree:
+                graph.add_node(vid, el=vertices[vid])
+            for vid in tree:
+                graph.add_edges_from((vid, child) for child in self._forest.children[vid])
+            for vid in tree:
+                self._nodes[vid] = graph.node[vid]
+            self._branches.append(Branch(id=i,
+                                        subgraph=graph,
+                                        parent=self,
+                                        font_size=self.font_size,
+                                        hmargin=self.hmargin,
+                                        node_height=self.node_height))
 
         logger.info("Family graph and branch creation took %.2fs", time.time()-create_start)
 
@@ -650,67 +789,178 @@ class FamilyGraph(object):
         logger.info("Starting graph layout for %i branches", len(self._branches))
         layout_start = time.time()
 
-        branch_graph = nx.Graph()
-
-        x = self.page_margin
-        y = self.page_margin
+        # Parallel and cached layouts use node sizes from before layout, so branches whose
+        # labels show layout fields, and change size during layout, are laid out serially
+        parallel = not self.layout_workers is None and self.layout_workers > 1
+        presized = set(branch for branch in self._branches if not branch.shows_layout_fields())
+        if (parallel or not self.layout_cache is None) and len(presized) < len(self._branches):
+            logger.warn("Labels of %i of %i branches show layout fields: laying them out serially without the layout cache",
+                        len(self._branches)-len(presized), len(self._branches))
+
+        # Reuse cached layouts of unchanged branches
+        pending = self._branches
+        signatures = {}
+        if not self.layout_cache is None:
+            pending = self._apply_cached_layouts(signatures, presized)
+
+        remote = [branch for branch in pending if branch in presized] if parallel else []
+        if len(remote) > 0:
+            with trace.span("FamilyGraph._layout_branches_parallel", branches=len(remote)):
+                self._layout_branches_parallel(remote)
+        pending = set(pending).difference(remote)
 
         for i, branch in enumerate(self._branches):
             branch_layout_start = time.time()
             # try:
-            branch.layout()
-            branch.set_coordinates(x, y)
-            branch.persist_coordinates()
+            if branch in pending:
+                with trace.span("Branch.layout", branch=i, nodes=len(branch)):
+                    branch.layout()
+            if branch in signatures and branch in pending:
+                self._cache_layout(branch, *signatures[branch])
             bwidth, bheight = branch.size()
-            x += bwidth + self.hmargin*10
-            # y += bheight + self.node_height*2
             logger.debug("<Branch %i> Width: %.2f Height: %.2f", i, bwidth, bheight)
             logger.debug("<Branch %i> layout took: %.4fs", i, time.time()-branch_layout_start)
             # except Exception as e:
             #     logger.warn("Error laying out branch %i:\t%s\n%s", i, sys.exc_info()[0], "".join(traceback.format_tb(sys.exc_info()[2])))
-        logger.info("Graph layout took: %.2fs", time.time()-layout_start)
-
-
 
+        # Place branches on canvas
+        for branch, (x, y) in zip(self._branches, self._branch_positions()):
+            branch.set_coordinates(x, y)
+            branch.persist_coordinates()
+        logger.info("Graph layout took: %.2fs", time.time()-layout_start)
 
-        # layout_start = time.time()
-
-        # branch_graph = self._graph.copy()
-        # remove_edges = [(u,v) for u, v, d in branch_graph.edges_iter(data=True) if d["link"] == "standard"]
-        # branch_graph.remove_edges_from(remove_edges)
-        # branched_edges = branch_graph.edges()
-        # branched_nodes = {}
-        # for u, v in branched_edges:
-        #     branched_nodes[u] = set()
-        #     branched_nodes[v] = set()
-
-        # branch_graph = nx.Graph()
-
-        # for i, branch in enumerate(self._branches):
-        #     branch_layout_start = time.time()
-        #     branch.layout()
-        #     bwidth, bheight = branch.size()
-        #     branch_graph.add_node(i, width=bwidth, height=bheight)
-        #     logger.info("<Branch %i> Added node to branch graph width: %i height: %i", i, bwidth, bheight)
-        #     for k in branched_nodes:
-        #         if k in branch:
-        #             branched_nodes[k].add(i)
-        #     logger.info("Branch %i layout took: %.4fs", i, time.time() - branch_layout_start)
-
-        # for u, v in branched_edges:
-        #     for s, t in itertools.product(branched_nodes[u], branched_nodes[v]):
-        #         if branch_graph.has_edge(s, t):
-        #             branch_graph.edge[s][t]["weight"] += 1
-        #         else:
-        #             branch_graph.add_edge(s, t, weight=1)
-
-        # branch_pos = nx.spring_layout(branch_graph, dim=5000, k=len(branch_graph))
+    def _branch_positions(self):
+        """Returns canvas position of each laid out branch"""
+        hspace = self.hmargin*10
+        if self.packing == "row":
+            positions = []
+            x = self.page_margin
+            for branch in self._branches:
+                positions.append((x, self.page_margin))
+                x += branch.size()[0] + hspace
+            return positions
+        elif self.packing == "shelf":
+            positions = shelf_pack([branch.size() for branch in self._branches],
+                                    groups=self._branch_groups(),
+                                    spacing=(hspace, self.node_height*2),
+                                    aspect_ratio=self.aspect_ratio)
+            return [(x+self.page_margin, y+self.page_margin) for x, y in positions]
+        else:
+            raise Exception("Unknown branch packing: {0}".format(self.packing))
 
-        # for i, branch in enumerate(self._branches):
-        #     logger.info("<Branch %i> Set branch position to x: %.2f y: %.2f", i, 6000*branch_pos[i][0]+x, 6000*branch_pos[i][0]+y)
-        #     branch.set_coordinates(6000*branch_pos[i][0]+x, 6000*branch_pos[i][0]+y)
-        #     branch.persist_coordinates()
+    def _branch_groups(self):
+        """Returns group of each branch, where branches joined by duplicate individual links share a group"""
+        branch_of = {}
+        for i, branch in enumerate(self._branches):
+            for vid in branch._graph.nodes_iter():
+                branch_of[vid] = i
+
+        # Union-find over branches, labelling each group by its lowest branch index
+        groups = list(range(len(self._branches)))
+        def find(i):
+            while groups[i] != i:
+                groups[i] = groups[groups[i]]
+                i = groups[i]
+            return i
+
+        for original, duplicate in self._branch_links:
+            a = self._individual_branch(original, branch_of)
+            b = self._individual_branch(duplicate, branch_of)
+            if a is None or b is None:
+                continue
+            a, b = find(a), find(b)
+            if a != b:
+                groups[max(a, b)] = min(a, b)
+        return [find(i) for i in range(len(groups))]
+
+    def _individual_branch(self, pid, branch_of):
+        """Returns branch index of individual vertex, or of individual's family if individual is a parent"""
+        vid = individual_vertex(pid)
+        if vid in branch_of:
+            return branch_of[vid]
+        for family in self._pedigree.individual_families(pid, role="parent"):
+            fid = family_vertex(family.id)
+            if fid in branch_of:
+                return branch_of[fid]
+        return None
 
-        # logger.info("Graph layout took: %.4fs", time.time() - layout_start)
+    def _layout_signature(self, branch, duplicates):
+        """Returns layout signature of branch and canonical labels of its nodes
 
+        Nodes are labelled (vertex ID, 0). Duplicate individuals get new IDs each time
+        the graph is created, so they are labelled by the vertex ID of the individual
+        they duplicate and their copy number.
 
+        :param duplicates: Original individual ID of each duplicate vertex ID
+        :type duplicates: dict
+        """
+        id, nodes, edges, font_size, hmargin, node_height = branch.layout_inputs()
+        labels = {}
+        counts = {}
+        for vid, width, height, sort_key in nodes:
+            if vid in duplicates:
+                original = duplicates[vid]
+                counts[original] = counts.get(original, 0) + 1
+                labels[vid] = (individual_vertex(original), counts[original])
+            else:
+                labels[vid] = (vid, 0)
+        return layout_signature(nodes, edges, labels, (font_size, hmargin, node_height)), labels
+
+    def _relabel_state(self, state, labels):
+        """Returns layout state with node IDs, including referenced IDs, replaced by labels"""
+        references = [LAYOUT_ATTRIBUTES.index(attr) for attr in LAYOUT_REFERENCES]
+        relabeled = {}
+        for vid, values in state.items():
+            values = list(values)
+            for i in references:
+                if not values[i] is None:
+                    values[i] = labels[values[i]]
+            relabeled[labels[vid]] = tuple(values)
+        return relabeled
+
+    def _apply_cached_layouts(self, signatures, presized):
+        """Applies cached layouts to unchanged branches and returns branches still to lay out
+
+        :param signatures: Filled with layout signature and node labels of each branch which can be cached
+        :type signatures: dict
+        :param presized: Branches whose node sizes do not change during layout; only these are cached
+        :type presized: set
+        """
+        duplicates = {individual_vertex(dup): original for original, dup in self._branch_links}
+        pending = []
+        for branch in self._branches:
+            if not branch in presized:
+                pending.append(branch)
+                continue
+            signature, labels = self._layout_signature(branch, duplicates)
+            signatures[branch] = (signature, labels)
+            entry = self.layout_cache.get(signature)
+            if entry is None:
+                pending.append(branch)
+                continue
+            state, extremes = entry
+            vids = dict((label, vid) for vid, label in labels.items())
+            branch.apply_layout_state(self._relabel_state(state, vids), extremes)
+        logger.info("Reusing cached layouts for %i of %i branches", len(self._branches)-len(pending), len(self._branches))
+        return pending
+
+    def _cache_layout(self, branch, signature, labels):
+        """Stores relative layout of branch in layout cache"""
+        self.layout_cache.put(signature, self._relabel_state(branch.layout_state(), labels), branch.extremes())
+
+    def _layout_branches_parallel(self, branches=None):
+        """Lays out branches in a process pool and applies resulting layouts to branches
+
+        :param branches: Branches to lay out; all branches if not specified
+        :type branches: list
+        """
+        if branches is None:
+            branches = self._branches
+        logger.info("Laying out %i branches with %i processes", len(branches), self.layout_workers)
+        # Submit largest branches first so that they do not finish last
+        branches = sorted(branches, key=len, reverse=True)
+        chunksize = max(1, len(branches) // (self.layout_workers*4))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.layout_workers) as executor:
+            results = executor.map(_layout_branch, [branch.layout_inputs() for branch in branches], chunksize=chunksize)
+            for branch, (state, extremes) in zip(branches, results):
+                branch.apply_layout_state(state, extremes)
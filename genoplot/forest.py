@@ -0,0 +1,104 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import logging
+logger = logging.getLogger("genoplot")
+
+
+def _find(roots, v):
+    """Returns representative of v in union-find forest, halving the path to it"""
+    while roots[v] != v:
+        roots[v] = roots[roots[v]]
+        v = roots[v]
+    return v
+
+
+class Forest(object):
+    def __init__(self, vertices, children):
+        """
+        Forest - defines a maximum branching of a directed graph, with connected components of the graph and of the branching
+
+        Each vertex keeps the edge from its first parent in vertex order and every other
+        edge into it is removed, so each tree has a single root. This is the branching
+        networkx.maximum_branching() finds for unweighted graphs without directed cycles;
+        an edge which would close a cycle is removed too. The branching and both sets of
+        components are built in one pass over the edges.
+
+        :param vertices: Vertex IDs in graph order
+        :type vertices: list
+        :param children: Child vertex IDs of each vertex in edge order; children must be vertices
+        :type children: dict
+        """
+        self.vertices = list(vertices)
+        self.parent = {}
+        self.children = {}
+        self.removed_edges = []
+        self._graph_roots = {}
+        self._tree_roots = {}
+        for v in self.vertices:
+            self.children[v] = []
+            self._graph_roots[v] = v
+            self._tree_roots[v] = v
+
+        graph_roots = self._graph_roots
+        tree_roots = self._tree_roots
+        for u in self.vertices:
+            for v in children.get(u, ()):
+                a, b = _find(graph_roots, u), _find(graph_roots, v)
+                if a != b:
+                    graph_roots[b] = a
+                # v is the root of its tree until it has a parent, so u in the same tree would close a cycle
+                a, b = _find(tree_roots, u), _find(tree_roots, v)
+                if v in self.parent or a == b:
+                    self.removed_edges.append((u, v))
+                else:
+                    self.parent[v] = u
+                    self.children[u].append(v)
+                    tree_roots[b] = a
+
+    def __len__(self):
+        return len(self.vertices)
+
+    def __contains__(self, v):
+        return v in self.children
+
+    def has_edge(self, u, v):
+        """Returns whether the branching has an edge from u to v"""
+        return v in self.parent and self.parent[v] == u
+
+    def add_leaf(self, parent, v):
+        """Adds vertex v to the branching as the last child of parent
+
+        Leaves are part of their parent's tree but not of the graph components.
+        """
+        self.vertices.append(v)
+        self.parent[v] = parent
+        self.children[v] = []
+        self.children[parent].append(v)
+        self._tree_roots[v] = _find(self._tree_roots, parent)
+
+    def components(self):
+        """Returns label of the weakly connected component of the graph containing each vertex
+
+        Components are labelled in order of their first vertex.
+        """
+        labels = {}
+        components = {}
+        for v in self._graph_roots:
+            root = _find(self._graph_roots, v)
+            if not root in components:
+                components[root] = len(components)
+            labels[v] = components[root]
+        return labels
+
+    def trees(self):
+        """Returns list of vertices of each tree of the branching, in order of their first vertex"""
+        trees = {}
+        for v in self.vertices:
+            trees.setdefault(_find(self._tree_roots, v), []).append(v)
+        return list(trees.values())
@@ -0,0 +1,190 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import logging, calendar, collections, datetime, functools
+logger = logging.getLogger("genoplot")
+
+# Parsed date: key is a sortable (year, month, day) tuple, with 0 for unknown month or day,
+# or None if the date could not be parsed; display is the date text, normalized if requested
+GedcomDate = collections.namedtuple("GedcomDate", ["key", "display"])
+
+MONTHS = ("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC")
+MONTH_NAMES = ("JANUARY", "FEBRUARY", "MARCH", "APRIL", "MAY", "JUNE", "JULY", "AUGUST", "SEPTEMBER", "OCTOBER", "NOVEMBER", "DECEMBER")
+QUALIFIERS = {
+    "ABT": "abt.",
+    "CAL": "cal.",
+    "EST": "est.",
+    "BEF": "bef.",
+    "AFT": "aft.",
+    "INT": "int.",
+}
+
+
+def parse_date(value, normalize=False):
+    """Returns GedcomDate for GEDCOM date value
+
+    Parses the GEDCOM 5.5 date grammar: dates (day, month and year, with dual
+    years and B.C.), approximated dates (ABT, CAL, EST), ranges (BEF, AFT,
+    BET ... AND ...), periods (FROM ... TO ...) and interpreted dates. Values
+    outside the grammar are parsed with dateparser, once per distinct value.
+
+    :param value: GEDCOM date value
+    :type value: str
+    :param normalize: Whether display text is normalized, e.g. "abt. 3 Mar 1900"; the value is displayed as given otherwise
+    :type normalize: bool
+    """
+    original = value
+    value = value.strip()
+    tokens = value.replace(",", " ").split()
+    if len(tokens) > 0 and tokens[0].startswith("~"):
+        # Non-standard approximation marker
+        tokens[0] = tokens[0][1:]
+        tokens.insert(0, "ABT")
+        tokens = [t for t in tokens if len(t) > 0]
+    try:
+        date = _parse_tokens(tokens)
+    except ValueError:
+        return GedcomDate(_parse_free_form(_strip_keywords(tokens)), value if normalize else original)
+    return date if normalize else GedcomDate(date.key, original)
+
+
+def _parse_tokens(tokens):
+    """Returns GedcomDate for date value tokens; raises ValueError if outside of GEDCOM grammar"""
+    if len(tokens) == 0:
+        raise ValueError("Empty date")
+    keyword = _keyword(tokens[0])
+
+    if keyword in QUALIFIERS:
+        rest = tokens[1:]
+        phrase = None
+        if keyword == "INT":
+            # Interpreted date may be followed by the original phrase
+            for i, t in enumerate(rest):
+                if t.startswith("("):
+                    phrase = " ".join(rest[i:])
+                    rest = rest[:i]
+                    break
+        key, display = _parse_single(rest)
+        display = "{0} {1}".format(QUALIFIERS[keyword], display)
+        if not phrase is None:
+            display = "{0} {1}".format(display, phrase)
+        return GedcomDate(key, display)
+    elif keyword == "BET":
+        i = _index_keyword(tokens, "AND")
+        key, first = _parse_single(tokens[1:i])
+        second = _parse_single(tokens[i+1:])[1]
+        return GedcomDate(key, "bet. {0} and {1}".format(first, second))
+    elif keyword == "FROM":
+        if "TO" in (_keyword(t) for t in tokens):
+            i = _index_keyword(tokens, "TO")
+            key, first = _parse_single(tokens[1:i])
+            second = _parse_single(tokens[i+1:])[1]
+            return GedcomDate(key, "from {0} to {1}".format(first, second))
+        key, first = _parse_single(tokens[1:])
+        return GedcomDate(key, "from {0}".format(first))
+    elif keyword == "TO":
+        key, second = _parse_single(tokens[1:])
+        return GedcomDate(key, "to {0}".format(second))
+    elif tokens[0].startswith("(") and tokens[-1].endswith(")"):
+        # Date phrase
+        raise ValueError("Date phrase")
+    return GedcomDate(*_parse_single(tokens))
+
+
+def _keyword(token):
+    return token.upper().rstrip(".")
+
+
+def _index_keyword(tokens, keyword):
+    for i, t in enumerate(tokens):
+        if _keyword(t) == keyword:
+            return i
+    raise ValueError("Missing {0}".format(keyword))
+
+
+def _strip_keywords(tokens):
+    """Returns date text without GEDCOM keywords and calendar escapes"""
+    keywords = set(QUALIFIERS) | set(["BET", "AND", "FROM", "TO"])
+    return " ".join(t for t in tokens if not _keyword(t) in keywords and not t.startswith("@#")).strip("() ")
+
+
+def _parse_single(tokens):
+    """Returns sortable key and display text for [day] [month] year tokens"""
+    julian = any(t.upper() == "@#DJULIAN@" for t in tokens)
+    tokens = [t for t in tokens if not t.startswith("@#")]
+    bc = False
+    while len(tokens) > 0 and tokens[-1].upper().replace(".", "").strip("()") == "BC":
+        bc = True
+        tokens = tokens[:-1]
+    if len(tokens) == 0 or len(tokens) > 3:
+        raise ValueError("Invalid date")
+
+    year_text = tokens[-1]
+    year = year_text.split("/")[0]
+    if not year.isdigit() or len(year) > 4:
+        raise ValueError("Invalid year")
+    year = int(year)
+
+    month = 0
+    day = 0
+    if len(tokens) > 1:
+        month_text = tokens[-2].upper().rstrip(".")
+        if month_text in MONTHS:
+            month = MONTHS.index(month_text) + 1
+        elif month_text in MONTH_NAMES:
+            month = MONTH_NAMES.index(month_text) + 1
+        else:
+            raise ValueError("Invalid month")
+    if len(tokens) > 2:
+        if not tokens[0].isdigit() or not 1 <= int(tokens[0]) <= _days_in_month(year, month, julian):
+            raise ValueError("Invalid day")
+        day = int(tokens[0])
+
+    display = [year_text]
+    if month > 0:
+        display.insert(0, MONTHS[month-1].title())
+    if day > 0:
+        display.insert(0, str(day))
+    if bc:
+        display.append("BC")
+        year = -year
+    return (year, month, day), " ".join(display)
+
+
+def _days_in_month(year, month, julian=False):
+    """Returns number of days in month of Gregorian or Julian calendar year"""
+    if julian and month == 2:
+        return 29 if year % 4 == 0 else 28
+    return calendar.monthrange(year, month)[1]
+
+
+@functools.lru_cache(maxsize=None)
+def _parse_free_form(text):
+    """Returns sortable key for free-form date text using dateparser, or None if not a date
+
+    dateparser fills missing parts of a date from a base date, today by default, so the
+    text is parsed against two base dates; parts which differ between them are unknown.
+    """
+    if len(text) == 0:
+        return None
+    logger.debug("Parsing free-form date: %s", text)
+    # dateparser loads language data on import, so it is only imported once a free-form date is found
+    import dateparser
+    first = dateparser.parse(text, settings={"PREFER_DAY_OF_MONTH": "first", "RELATIVE_BASE": datetime.datetime(2000, 1, 1)})
+    last = dateparser.parse(text, settings={"PREFER_DAY_OF_MONTH": "last", "RELATIVE_BASE": datetime.datetime(2001, 12, 1)})
+    if first is None or last is None or first.year != last.year:
+        return None
+    if first.month != last.month:
+        return first.year, 0, 0
+    return first.year, first.month, first.day if first.day == last.day else 0
+
+
+def format_key(key):
+    """Returns YYYY-MM-DD text for sortable date key, using 01 for unknown month or day"""
+    year, month, day = key
+    return "{0:04d}-{1:02d}-{2:02d}".format(year, max(month, 1), max(day, 1))
@@ -0,0 +1,151 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import logging, io
+logger = logging.getLogger("genoplot")
+
+
+class GedcomElement(object):
+    """GedcomElement - defines a tag and value of a GEDCOM line"""
+    __slots__ = ("tag", "value")
+
+    def __init__(self, tag, value):
+        self.tag = tag
+        self.value = value
+
+
+class EventRecord(object):
+    """
+    EventRecord - defines the date and place of an individual event
+
+    Records read from a pedigree cache carry the already parsed date.
+    """
+    __slots__ = ("date", "place", "parsed")
+
+    def __init__(self):
+        self.date = None
+        self.place = ""
+        self.parsed = None
+
+
+class IndividualRecord(object):
+    """
+    IndividualRecord - defines the fields of a GEDCOM individual used by Individual
+
+    Parents are not resolved while streaming; mother and father are always None and
+    are set from families by the pedigree.
+    """
+    __slots__ = ("id", "name", "sex", "birth", "death", "mother", "father")
+
+    def __init__(self, id):
+        self.id = id
+        self.name = ("", "")
+        self.sex = "U"
+        self.birth = None
+        self.death = None
+        self.mother = None
+        self.father = None
+
+
+class FamilyRecord(object):
+    """FamilyRecord - defines the fields of a GEDCOM family used by Family"""
+    __slots__ = ("id", "partners", "child_elements", "children_sorted")
+
+    def __init__(self, id):
+        self.id = id
+        self.partners = []
+        self.child_elements = []
+        # Whether child elements are already in birth order
+        self.children_sorted = False
+
+
+def parse_name(value):
+    """Returns first and last name from GEDCOM name value, e.g. 'John /Smith/'"""
+    parts = value.split("/")
+    if len(parts) < 2:
+        return value.strip(), ""
+    return parts[0].strip(), parts[1].strip()
+
+
+def parse_line(line):
+    """Returns level, cross-reference ID, tag and value of GEDCOM line"""
+    parts = line.strip().split(" ", 2)
+    level = int(parts[0])
+    xref = None
+    if len(parts) > 1 and parts[1].startswith("@"):
+        xref = parts[1]
+        parts = parts[2].split(" ", 1) if len(parts) > 2 else [""]
+    else:
+        parts = parts[1:]
+    tag = parts[0] if len(parts) > 0 else ""
+    value = parts[1] if len(parts) > 1 else ""
+    return level, xref, tag, value
+
+
+def iter_records(gedcom_file):
+    """Yields IndividualRecord and FamilyRecord objects from GEDCOM file as each record is read
+
+    Only the fields used by Individual and Family are kept, so memory use does not
+    depend on the size of the file.
+
+    :param gedcom_file: GEDCOM file path or file-like object
+    :type gedcom_file: str
+    """
+    if hasattr(gedcom_file, "read"):
+        lines = gedcom_file
+    else:
+        lines = io.open(gedcom_file, mode="r", encoding="utf-8-sig", errors="replace")
+
+    record = None
+    event = None
+    try:
+        for n, line in enumerate(lines):
+            if len(line.strip()) == 0:
+                continue
+            try:
+                level, xref, tag, value = parse_line(line)
+            except ValueError:
+                logger.warn("Skipping invalid GEDCOM line %i: %s", n+1, line.rstrip())
+                continue
+
+            if level == 0:
+                if not record is None:
+                    yield record
+                record = None
+                if tag == "INDI":
+                    record = IndividualRecord(xref)
+                elif tag == "FAM":
+                    record = FamilyRecord(xref)
+            elif record is None:
+                continue
+            elif level == 1:
+                event = None
+                if type(record) is IndividualRecord:
+                    if tag == "NAME" and record.name == ("", ""):
+                        record.name = parse_name(value)
+                    elif tag == "SEX":
+                        record.sex = value.strip()
+                    elif tag == "BIRT" and record.birth is None:
+                        event = record.birth = EventRecord()
+                    elif tag == "DEAT" and record.death is None:
+                        event = record.death = EventRecord()
+                else:
+                    if tag == "HUSB" or tag == "WIFE":
+                        record.partners.append(GedcomElement(tag, value.strip()))
+                    elif tag == "CHIL":
+                        record.child_elements.append(GedcomElement(tag, value.strip()))
+            elif level == 2 and not event is None:
+                if tag == "DATE":
+                    event.date = value
+                elif tag == "PLAC":
+                    event.place = value
+        if not record is None:
+            yield record
+    finally:
+        if not lines is gedcom_file:
+            lines.close()
@@ -6,41 +6,101 @@
 # into with Welded Anvil Technologies (David D. Newell).
 # @author david@newell.at
 
-import logging, itertools, svgwrite, time
-import networkx as nx
+import logging, itertools, time
 from .family import Family
-from .familygraph import FamilyGraph
+from .connectors import ConnectorIndex, assign_tracks
+from .svgstream import SVGLayerWriter
+from .tiles import SVGTileWriter
 from .pedigree import Pedigree
+from .scene import Scene, VIRTUAL_ID
+from .spatial import SpatialIndex
 from .utils import calculate_text_size
+from .vertex import FAMILY_TAG, vertex_name
+from . import trace
 logger = logging.getLogger("genoplot")
 
 
 class GenoPlot(object):
     def __init__(self,
                 name,
-                gedcom_file,
+                gedcom_file=None,
                 output_file=None,
                 font_size=10,
                 hmargin=20,
                 symbol_size=25,
-                page_margin=100
+                page_margin=100,
+                layout_workers=None,
+                streaming=False,
+                cache_dir=None,
+                proband=None,
+                direction="both",
+                generations=None,
+                layout_cache=None,
+                packing="shelf",
+                aspect_ratio=2**0.5,
+                tile_size=None,
+                tile_workers=None,
+                scene=None,
+                output_fields=None
                 ):
         """
         GenoPlot - defines a pedigree plot based on specified gedcom file
 
         :param name: Plot name/title
         :type name: str
-        :param gedcom_file: GEDCOM file path
+        :param gedcom_file: GEDCOM file path; not needed if plot is rendered from a scene
         :type gedcom_file: str
+        :param output_file: Output SVG file path or writable file-like object, or output directory if tiled
+        :type output_file: str
+        :param layout_workers: Number of processes used to lay out branches in parallel
+        :type layout_workers: int
+        :param streaming: Whether to read GEDCOM line by line instead of parsing the whole element tree
+        :type streaming: bool
+        :param cache_dir: Directory of processed pedigree cache; GEDCOM is only parsed if not already cached.
+            Individuals and families are still built from the cached records, see Pedigree.
+        :type cache_dir: str
+        :param proband: Individual ID whose neighbourhood is plotted; whole pedigree is plotted if not specified
+        :type proband: int
+        :param direction: Relatives of proband to plot: "ancestors", "descendants" or "both"
+        :type direction: str
+        :param generations: Maximum number of generations from proband; unlimited if not specified
+        :type generations: int
+        :param layout_cache: Cache of branch layouts shared between plots of an edited pedigree
+        :type layout_cache: LayoutCache
+        :param packing: Placement of disconnected branches: "shelf" packs them onto rows, "row" places them in a single row
+        :type packing: str
+        :param aspect_ratio: Target width to height ratio of the plot for shelf packing
+        :type aspect_ratio: float
+        :param tile_size: Tile size in pixels; if specified, the plot is written as a pyramid of SVG tiles with a manifest
+        :type tile_size: int
+        :param tile_workers: Number of processes used to write tiles
+        :type tile_workers: int
+        :param scene: Scene or scene file path from a previous plot; if specified, the plot is rendered from it without parsing GEDCOM or layout
+        :type scene: Scene
+        :param output_fields: Fields shown in labels of individuals, e.g. ["id", "name"]; layout fields are shown if not specified.
+            Labels showing layout fields change size during layout, so their branches are not laid out in parallel or cached.
+        :type output_fields: list
         """
-        logger.info("Creating GenoPlot named '%s' from GEDCOM '%s'", name, gedcom_file)
         self.name = name
-        self._pedigree = Pedigree(name, gedcom_file, font_size=font_size, hmargin=hmargin)
+        if scene is None:
+            logger.info("Creating GenoPlot named '%s' from GEDCOM '%s'", name, gedcom_file)
+            self._pedigree = Pedigree(name, gedcom_file, font_size=font_size, hmargin=hmargin, streaming=streaming, cache_dir=cache_dir,
+                                        output_fields=output_fields)
+            self._scene = None
+        else:
+            logger.info("Creating GenoPlot named '%s' from scene", name)
+            self._pedigree = None
+            self._scene = scene if isinstance(scene, Scene) else Scene.load(scene)
+            # Render at the sizes the scene was laid out with
+            symbol_size = self._scene.symbol_size
+            font_size = self._scene.font_size
+        self._tile_size = tile_size
+        self._tile_workers = tile_workers
         if output_file is None:
-            self._output_file = "{0}.svg".format(self.name)
+            self._output_file = "{0}.svg".format(self.name) if tile_size is None else "{0}_tiles".format(self.name)
         else:
             self._output_file = output_file
-        if ".svg" not in self._output_file:
+        if not hasattr(self._output_file, "write") and ".svg" not in self._output_file and tile_size is None:
             self._output_file += ".svg"
         self._graph = None
         self._layout = None
@@ -49,32 +109,88 @@ class GenoPlot(object):
         self._hmargin = hmargin
         self._node_height = self._symbol_size*2#*6
         self._page_margin = page_margin
-        self._connectors = []
-        self._image_layers = {
-            "-1:duplicates": [],
-            "0:connectors": [],
-            "1:individuals": [],
-            "2:text": [],
-            "3:textextent": []
-        }
+        self._layout_workers = layout_workers
+        self._proband = proband
+        self._direction = direction
+        self._generations = generations
+        self._layout_cache = layout_cache
+        self._packing = packing
+        self._aspect_ratio = aspect_ratio
+        self._connectors = ConnectorIndex()
+        self._connector_spacing = 8
+        self._writer = None
+        self._spatial_index = None
 
     def draw(self):
         """Draws pedigree plot based on specified parameters"""
+        with trace.span("GenoPlot.draw"):
+            self._draw()
+
+    def _draw(self):
+        """Renders scene of plot, laying it out if needed, to the output"""
         logger.info("Starting plot draw")
         draw_start = time.time()
+        scene = self.scene()
+
+        import svgwrite
+        self._svg = svgwrite.Drawing(filename=self._output_file, size=(scene.width, scene.height))
+        if self._tile_size is None:
+            self._writer = SVGLayerWriter(self._svg)
+        else:
+            self._writer = SVGTileWriter(self._svg, tile_size=self._tile_size, workers=self._tile_workers)
+
+        # Render scene layers
+        with trace.span("GenoPlot.render", individuals=len(scene)):
+            for pid, x, y, sex, color, labels in scene.individuals():
+                if pid == VIRTUAL_ID:
+                    self._render_virtual_individual(sex, x, y)
+                else:
+                    self._render_individual(sex, x, y, color, labels)
+            for start, end in scene.connector_segments():
+                self._render_connector(start, end)
+            for sex, start, end in scene.duplicate_links():
+                self._render_duplicate_connector(sex, start, end)
+
+        # Stream layers to image, or to tiles
+        with trace.span("GenoPlot.write", elements=len(self._writer)):
+            self._writer.save(self._output_file)
+        logger.info("Plot draw complete, took %.2fs", time.time() - draw_start)
+
+    def scene(self):
+        """Returns Scene of laid out plot; creates and lays out family graph on first call"""
+        if self._scene is None:
+            with trace.span("GenoPlot.scene"):
+                self._create_scene()
+        return self._scene
+
+    def _create_scene(self):
+        """Lays out family graph and adds its elements to a new scene"""
+        logger.info("Starting scene export")
+        scene_start = time.time()
+        # Family graph loads networkx, which rendering from a saved scene does not need
+        from .familygraph import FamilyGraph
         self._graph = FamilyGraph(self._pedigree,
                                     font_size=self._font_size,
                                     hmargin=self._hmargin,
                                     node_height=self._node_height,
-                                    page_margin=self._page_margin)
+                                    page_margin=self._page_margin,
+                                    layout_workers=self._layout_workers,
+                                    proband=self._proband,
+                                    direction=self._direction,
+                                    generations=self._generations,
+                                    layout_cache=self._layout_cache,
+                                    packing=self._packing,
+                                    aspect_ratio=self._aspect_ratio)
 
         extremes = self._graph.extremes()
-        self._svg = svgwrite.Drawing(filename=self._output_file,
-                                    size=(extremes[1]+self._page_margin*2, extremes[3]*1.2+self._page_margin*2))
+        self._scene = Scene(extremes[1]+self._page_margin*2, extremes[3]*1.2+self._page_margin*2,
+                            symbol_size=self._symbol_size, font_size=self._font_size)
+        for bext in self._graph.branch_extremes():
+            self._scene.add_branch(bext)
 
         # for vid, loc in self._layout.items():
         for vid, d in self._graph.items():
-            if vid[0] == "F":
+            if vid & FAMILY_TAG:
                 # Draw family
                 family = d["el"]
                 # father = family.father()
@@ -93,9 +209,11 @@ class GenoPlot(object):
                 self._draw_individual(individual.id, individual.x, individual.y)
                 # self._draw_individual(int(vid[1:]), *loc)
 
+        # Collect connectors from families to their children
+        buses = []
         # for vid, loc in self._layout.items():
         for vid, d in self._graph.items():
-            if vid[0] == "F":
+            if vid & FAMILY_TAG:
                 # family = self._pedigree.family(int(vid[1:]))
                 family = d["el"]
                 father = family.father()
@@ -104,9 +222,9 @@ class GenoPlot(object):
                     fwidth = self._hmargin
                     parent = family.mother()
                 else:
-                    fwidth = calculate_text_size(father.output_text(), self._font_size)[0]
+                    fwidth = father.size()[0]
                 if parent is None:
-                    logger.critical("Parent is none for family %s; father: %s; parent: %s; cannot continue drawing", vid, father, parent)
+                    logger.critical("Parent is none for family %s; father: %s; parent: %s; cannot continue drawing", vertex_name(vid), father, parent)
                 # Draw child connectors
                 midpoint_x = parent.x+fwidth/2+self._hmargin+self._symbol_size/2
                 midpoint_y = parent.y+self._symbol_size/2
@@ -119,7 +237,7 @@ class GenoPlot(object):
 
                 # Draw edges to children, if the edges exist in branched graph
                 for child in family.children():
-                    nid = "P{0}".format(child.id)
+                    nid = child.id << 1
                     # if nid in self._branched_graph[vid] and nid in self._layout:
                     if self._graph.has_edge(vid, nid):
                         if not child.x is None and not child.y is None:
@@ -131,21 +249,24 @@ class GenoPlot(object):
                         targets.append((child_x+self._symbol_size/2, child_y))
                     elif child.is_parent():
                         for fam in self._pedigree.individual_families(child.id, role="parent"):
-                            fid = "F{0}".format(fam.id)
+                            fid = (fam.id << 1) | FAMILY_TAG
                             # if fid in self._branched_graph[vid]:
                             if self._graph.has_edge(vid, fid):
                                 if not child.x is None and not child.y is None:
                                     child_x = child.x
                                     child_y = child.y
                                 else:
-                                    logger.warn("Position not found for %i - %s, using family %s position", child.id, child.name, fid)
+                                    logger.warn("Position not found for %i - %s, using family %s position", child.id, child.name, vertex_name(fid))
                                     logger.warn("Coordinates not persisted to %i", child.id)
                                     # child_x, child_y = self._layout[fid]
                                 targets.append((child_x+self._symbol_size/2, child_y))
 
-                # Draw elbow connectors
                 if len(targets) > 0:
-                    self._draw_connector_to_multiple(start, targets)
+                    buses.append((start, targets))
+
+        # Draw elbow connectors on routed tracks
+        for (start, targets), middle_y in zip(buses, self._route_buses(buses)):
+            self._draw_connector_to_multiple(start, targets, middle_y)
 
         # Draw duplicate people connectors
         [self._draw_duplicate_person_link(individual) for individual in self._graph.duplicate_individuals()]
@@ -164,18 +285,32 @@ class GenoPlot(object):
             else:
                 logger.warn("Coordinates not persisted to %i", duplicate.id)
                 # end = self._layout["P{0}".format(duplicate.id)]
-            logger.debug("Drawing added duplicate node connector: %s %s", start, end)
             self._draw_duplicate_connector(individual.sex, start, end)
 
-        # Add cached drawing items to image
-        [self._svg.add(item) for layer in sorted(self._image_layers) for item in self._image_layers[layer]]
-        # Save image
-        self._svg.save()
-        logger.info("Plot draw complete, took %.2fs", time.time() - draw_start)
+        self._spatial_index = None
+        logger.info("Scene export complete, took %.2fs", time.time() - scene_start)
+
+    def spatial_index(self):
+        """Returns SpatialIndex of laid out individuals, families and connector segments, built on first call after layout
+
+        Individuals and families are indexed by vertex ID as in FamilyGraph.spatial_index();
+        connector segments are indexed by their (start, end) coordinates. Use
+        FamilyGraph.spatial_index() to look up the nearest individual or family only.
+        """
+        if self._graph is None:
+            raise Exception("Plot has not been laid out from a pedigree")
+        if self._spatial_index is None:
+            nodes = self._graph.spatial_index()
+            index = SpatialIndex(cell_size=nodes.cell_size)
+            for i, vid in enumerate(nodes):
+                index.add(vid, *nodes.bounds(i))
+            for start, end in self._connectors:
+                index.add((start, end), start[0], start[1], end[0], end[1])
+            self._spatial_index = index
+        return self._spatial_index
 
     def _draw_family(self, fid, x, y):
         """Draws family on drawing"""
-        logger.debug("Drawing family %s at (%.1f, %.1f)", fid, x, y)
         family = self._pedigree.family(fid)
         # family.set_coordinates(x, y)
         father = family.father()
@@ -193,7 +328,7 @@ class GenoPlot(object):
                 logger.warn("Family %s has no parents: drawing both virtual mother and father", fid)
                 fwidth = self._hmargin
             else:
-                fwidth = calculate_text_size(father.output_text(), self._font_size)[0]
+                fwidth = father.size()[0]
             mwidth = self._symbol_size
             mx = x + self._hmargin*2+fwidth/2+mwidth/2
             self._draw_virtual_individual("F", mx, y)
@@ -207,9 +342,14 @@ class GenoPlot(object):
         self._draw_connector(start, end)
 
     def _draw_virtual_individual(self, sex, x, y):
-        """Draws individual on drawing"""
+        """Adds virtual individual to scene"""
+        self._scene.add_individual(VIRTUAL_ID, x, y, sex)
+
+    def _render_virtual_individual(self, sex, x, y):
+        """Draws virtual individual on drawing"""
         if sex == "M":
-            self._image_layers["1:individuals"].append(
+            self._writer.add(
+                "1:individuals",
                 self._svg.rect(
                     (x, y),
                     (self._symbol_size, self._symbol_size),
@@ -219,7 +359,8 @@ class GenoPlot(object):
                 )
             )
         else:
-            self._image_layers["1:individuals"].append(
+            self._writer.add(
+                "1:individuals",
                 self._svg.ellipse(
                     (x+self._symbol_size/2, y+self._symbol_size/2),
                     (self._symbol_size/2, self._symbol_size/2),
@@ -230,32 +371,39 @@ class GenoPlot(object):
             )
 
     def _draw_individual(self, pid, x, y):
-        """Draws individual on drawing"""
+        """Adds individual to scene"""
         individual = self._pedigree.individual(pid)
         individual.set_coordinates(x, y)
-        if individual.sex == "M":
-            self._image_layers["1:individuals"].append(
+        self._scene.add_individual(pid, x, y, individual.sex, individual.color(), individual.output_text(), individual.size())
+
+    def _render_individual(self, sex, x, y, color, labels):
+        """Draws individual on drawing"""
+        if sex == "M":
+            self._writer.add(
+                "1:individuals",
                 self._svg.rect(
                     (x, y),
                     (self._symbol_size, self._symbol_size),
-                    fill=individual.color(),
+                    fill=color,
                     stroke="black"
                 )
             )
         else:
-            self._image_layers["1:individuals"].append(
+            self._writer.add(
+                "1:individuals",
                 self._svg.ellipse(
                     (x+self._symbol_size/2, y+self._symbol_size/2),
                     (self._symbol_size/2, self._symbol_size/2),
-                    fill=individual.color(),
+                    fill=color,
                     stroke="black"
                 )
             )
 
         text_y = y + 1.6*self._symbol_size
 
-        for text in individual.output_text():
-            self._image_layers["2:text"].append(
+        for text in labels:
+            self._writer.add(
+                "2:text",
                 self._svg.text(
                     text,
                     insert=(x+self._symbol_size/2, text_y),
@@ -266,7 +414,8 @@ class GenoPlot(object):
 
             ### Temporary
             text_width, text_height = calculate_text_size(text, self._font_size)
-            self._image_layers["3:textextent"].append(
+            self._writer.add(
+                "3:textextent",
                 self._svg.rect(
                     (x+self._symbol_size/2-text_width/2, text_y-text_height),
                     (text_width, text_height),
@@ -275,41 +424,25 @@ class GenoPlot(object):
                     style="stroke-dasharray: 1,2;"
                 )
             )
-
-
-            logger.debug("Text %s has width %.2f and height %.2f", text, text_width, text_height)
             text_y += text_height
 
     def _detect_straight_connector_overlap(self, x1, y1, x2, y2, fid=None):
         """Returns whether there is an overlapping straight line connector"""
         if y1 == y2:
-            for cxn in self._connectors:
-                if cxn[0][1] == y1 and cxn[1][1] == y2 and (
-                    x1 <= cxn[0][0] <= x2 or
-                    x1 <= cxn[1][0] <= x2 or
-                    cxn[0][0] <= x1 <= cxn[1][0] or
-                    cxn[0][0] <= x2 <= cxn[1][0]
-                    ):
-                        return True
+            return self._connectors.overlaps(x1, x2, y1)
 
         # If no overlaps detected, return non-overlapping
         return False
 
     def _find_nonoverlapping_y(self, x1, x2, y):
         """Returns non-overlapping y value for connector"""
-        i = 0
-        while self._detect_straight_connector_overlap(x1, y, x2, y):
-            y -= 8
-            i += 1
-            if i > 100:
-                logger.error("Drawing overlapping connector. Iterated 100 times and could not find open space on layout. X1: %i Y1: %i X2: %i Y2: %i", x1, y1, x2, y2)
-                break
-        if i > 0:
-            logger.debug("Detected overlapping connector. Iterating %i times", i)
-        return y
-
-    def _draw_connector_to_multiple(self, start, targets):
-        """Draws connector from start coordinate to one or more targets"""
+        free_y = self._connectors.free_y(x1, x2, y, self._connector_spacing)
+        if free_y != y and not trace.tracer is None:
+            trace.tracer.count("connectors.overlap_retries", int(round((y - free_y) / self._connector_spacing)))
+        return free_y
+
+    def _connector_bounds(self, start, targets):
+        """Returns minimum x, maximum x, minimum y and maximum y of connector from start to targets"""
         start_x, start_y = start
 
         max_x = start_x
@@ -327,9 +460,62 @@ class GenoPlot(object):
             if y < min_y:
                 min_y = y
 
-        middle_y = self._find_nonoverlapping_y(min_x, max_x, max_y - self._symbol_size)
+        return min_x, max_x, min_y, max_y
+
+    def _route_buses(self, buses):
+        """Returns y coordinate of the horizontal section of each connector from start to targets
+
+        Connectors whose horizontal sections share a row (between the same two
+        generations) are assigned tracks with a sweep over their x intervals, so
+        they never overlap and use the fewest tracks. Tracks are spaced upwards
+        from the row, skipping any y where a track would overlap existing connectors.
+
+        :param buses: (start, targets) for each connector
+        :type buses: list
+        """
+        rows = {}
+        for i, (start, targets) in enumerate(buses):
+            min_x, max_x, min_y, max_y = self._connector_bounds(start, targets)
+            rows.setdefault(max_y - self._symbol_size, []).append((i, (min_x, max_x)))
+
+        routed = [None]*len(buses)
+        reserved = ConnectorIndex()
+        for base_y in sorted(rows, reverse=True):
+            row = rows[base_y]
+            tracks = assign_tracks([interval for i, interval in row])
+            members = [[] for _ in range(max(tracks)+1)]
+            for (i, interval), track in zip(row, tracks):
+                members[track].append((i, interval))
+
+            y = base_y
+            retries = 0
+            for track in members:
+                while any(self._connectors.overlaps(x1, x2, y) or reserved.overlaps(x1, x2, y) for i, (x1, x2) in track):
+                    y -= self._connector_spacing
+                    retries += 1
+                for i, (x1, x2) in track:
+                    routed[i] = y
+                    reserved.add((x1, y), (x2, y))
+                y -= self._connector_spacing
+
+            if not trace.tracer is None:
+                trace.tracer.count("connectors.routed", len(row))
+                trace.tracer.count("connectors.tracks", len(members))
+                trace.tracer.count("connectors.overlap_retries", retries)
+
+        return routed
+
+    def _draw_connector_to_multiple(self, start, targets, middle_y=None):
+        """Draws connector from start coordinate to one or more targets
+
+        :param middle_y: Y coordinate of horizontal section, if already routed
+        :type middle_y: float
+        """
+        start_x, start_y = start
+        min_x, max_x, min_y, max_y = self._connector_bounds(start, targets)
 
-        logger.debug("Drawing connector to multiple targets (%i). Max_X: %i Min_X: %i Max_Y: %i Min_Y: %i Middle_Y: %i", len(targets), max_x, min_x, max_y, min_y, middle_y)
+        if middle_y is None:
+            middle_y = self._find_nonoverlapping_y(min_x, max_x, max_y - self._symbol_size)
 
         # Draw vertical section from start
         self._draw_connector(start, (start_x, middle_y))
@@ -340,61 +526,33 @@ class GenoPlot(object):
             self._draw_connector((tgt[0], middle_y), tgt)
 
     def _draw_connector(self, start, end):
-        """Draws connector between specified coordinates"""
+        """Adds connector between specified coordinates to scene"""
         x1, y1 = start
         x2, y2 = end
 
         if y1 == y2 or x1 == x2:
             # Straight line connector
-            if (start, end) not in self._connectors:
-                self._image_layers["0:connectors"].append(
-                    self._svg.line(
-                        start=start,
-                        end=end,
-                        stroke="black"
-                    )
-                )
-                self._connectors.append((
-                        start, end
-                    ))
+            segments = [(start, end)]
         else:
             # Elbow connector
             middle_y = self._find_nonoverlapping_y(x1, x2, y2 - self._symbol_size)
-
-            if (start, (x1, middle_y)) not in self._connectors:
-                self._image_layers["0:connectors"].append(
-                    self._svg.line(
-                        start=start,
-                        end=(x1, middle_y),
-                        stroke="black"
-                    )
-                )
-                self._connectors.append((
-                        start, (x1, middle_y)
-                    ))
-            if ((x1, middle_y), (x2, middle_y)) not in self._connectors:
-                self._image_layers["0:connectors"].append(
-                    self._svg.line(
-                        start=(x1, middle_y),
-                        end=(x2, middle_y),
-                        stroke="black"
-                    )
-                )
-                self._connectors.append((
-                        (x1, middle_y), (x2, middle_y)
-                    ))
-
-            if ((x2, middle_y), end) not in self._connectors:
-                self._image_layers["0:connectors"].append(
-                    self._svg.line(
-                        start=(x2, middle_y),
-                        end=end,
-                        stroke="black"
-                    )
-                )
-                self._connectors.append((
-                        (x2, middle_y), end
-                    ))
+            segments = [(start, (x1, middle_y)), ((x1, middle_y), (x2, middle_y)), ((x2, middle_y), end)]
+
+        for segment in segments:
+            if segment not in self._connectors:
+                self._scene.add_connector(*segment)
+                self._connectors.add(*segment)
+
+    def _render_connector(self, start, end):
+        """Draws straight line connector between specified coordinates"""
+        self._writer.add(
+            "0:connectors",
+            self._svg.line(
+                start=start,
+                end=end,
+                stroke="black"
+            )
+        )
 
     def _draw_duplicate_person_link(self, individual):
         """Draws connectors for duplicate person"""
@@ -408,12 +566,14 @@ class GenoPlot(object):
         else:
             coords = [coords]
 
-        logger.debug("Drawing duplicate person link for %s - coords: %s", individual.name, ", ".join(repr(c) for c in coords))
-
         [self._draw_duplicate_connector(individual.sex, start, end) for (start, end) in coords]
 
     def _draw_duplicate_connector(self, sex, start, end):
-        """Draws connector between specified coordinates"""
+        """Adds connector between duplicate individuals at specified coordinates to scene"""
+        self._scene.add_duplicate(sex, start, end)
+
+    def _render_duplicate_connector(self, sex, start, end):
+        """Draws connector between duplicate individuals at specified coordinates"""
         x1 = start[0] + self._symbol_size/2
         x2 = end[0] + self._symbol_size/2
         y1 = start[1] + self._symbol_size/2
@@ -451,7 +611,8 @@ class GenoPlot(object):
 
         path = "M{0} {1} Q {2} {3}, {4} {5}".format(x1, y1, curve1_x, curve1_y, x2, y2)
 
-        self._image_layers["-1:duplicates"].append(
+        self._writer.add(
+            "-1:duplicates",
             self._svg.path(
                 d=path,
                 stroke="#BAFFD2",
@@ -460,7 +621,8 @@ class GenoPlot(object):
         )
 
         if sex == "M":
-            self._image_layers["-1:duplicates"].append(
+            self._writer.add(
+                "-1:duplicates",
                 self._svg.rect(
                     (sx - self._symbol_size*0.2, sy - self._symbol_size*0.2),
                     (self._symbol_size*1.4, self._symbol_size*1.4),
@@ -468,7 +630,8 @@ class GenoPlot(object):
                     stroke="#BAFFD2"
                 )
             )
-            self._image_layers["-1:duplicates"].append(
+            self._writer.add(
+                "-1:duplicates",
                 self._svg.rect(
                     (ex - self._symbol_size*0.2, ey - self._symbol_size*0.2),
                     (self._symbol_size*1.4, self._symbol_size*1.4),
@@ -477,7 +640,8 @@ class GenoPlot(object):
                 )
             )
         else:
-            self._image_layers["-1:duplicates"].append(
+            self._writer.add(
+                "-1:duplicates",
                 self._svg.ellipse(
                     (sx + self._symbol_size/2, sy + self._symbol_size/2),
                     (self._symbol_size*1.4/2, self._symbol_size*1.4/2),
@@ -485,7 +649,8 @@ class GenoPlot(object):
                     stroke="#BAFFD2"
                 )
             )
-            self._image_layers["-1:duplicates"].append(
+            self._writer.add(
+                "-1:duplicates",
                 self._svg.ellipse(
                     (ex + self._symbol_size/2, ey + self._symbol_size/2),
                     (self._symbol_size*1.4/2, self._symbol_size*1.4/2),
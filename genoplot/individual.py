@@ -6,12 +6,32 @@
 # into with Welded Anvil Technologies (David D. Newell).
 # @author david@newell.at
 
-import logging, dateparser
+import logging
+from .gedcomdate import parse_date, format_key
 from .utils import stripName, calculate_text_size
 logger = logging.getLogger("genoplot")
 
+# Output fields whose text is derived from layout state rather than GEDCOM data
+LAYOUT_OUTPUT_FIELDS = frozenset(["layout_branch", "layout_number", "layout_family", "layout_ancestor", "layout_prelims", "layout_shifts", "layout_mods"])
+# Layout attributes of individuals and families which layout output fields show
+LABEL_LAYOUT_ATTRIBUTES = frozenset(["layout_branch", "layout_number", "layout_family", "layout_ancestor", "layout_prelim", "layout_shift", "layout_mod"])
+# Layout attributes which labels show as integers, so only integer changes alter the label
+LABEL_INTEGER_ATTRIBUTES = frozenset(["layout_prelim", "layout_shift", "layout_mod"])
+
+
+def label_changed(el, name, value):
+    """Returns whether assigning value to attribute of element changes a label showing it"""
+    if not name in el.__dict__:
+        return True
+    if name in LABEL_INTEGER_ATTRIBUTES:
+        return int(value) != int(el.__dict__[name])
+    return value != el.__dict__[name]
+
 
 class Individual(object):
+    # Attributes shown in the label; set by _set_label_attributes()
+    _label_attributes = frozenset()
+
     def __init__(self, individual, pedigree=None, output_fields=None, font_size=10, **kwargs):
         """
         Individual - defines a  in a pedigree
@@ -32,6 +52,8 @@ class Individual(object):
         self._output_fields = output_fields if not output_fields is None else ["layout_branch", "layout_number", "layout_family", "layout_ancestor", "layout_prelims", "layout_shifts", "layout_mods", "id", "name"]
 
         self._font_size = font_size
+        self._label_metrics = None
+        self._set_label_attributes()
 
         self.layout_number = 0
         self.layout_prelim = 0
@@ -46,7 +68,10 @@ class Individual(object):
         [setattr(self, k, v) for k, v in kwargs.items()]
 
         self._setup()
-        self.width, self.height = self.size()
+        # Raw GEDCOM element is only needed during setup
+        self._raw = None
+        # Label is measured when width or height is first read, not when the pedigree is built
+        self._first_size = None
 
     def _setup(self):
         self.id = int(self._raw.id.replace("@", "").replace("P", ""))
@@ -82,24 +107,17 @@ class Individual(object):
                 birth = self._raw.birth[0]
             else:
                 birth = self._raw.birth
-            bdate = birth.date
-            self.birthDate = "* {0}".format(bdate).strip()
+            bdate = getattr(birth, "parsed", None) or parse_date(birth.date)
+            self.birthDate = "* {0}".format(bdate.display).strip()
             self.birthPlace = birth.place.strip()
-            if "abt" in bdate.lower():
-                bdate = bdate.strip("abtABT. ")
-            if "aft" in bdate.lower():
-                bdate = bdate.strip("aftAFT. ")
-            if "bef" in bdate.lower():
-                bdate = bdate.strip("befBEF. ")
-            if "~" in bdate:
-                bdate = bdate.strip("~ ")
-            parsedBdate = dateparser.parse(bdate)
-            if parsedBdate is None:
-                self.birth = bdate
+            self.birth_key = bdate.key
+            if bdate.key is None:
+                self.birth = birth.date.strip()
             else:
-                self.birth = parsedBdate.strftime("%Y-%m-%d")
+                self.birth = format_key(bdate.key)
         except:
             self.birth = None
+            self.birth_key = None
             self.birthDate = None
             self.birthPlace = None
 
@@ -108,24 +126,17 @@ class Individual(object):
                 death = self._raw.death[0]
             else:
                 death = self._raw.death
-            ddate = death.date
-            self.deathDate = "✝ {0}".format(ddate).strip()
+            ddate = getattr(death, "parsed", None) or parse_date(death.date)
+            self.deathDate = "✝ {0}".format(ddate.display).strip()
             self.deathPlace = death.place.strip()
-            if "abt" in ddate.lower():
-                ddate = ddate.strip("abtABT. ")
-            if "aft" in ddate.lower():
-                ddate = ddate.strip("aftAFT. ")
-            if "bef" in ddate.lower():
-                ddate = ddate.strip("befBEF. ")
-            if "~" in ddate:
-                ddate = ddate.strip("~ ")
-            parsedDdate = dateparser.parse(ddate)
-            if parsedDdate is None:
-                self.death = ddate
+            self.death_key = ddate.key
+            if ddate.key is None:
+                self.death = death.date.strip()
             else:
-                self.death = parsedDdate.strftime("%Y-%m-%d")
+                self.death = format_key(ddate.key)
         except:
             self.death = None
+            self.death_key = None
             self.deathDate = None
             self.deathPlace = None
 
@@ -156,8 +167,56 @@ class Individual(object):
     def size(self):
         """
         Returns label size of indivdual at the font size specified during object creation
+
+        Label metrics are cached and only recalculated once a value shown in the label
+        has been assigned a different value; see __setattr__()
         """
-        return calculate_text_size(self.output_text(), self._font_size)
+        if self._label_metrics is None:
+            self._label_metrics = calculate_text_size(self.output_text(), self._font_size)
+        return self._label_metrics
+
+    def __setattr__(self, name, value):
+        if name in self._label_attributes:
+            if label_changed(self, name, value):
+                self.__dict__["_label_metrics"] = None
+            self.__dict__[name] = value
+        elif name == "_output_fields" and "_label_attributes" in self.__dict__:
+            self.__dict__[name] = value
+            self._set_label_attributes()
+        else:
+            object.__setattr__(self, name, value)
+
+    def _set_label_attributes(self):
+        """Records attributes whose values are shown in the label, so that assigning them invalidates label metrics"""
+        attributes = set(k for k in self._output_fields if not k in LAYOUT_OUTPUT_FIELDS)
+        attributes.add("_font_size")
+        if self.shows_layout_fields():
+            attributes.update(LABEL_LAYOUT_ATTRIBUTES)
+        self._label_attributes = frozenset(attributes)
+        self._label_metrics = None
+
+    def invalidate_label(self):
+        """Discards cached label metrics, e.g. when a family of the individual changes"""
+        self._label_metrics = None
+
+    @property
+    def width(self):
+        """Label width when first measured"""
+        return self._measure()[0]
+
+    @property
+    def height(self):
+        """Label height when first measured"""
+        return self._measure()[1]
+
+    def _measure(self):
+        if self._first_size is None:
+            self._first_size = self.size()
+        return self._first_size
+
+    def shows_layout_fields(self):
+        """Returns whether label shows layout fields, so that its size changes during layout"""
+        return not LAYOUT_OUTPUT_FIELDS.isdisjoint(self._output_fields)
 
     def output_text(self):
         """Text to print on pedigree"""
@@ -0,0 +1,83 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import logging, collections, hashlib
+logger = logging.getLogger("genoplot")
+
+
+class LayoutCache(object):
+    def __init__(self, max_entries=None):
+        """
+        LayoutCache - defines a store of branch layouts reused across FamilyGraph builds
+
+        Layouts are keyed by a signature of everything the branch layout depends on, so
+        a branch whose subgraph, node sizes and child order are unchanged since it was
+        last laid out reuses its relative coordinates. Pass the same cache to each
+        FamilyGraph (or GenoPlot) built while editing a pedigree. Branches whose labels
+        show layout fields change size during layout and are not cached, so plots which
+        use the cache should set static output_fields, e.g. ["id", "name"].
+
+        :param max_entries: Maximum number of layouts kept, least recently used are removed first; unlimited if not specified
+        :type max_entries: int
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, signature):
+        return signature in self._entries
+
+    def get(self, signature):
+        """Returns layout state and extremes stored for signature, or None"""
+        entry = self._entries.get(signature)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(signature)
+        return entry
+
+    def put(self, signature, state, extremes):
+        """Stores layout state and extremes for signature"""
+        self._entries[signature] = (state, tuple(extremes))
+        self._entries.move_to_end(signature)
+        if not self.max_entries is None:
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Removes all layouts and resets counters"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def layout_signature(nodes, edges, labels, settings):
+    """Returns signature of branch layout inputs with nodes identified by canonical labels
+
+    :param nodes: Node ID, width, height and sort key of each node, from Branch.layout_inputs()
+    :type nodes: list
+    :param edges: Edges in child order, from Branch.layout_inputs()
+    :type edges: list
+    :param labels: Canonical label of each node ID
+    :type labels: dict
+    :param settings: Other values the layout depends on, e.g. margins
+    :type settings: tuple
+    """
+    children = {}
+    for u, v in edges:
+        children.setdefault(u, []).append(labels[v])
+    canonical = sorted(
+        (labels[vid], width, height, sort_key, tuple(children.get(vid, ())))
+        for vid, width, height, sort_key in nodes
+    )
+    return hashlib.sha1(repr((settings, canonical)).encode("utf-8")).hexdigest()
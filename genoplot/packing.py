@@ -0,0 +1,56 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import logging, math
+logger = logging.getLogger("genoplot")
+
+
+def shelf_pack(sizes, groups=None, spacing=(0, 0), aspect_ratio=1.0):
+    """Returns (x, y) position of each rectangle, packed onto shelves from the origin
+
+    Rectangles are sorted by the height of their group, then by their own height,
+    and placed left to right on shelves of a width chosen so that the packed area
+    approaches the target aspect ratio (next-fit decreasing height). Rectangles of a
+    group are placed one after another, so they end up next to each other. Takes
+    O(n log n) time.
+
+    :param sizes: (width, height) of each rectangle
+    :type sizes: list
+    :param groups: Integer group label of each rectangle; each rectangle is its own group if not specified
+    :type groups: list
+    :param spacing: Horizontal and vertical space between rectangles
+    :type spacing: tuple
+    :param aspect_ratio: Target width to height ratio of packed area
+    :type aspect_ratio: float
+    """
+    if len(sizes) == 0:
+        return []
+    if groups is None:
+        groups = list(range(len(sizes)))
+    hspace, vspace = spacing
+
+    group_heights = {}
+    for (width, height), group in zip(sizes, groups):
+        group_heights[group] = max(group_heights.get(group, 0), height)
+    order = sorted(range(len(sizes)), key=lambda i: (-group_heights[groups[i]], groups[i], -sizes[i][1], i))
+
+    area = sum((width + hspace)*(height + vspace) for width, height in sizes)
+    shelf_width = max(max(width for width, height in sizes), math.sqrt(area*aspect_ratio) - hspace)
+
+    positions = [None]*len(sizes)
+    x = y = shelf_height = 0
+    for i in order:
+        width, height = sizes[i]
+        if x > 0 and x + width > shelf_width:
+            # Start a new shelf below the tallest rectangle of this one
+            y += shelf_height + vspace
+            x = shelf_height = 0
+        positions[i] = (x, y)
+        x += width + hspace
+        shelf_height = max(shelf_height, height)
+    return positions
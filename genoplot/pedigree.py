@@ -6,14 +6,15 @@
 # into with Welded Anvil Technologies (David D. Newell).
 # @author david@newell.at
 
-import logging, gedcom, time, copy
+import logging, time, copy, collections
+from . import cache, gedcomstream, trace
 from .family import Family
 from .individual import Individual
 logger = logging.getLogger("genoplot")
 
 
 class Pedigree(object):
-    def __init__(self, name, gedcom_file, font_size=10, hmargin=0, **kwargs):
+    def __init__(self, name, gedcom_file, font_size=10, hmargin=0, streaming=False, cache_dir=None, output_fields=None, **kwargs):
         """
         Pedigree - defines a pedigree built from a gedcom file
 
@@ -21,51 +22,126 @@ class Pedigree(object):
         :type name: str
         :param gedcom_file: GEDCOM file path
         :type gedcom_file: str
+        :param streaming: Whether to read GEDCOM line by line instead of parsing the whole element tree
+        :type streaming: bool
+        :param cache_dir: Directory of processed pedigree cache; GEDCOM is only parsed if not already cached.
+            The cached store opens in about a millisecond, but every Individual and Family is still built
+            from its records, which takes most of a warm start (about 0.15s for 2000 individuals).
+        :type cache_dir: str
+        :param output_fields: Fields shown in labels of individuals, e.g. ["id", "name"]; layout fields are shown if not specified
+        :type output_fields: list
         """
         self.name = name
-        self._gedcom = gedcom.parse(gedcom_file)
+        self._gedcom_file = gedcom_file
+        self._gedcom = None
+        if not streaming and cache_dir is None:
+            import gedcom
+            with trace.span("Pedigree.parse"):
+                self._gedcom = gedcom.parse(gedcom_file)
         self._individuals = {}
         self._families = {}
         self._parent_ids = set()
         self._children_ids = set()
+        self._parent_families = {}
+        self._child_families = {}
 
         self._font_size = font_size
         self._hmargin = hmargin
+        self._output_fields = output_fields
 
         [setattr(self, k, v) for k, v in kwargs.items()]
 
-        self._setup()
+        with trace.span("Pedigree._setup"):
+            if not cache_dir is None:
+                self._setup_records(cache.cached_pedigree(gedcom_file, cache_dir).iter_records())
+            elif streaming:
+                self._setup_records(gedcomstream.iter_records(gedcom_file))
+            else:
+                self._setup()
 
     def _setup(self):
         logger.debug("Processing individuals in GEDCOM")
         start = time.time()
-        for individual in self._gedcom.individuals:
-            try:
-                i = Individual(individual, self, font_size=self._font_size)
-            except Exception:
-                logger.warn("Error adding individual: %s", individual)
-                continue
-
-            logger.debug("Adding individual: %s", i.name)
-            self._individuals[i.id] = i
+        [self._add_individual(individual) for individual in self._gedcom.individuals]
         logger.info("Processing individuals took %.4fs", time.time()-start)
 
         logger.debug("Processing families in GEDCOM")
         start = time.time()
-        for family in self._gedcom.families:
-            try:
-                f = Family(family, self, font_size=self._font_size, hmargin=self._hmargin)
-            except Exception:
-                logger.warn("Error adding family: %s", family)
-                continue
-
-            logger.debug("Adding family: %s", f.id)
-            self._families[f.id] = f
-            [self._parent_ids.add(id) for id in f.parent_ids()]
-            [self._children_ids.add(id) for id in f.children_ids()]
+        [self._add_family(family) for family in self._gedcom.families]
         logger.info("Processing families took %.4fs", time.time()-start)
         logger.info("Parsing GEDCOM complete: %i individuals and %i families found", len(self._individuals), len(self._families))
 
+    def _setup_records(self, records):
+        """Builds pedigree from GEDCOM records as they are read, without keeping the parsed file"""
+        logger.debug("Processing individuals in GEDCOM records")
+        start = time.time()
+        # Families are added once all individuals exist, as children are sorted by birth
+        families = []
+        for record in records:
+            if type(record) is gedcomstream.FamilyRecord:
+                families.append(record)
+            else:
+                self._add_individual(record)
+        logger.info("Processing individuals took %.4fs", time.time()-start)
+
+        logger.debug("Processing families in GEDCOM")
+        start = time.time()
+        [self._add_family(family) for family in families]
+        self._resolve_parents()
+        logger.info("Processing families took %.4fs", time.time()-start)
+        logger.info("Parsing GEDCOM complete: %i individuals and %i families found", len(self._individuals), len(self._families))
+
+    def _add_individual(self, individual):
+        """Creates and adds Individual from GEDCOM record"""
+        try:
+            i = Individual(individual, self, output_fields=self._output_fields, font_size=self._font_size)
+        except Exception:
+            logger.warn("Error adding individual: %s", individual)
+            return
+
+        logger.debug("Adding individual: %s", i.name)
+        self._individuals[i.id] = i
+
+    def _add_family(self, family):
+        """Creates and adds Family from GEDCOM record"""
+        try:
+            f = Family(family, self, font_size=self._font_size, hmargin=self._hmargin)
+        except Exception:
+            logger.warn("Error adding family: %s", family)
+            return
+
+        logger.debug("Adding family: %s", f.id)
+        self._families[f.id] = f
+        [self._index_family_parent(f, id) for id in f.parent_ids()]
+        [self._index_family_child(f, id) for id in f.children_ids()]
+
+    def _resolve_parents(self):
+        """Sets mother and father of individuals without parents from the first family listing them as a child"""
+        for family in self._families.values():
+            for cid in family.children_ids():
+                child = self._individuals.get(cid)
+                if child is None or not child.mother is None or not child.father is None:
+                    continue
+                child.father = family.father_id()
+                child.mother = family.mother_id()
+
+    def _index_family_parent(self, family, pid):
+        """Records specified individual ID as a parent in family"""
+        self._parent_ids.add(pid)
+        families = self._parent_families.setdefault(pid, [])
+        if family not in families:
+            families.append(family)
+            # Labels of parents show layout fields of their families
+            if pid in self._individuals:
+                self._individuals[pid].invalidate_label()
+
+    def _index_family_child(self, family, pid):
+        """Records specified individual ID as a child in family"""
+        self._children_ids.add(pid)
+        families = self._child_families.setdefault(pid, [])
+        if family not in families:
+            families.append(family)
+
     def __len__(self):
         """Returns number of individuals in pedigree"""
         return len(self._individuals)
@@ -112,11 +188,13 @@ class Pedigree(object):
         :type: str
         """
         if role == "parent":
-            return [family for family in self._families.values() if family.contains_parent(pid)]
+            return list(self._parent_families.get(pid, []))
         elif role == "child":
-            return [family for family in self._families.values() if family.contains_child(pid)]
+            return list(self._child_families.get(pid, []))
         else:
-            return [family for family in self._families.values() if pid in family]
+            families = list(self._parent_families.get(pid, []))
+            families.extend(family for family in self._child_families.get(pid, []) if family not in families)
+            return families
 
     def family(self, fid):
         """Returns family for specified family ID
@@ -136,7 +214,7 @@ class Pedigree(object):
         :type parents: int or list
         """
         if type(parents) is int:
-            return [family for family in self._families.values() if parents in family.parent_ids()]
+            return list(self._parent_families.get(parents, []))
         elif type(parents) is list:
             f = None
             for parent in parents:
@@ -148,11 +226,83 @@ class Pedigree(object):
         else:
             return []
 
-    def vertices(self):
-        """Returns families and individuals who comprise all vertices in family tree plot"""
-        vertices = list(self._families.values())
-        individual_keys = [individual for individual in self._individuals.values() if not individual.is_parent()]
-        vertices.extend(individual_keys)
+    def neighbourhood(self, pid, direction="both", generations=None):
+        """Returns IDs of individuals and families within specified generations of an individual
+
+        Ancestors are reached through the families in which individuals are children, and
+        descendants through the families in which they are parents, along with spouses.
+        Families of the proband and of descendants at the generation limit are included
+        without their children, so that every parent has a family vertex.
+
+        :param pid: Proband individual ID
+        :type pid: int
+        :param direction: "ancestors", "descendants" or "both"
+        :type direction: str
+        :param generations: Maximum number of generations from proband; unlimited if not specified
+        :type generations: int
+        :returns: Individual IDs and family IDs
+        :rtype: tuple
+        """
+        if not direction in ("ancestors", "descendants", "both"):
+            raise Exception("Invalid neighbourhood direction: {0}".format(direction))
+        if pid not in self._individuals:
+            raise Exception("Individual not found in pedigree: {0}".format(pid))
+
+        individuals = set([pid])
+        families = set()
+        for family in self._parent_families.get(pid, []):
+            families.add(family.id)
+            individuals.update(family.parent_ids())
+
+        if direction in ("ancestors", "both"):
+            visited = set()
+            queue = collections.deque([(pid, 0)])
+            while len(queue) > 0:
+                cid, generation = queue.popleft()
+                if not generations is None and generation >= generations:
+                    continue
+                for family in self._child_families.get(cid, []):
+                    if family.id in visited:
+                        continue
+                    visited.add(family.id)
+                    families.add(family.id)
+                    for parent in family.parent_ids():
+                        individuals.add(parent)
+                        queue.append((parent, generation+1))
+
+        if direction in ("descendants", "both"):
+            visited = set()
+            queue = collections.deque([(pid, 0)])
+            while len(queue) > 0:
+                parent, generation = queue.popleft()
+                for family in self._parent_families.get(parent, []):
+                    families.add(family.id)
+                    individuals.update(family.parent_ids())
+                    if (not generations is None and generation >= generations) or family.id in visited:
+                        continue
+                    visited.add(family.id)
+                    for cid in family.children_ids():
+                        if not cid in individuals:
+                            individuals.add(cid)
+                            queue.append((cid, generation+1))
+
+        return individuals, families
+
+    def vertices(self, neighbourhood=None):
+        """Returns families and individuals who comprise all vertices in family tree plot
+
+        :param neighbourhood: Individual IDs and family IDs to include, as returned by neighbourhood(); all if not specified
+        :type neighbourhood: tuple
+        """
+        if neighbourhood is None:
+            vertices = list(self._families.values())
+            individual_keys = [individual for individual in self._individuals.values() if not individual.is_parent()]
+            vertices.extend(individual_keys)
+            return vertices
+
+        individual_ids, family_ids = neighbourhood
+        vertices = [self._families[fid] for fid in sorted(family_ids) if fid in self._families]
+        vertices.extend(self._individuals[pid] for pid in sorted(individual_ids) if pid in self._individuals and not self.is_parent(pid))
         return vertices
 
 
@@ -0,0 +1,205 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import logging, contextlib, io, json, time, tracemalloc
+from . import trace
+logger = logging.getLogger("genoplot")
+
+
+class Profiler(trace.Tracer):
+    def __init__(self, trace_memory=True):
+        """
+        Profiler - tracer which also records CPU time and peak traced memory of each span
+
+        Peak memory of a span is the highest traced memory while it was open, relative
+        to memory when it opened, including its nested spans. Memory tracing slows
+        allocation-heavy phases down considerably. It needs tracemalloc.reset_peak(),
+        from Python 3.9, so peak memory is not recorded on earlier versions.
+
+        :param trace_memory: Whether to trace memory allocations with tracemalloc
+        :type trace_memory: bool
+        """
+        super(Profiler, self).__init__()
+        if trace_memory and not hasattr(tracemalloc, "reset_peak"):
+            logger.warn("Peak memory of spans needs tracemalloc.reset_peak() from Python 3.9: not tracing memory")
+            trace_memory = False
+        self.trace_memory = trace_memory
+        self._peaks = []
+
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # Keep the peak of the enclosing span so far, as the traced peak is reset for this one
+            if len(self._peaks) > 0:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            tracemalloc.reset_peak()
+            self._peaks.append(current)
+        cpu_start = time.process_time()
+        with super(Profiler, self).span(name, **attributes):
+            record = self.spans[-1]
+            try:
+                yield
+            finally:
+                record["cpu_seconds"] = time.process_time() - cpu_start
+                record["peak_bytes"] = None
+                if self.trace_memory:
+                    # Peak since the last reset, or of any nested span
+                    peak = max(tracemalloc.get_traced_memory()[1], self._peaks.pop())
+                    record["peak_bytes"] = peak - current
+                    if len(self._peaks) > 0:
+                        self._peaks[-1] = max(self._peaks[-1], peak)
+
+    def report(self, plot=None):
+        """Returns ProfileReport of recorded spans, with element counts of plot if specified
+
+        :param plot: Plot which was profiled
+        :type plot: GenoPlot
+        """
+        return ProfileReport(self.to_dict(), counts=element_counts(plot) if not plot is None else {})
+
+
+class ProfileReport(object):
+    def __init__(self, trace, counts=None):
+        """
+        ProfileReport - defines wall time, CPU time and peak memory of each phase and branch of a profiled plot
+
+        :param trace: Spans and counters from Profiler.to_dict()
+        :type trace: dict
+        :param counts: Element counts of profiled plot
+        :type counts: dict
+        """
+        self.spans = trace["spans"]
+        self.counters = trace["counters"]
+        self.counts = counts if not counts is None else {}
+
+    def phases(self):
+        """Returns spans of phases, excluding per-branch layout"""
+        return [span for span in self.spans if span["name"] != "Branch.layout"]
+
+    def branches(self):
+        """Returns spans of per-branch layout, slowest first"""
+        return sorted((span for span in self.spans if span["name"] == "Branch.layout"), key=lambda span: -span["seconds"])
+
+    def phase(self, name):
+        """Returns first span of phase with specified name, or None if it did not run"""
+        for span in self.spans:
+            if span["name"] == name:
+                return span
+        return None
+
+    def to_dict(self):
+        """Returns report as a dictionary which can be serialized as JSON"""
+        return {
+            "phases": self.phases(),
+            "branches": self.branches(),
+            "counters": self.counters,
+            "counts": self.counts,
+        }
+
+    def save(self, output):
+        """Writes report as JSON to file path or file-like object
+
+        :param output: Output file path or file-like object
+        :type output: str
+        """
+        if hasattr(output, "write"):
+            json.dump(self.to_dict(), output, indent=1, default=str)
+        else:
+            with io.open(output, mode="w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, indent=1, default=str)
+
+    def __str__(self):
+        lines = ["{0:<40} {1:>10} {2:>10} {3:>10}".format("phase", "wall (s)", "cpu (s)", "peak (MB)")]
+        depths = {}
+        rows = [(i, span) for i, span in enumerate(self.spans) if span["name"] != "Branch.layout"]
+        rows.extend((None, span) for span in self.branches()[:10])
+        for i, span in rows:
+            depth = depths[span["parent"]] + 1 if span["parent"] in depths else 0
+            if not i is None:
+                depths[i] = depth
+            name = span["name"]
+            if name == "Branch.layout":
+                name = "Branch {0} ({1} nodes)".format(span["attributes"].get("branch"), span["attributes"].get("nodes"))
+                depth = 1
+            peak = "-" if span.get("peak_bytes") is None else "{0:.1f}".format(span["peak_bytes"] / 2**20)
+            lines.append("{0:<40} {1:>10.3f} {2:>10.3f} {3:>10}".format("  "*depth + name, span["seconds"], span["cpu_seconds"], peak))
+        for name, value in sorted(self.counts.items()):
+            lines.append("{0:<40} {1:>10}".format(name, value))
+        for name, value in sorted(self.counters.items()):
+            lines.append("{0:<40} {1:>10}".format(name, value))
+        return "\n".join(lines)
+
+
+def element_counts(plot):
+    """Returns counts of pedigree, graph and scene elements of plot"""
+    counts = {}
+    pedigree = plot._pedigree
+    if not pedigree is None:
+        counts["pedigree.individuals"] = len(pedigree)
+        counts["pedigree.families"] = len(pedigree._families)
+    graph = plot._graph
+    if not graph is None:
+        counts["graph.nodes"] = len(graph)
+        counts["graph.branches"] = len(graph._branches)
+        counts["graph.branch_links"] = len(graph.branch_links())
+    scene = plot._scene
+    if not scene is None:
+        counts["scene.individuals"] = len(scene)
+        counts["scene.connectors"] = len(scene.connectors) // 4
+        counts["scene.duplicates"] = len(scene.duplicate_sexes)
+    if not plot._writer is None:
+        counts["drawing.elements"] = len(plot._writer)
+    return counts
+
+
+@contextlib.contextmanager
+def profiling(trace_memory=True):
+    """Profiles the body of a with statement and yields its Profiler
+
+    :param trace_memory: Whether to trace memory allocations with tracemalloc
+    :type trace_memory: bool
+    """
+    profiler = Profiler(trace_memory=trace_memory)
+    started = profiler.trace_memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    previous = trace.tracer
+    trace.tracer = profiler
+    try:
+        yield profiler
+    finally:
+        trace.tracer = previous
+        if started:
+            tracemalloc.stop()
+
+
+def profile_plot(name, gedcom_file, output=None, trace_memory=True, **kwargs):
+    """Creates and draws plot under the profiler and returns its ProfileReport
+
+    :param name: Plot name
+    :type name: str
+    :param gedcom_file: GEDCOM file path
+    :type gedcom_file: str
+    :param output: JSON report file path or file-like object; report is not written if not specified
+    :type output: str
+    :param trace_memory: Whether to trace memory allocations with tracemalloc
+    :type trace_memory: bool
+    :param kwargs: GenoPlot parameters
+    :type kwargs: dict
+    """
+    from .genoplot import GenoPlot
+    with profiling(trace_memory=trace_memory) as profiler:
+        with profiler.span("GenoPlot.__init__"):
+            plot = GenoPlot(name, gedcom_file, **kwargs)
+        plot.draw()
+    report = profiler.report(plot)
+    if not output is None:
+        report.save(output)
+    logger.info("Profile of plot '%s':\n%s", name, report)
+    return report
@@ -0,0 +1,212 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import logging, io, json
+from array import array
+logger = logging.getLogger("genoplot")
+
+FORMAT = "genoplot-scene"
+FORMAT_VERSION = 2
+# Individual ID of parents drawn in place of a missing father or mother
+VIRTUAL_ID = -1
+
+
+class Scene(object):
+    def __init__(self, width, height, symbol_size=25, font_size=10):
+        """
+        Scene - defines the laid out elements of a plot, independent of the pedigree and of the drawing
+
+        Elements are held in columns, in the order they are drawn, so a scene renders
+        to the same image as the plot it was exported from. Coordinates are kept as
+        given, integer or float, since the drawing formats them differently:
+        - individuals: ID, position, sex, colour, label lines and label size of each drawn symbol;
+          parents are listed once per family they are drawn in, and virtual parents have ID -1
+          and no label;
+        - connectors: start and end of each straight line connector segment;
+        - duplicates: sex, start and end of each link between copies of a duplicated individual;
+        - branches: coordinate extremes of each branch.
+
+        :param width: Drawing width
+        :type width: float
+        :param height: Drawing height
+        :type height: float
+        :param symbol_size: Width and height of individual symbols
+        :type symbol_size: float
+        :param font_size: Font size of labels
+        :type font_size: float
+        """
+        self.width = width
+        self.height = height
+        self.symbol_size = symbol_size
+        self.font_size = font_size
+
+        self.ids = array("q")
+        self.xs = []
+        self.ys = []
+        self.sexes = []
+        self.colors = array("i")
+        self.palette = []
+        self.label_offsets = array("q", [0])
+        self.labels = []
+        self.label_widths = []
+        self.label_heights = []
+        self.connectors = []
+        self.duplicate_sexes = []
+        self.duplicates = []
+        self.branches = []
+        self._palette_index = {}
+
+    def __len__(self):
+        """Returns number of individual symbols in scene"""
+        return len(self.ids)
+
+    def add_individual(self, pid, x, y, sex, color=None, labels=(), label_size=(0, 0)):
+        """Adds individual symbol to scene
+
+        :param pid: Individual ID, or VIRTUAL_ID for a virtual parent
+        :type pid: int
+        :param sex: Sex of individual, "M", "F" or "U"; stored as its first character
+        :type sex: str
+        :param color: Fill colour; virtual parents have no colour
+        :type color: str
+        :param labels: Label lines drawn below symbol
+        :type labels: list
+        :param label_size: Width and height of label, as measured for layout by Individual.size()
+        :type label_size: tuple
+        """
+        self.ids.append(pid)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.sexes.append((sex or "U")[:1])
+        if color not in self._palette_index:
+            self._palette_index[color] = len(self.palette)
+            self.palette.append(color)
+        self.colors.append(self._palette_index[color])
+        self.labels.extend(str(label) for label in labels)
+        self.label_offsets.append(len(self.labels))
+        self.label_widths.append(label_size[0])
+        self.label_heights.append(label_size[1])
+
+    def individual_labels(self, i):
+        """Returns label lines of individual symbol at specified index"""
+        return self.labels[self.label_offsets[i]:self.label_offsets[i+1]]
+
+    def label_size(self, i):
+        """Returns width and height of label of individual symbol at specified index"""
+        return self.label_widths[i], self.label_heights[i]
+
+    def individuals(self):
+        """Returns generator of (ID, x, y, sex, colour, labels) of individual symbols in drawing order"""
+        return ((self.ids[i], self.xs[i], self.ys[i], self.sexes[i], self.palette[self.colors[i]], self.individual_labels(i))
+                for i in range(len(self.ids)))
+
+    def add_connector(self, start, end):
+        """Adds straight line connector segment between specified coordinates"""
+        self.connectors.extend((start[0], start[1], end[0], end[1]))
+
+    def connector_segments(self):
+        """Returns generator of (start, end) connector segments in drawing order"""
+        c = self.connectors
+        return (((c[i], c[i+1]), (c[i+2], c[i+3])) for i in range(0, len(c), 4))
+
+    def add_duplicate(self, sex, start, end):
+        """Adds link between copies of a duplicated individual at specified coordinates"""
+        self.duplicate_sexes.append((sex or "U")[:1])
+        self.duplicates.extend((start[0], start[1], end[0], end[1]))
+
+    def duplicate_links(self):
+        """Returns generator of (sex, start, end) duplicate links in drawing order"""
+        d = self.duplicates
+        return ((sex, (d[i*4], d[i*4+1]), (d[i*4+2], d[i*4+3])) for i, sex in enumerate(self.duplicate_sexes))
+
+    def add_branch(self, extremes):
+        """Adds coordinate extremes (min x, max x, min y, max y) of branch"""
+        self.branches.extend(extremes)
+
+    def branch_extremes(self):
+        """Returns coordinate extremes of each branch"""
+        b = self.branches
+        return [tuple(b[i:i+4]) for i in range(0, len(b), 4)]
+
+    def to_dict(self):
+        """Returns scene as a dictionary of columns which can be serialized as JSON"""
+        return {
+            "format": FORMAT,
+            "version": FORMAT_VERSION,
+            "width": self.width,
+            "height": self.height,
+            "symbol_size": self.symbol_size,
+            "font_size": self.font_size,
+            "individuals": {
+                "id": self.ids.tolist(),
+                "x": self.xs,
+                "y": self.ys,
+                "sex": "".join(self.sexes),
+                "color": self.colors.tolist(),
+                "label_offsets": self.label_offsets.tolist(),
+                "label_width": self.label_widths,
+                "label_height": self.label_heights,
+            },
+            "palette": self.palette,
+            "labels": self.labels,
+            "connectors": self.connectors,
+            "duplicates": {
+                "sex": "".join(self.duplicate_sexes),
+                "coordinates": self.duplicates,
+            },
+            "branches": self.branches,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Returns scene from dictionary created by to_dict()"""
+        if data.get("format") != FORMAT or data.get("version") != FORMAT_VERSION:
+            raise Exception("Unsupported scene format: {0} version {1}".format(data.get("format"), data.get("version")))
+        scene = cls(data["width"], data["height"], symbol_size=data["symbol_size"], font_size=data["font_size"])
+        individuals = data["individuals"]
+        scene.ids = array("q", individuals["id"])
+        scene.xs = individuals["x"]
+        scene.ys = individuals["y"]
+        scene.sexes = list(individuals["sex"])
+        scene.colors = array("i", individuals["color"])
+        scene.label_offsets = array("q", individuals["label_offsets"])
+        scene.label_widths = individuals["label_width"]
+        scene.label_heights = individuals["label_height"]
+        scene.palette = data["palette"]
+        scene._palette_index = {color: i for i, color in enumerate(scene.palette)}
+        scene.labels = data["labels"]
+        scene.connectors = data["connectors"]
+        scene.duplicate_sexes = list(data["duplicates"]["sex"])
+        scene.duplicates = data["duplicates"]["coordinates"]
+        scene.branches = data["branches"]
+        return scene
+
+    def save(self, output):
+        """Writes scene as JSON to file path or file-like object
+
+        :param output: Output file path or file-like object
+        :type output: str
+        """
+        if hasattr(output, "write"):
+            json.dump(self.to_dict(), output, separators=(",", ":"))
+        else:
+            with io.open(output, mode="w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, separators=(",", ":"))
+        logger.debug("Saved scene of %i individuals and %i connectors", len(self), len(self.connectors)//4)
+
+    @classmethod
+    def load(cls, source):
+        """Returns scene read from JSON file path or file-like object
+
+        :param source: Scene file path or file-like object
+        :type source: str
+        """
+        if hasattr(source, "read"):
+            return cls.from_dict(json.load(source))
+        with io.open(source, mode="r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
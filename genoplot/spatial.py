@@ -0,0 +1,183 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import logging, math
+from array import array
+logger = logging.getLogger("genoplot")
+
+
+class SpatialIndex(object):
+    def __init__(self, cell_size=100):
+        """
+        SpatialIndex - defines a uniform grid index of items by bounding box
+
+        Each item is listed in every grid cell its bounding box covers, so point and
+        rectangle queries only test items in the cells they touch, and nearest item
+        queries search rings of cells outwards from the point until no closer item
+        can remain. Cell size should be about the size of a typical item.
+
+        :param cell_size: Width and height of grid cells
+        :type cell_size: float
+        """
+        self.cell_size = float(cell_size)
+        self._items = []
+        self._bounds = array("d")
+        self._cells = {}
+        self._cell_extremes = None
+
+    def __len__(self):
+        """Returns number of items in index"""
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def _cell(self, x, y):
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def add(self, item, x1, y1, x2, y2):
+        """Adds item with specified bounding box to index
+
+        :param item: Item returned by queries
+        :type item: object
+        :param x1: Minimum x coordinate
+        :type x1: float
+        :param y1: Minimum y coordinate
+        :type y1: float
+        :param x2: Maximum x coordinate
+        :type x2: float
+        :param y2: Maximum y coordinate
+        :type y2: float
+        """
+        if x1 > x2:
+            x1, x2 = x2, x1
+        if y1 > y2:
+            y1, y2 = y2, y1
+        i = len(self._items)
+        self._items.append(item)
+        self._bounds.extend((x1, y1, x2, y2))
+
+        c1, r1 = self._cell(x1, y1)
+        c2, r2 = self._cell(x2, y2)
+        for c in range(c1, c2 + 1):
+            for r in range(r1, r2 + 1):
+                self._cells.setdefault((c, r), []).append(i)
+        if self._cell_extremes is None:
+            self._cell_extremes = [c1, r1, c2, r2]
+        else:
+            extremes = self._cell_extremes
+            extremes[0] = min(extremes[0], c1)
+            extremes[1] = min(extremes[1], r1)
+            extremes[2] = max(extremes[2], c2)
+            extremes[3] = max(extremes[3], r2)
+
+    def bounds(self, i):
+        """Returns bounding box of item at specified insertion index"""
+        return tuple(self._bounds[i*4:i*4+4])
+
+    def _query(self, x1, y1, x2, y2):
+        """Returns insertion indices of items intersecting rectangle, in insertion order"""
+        c1, r1 = self._cell(x1, y1)
+        c2, r2 = self._cell(x2, y2)
+        if not self._cell_extremes is None:
+            # Only visit cells which can hold items
+            c1, r1 = max(c1, self._cell_extremes[0]), max(r1, self._cell_extremes[1])
+            c2, r2 = min(c2, self._cell_extremes[2]), min(r2, self._cell_extremes[3])
+        bounds = self._bounds
+        found = set()
+        for c in range(c1, c2 + 1):
+            for r in range(r1, r2 + 1):
+                for i in self._cells.get((c, r), ()):
+                    if i in found:
+                        continue
+                    if bounds[i*4] <= x2 and bounds[i*4+2] >= x1 and bounds[i*4+1] <= y2 and bounds[i*4+3] >= y1:
+                        found.add(i)
+        return sorted(found)
+
+    def at(self, x, y):
+        """Returns items whose bounding box contains point
+
+        :param x: X coordinate
+        :type x: float
+        :param y: Y coordinate
+        :type y: float
+        """
+        return [self._items[i] for i in self._query(x, y, x, y)]
+
+    def within(self, x1, y1, x2, y2):
+        """Returns items whose bounding box intersects rectangle
+
+        :param x1: First x coordinate
+        :type x1: float
+        :param y1: First y coordinate
+        :type y1: float
+        :param x2: Second x coordinate
+        :type x2: float
+        :param y2: Second y coordinate
+        :type y2: float
+        """
+        if x1 > x2:
+            x1, x2 = x2, x1
+        if y1 > y2:
+            y1, y2 = y2, y1
+        return [self._items[i] for i in self._query(x1, y1, x2, y2)]
+
+    def _distance(self, i, x, y):
+        """Returns distance from point to bounding box of item at insertion index"""
+        x1, y1, x2, y2 = self._bounds[i*4:i*4+4]
+        dx = max(x1 - x, 0, x - x2)
+        dy = max(y1 - y, 0, y - y2)
+        return math.hypot(dx, dy)
+
+    def nearest(self, x, y, max_distance=None):
+        """Returns item whose bounding box is nearest to point, or None if index is empty or none is within max_distance
+
+        Ties are resolved by insertion order.
+
+        :param x: X coordinate
+        :type x: float
+        :param y: Y coordinate
+        :type y: float
+        :param max_distance: Maximum distance from point to item
+        :type max_distance: float
+        """
+        if len(self._items) == 0:
+            return None
+        c, r = self._cell(x, y)
+        cmin, rmin, cmax, rmax = self._cell_extremes
+        # Rings beyond this one only hold cells outside the grid extremes
+        last_ring = max(c - cmin, cmax - c, r - rmin, rmax - r, 0)
+
+        best = None
+        best_distance = math.inf
+        seen = set()
+        ring = 0
+        while ring <= last_ring:
+            if ring == 0:
+                cells = [(c, r)]
+            else:
+                cells = [(c + dc, r + dr) for dc in range(-ring, ring + 1) for dr in (-ring, ring)]
+                cells.extend((c + dc, r + dr) for dc in (-ring, ring) for dr in range(-ring + 1, ring))
+            for cell in cells:
+                for i in self._cells.get(cell, ()):
+                    if i in seen:
+                        continue
+                    seen.add(i)
+                    distance = self._distance(i, x, y)
+                    if distance < best_distance or (distance == best_distance and i < best):
+                        best, best_distance = i, distance
+            # Items in further rings are at least ring cells away from the point
+            if best_distance <= ring*self.cell_size:
+                break
+            if not max_distance is None and ring*self.cell_size > max_distance:
+                break
+            ring += 1
+
+        if best is None or (not max_distance is None and best_distance > max_distance):
+            return None
+        return self._items[best]
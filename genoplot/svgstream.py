@@ -0,0 +1,82 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import logging, io, shutil, tempfile
+logger = logging.getLogger("genoplot")
+
+
+class SVGLayerWriter(object):
+    def __init__(self, drawing, spool_size=1024*1024):
+        """
+        SVGLayerWriter - writes drawing elements to per-layer spools and streams them to the output in layer order
+
+        Elements are serialized as soon as they are added, so memory use does not grow with
+        the number of elements; spools move to temporary files once larger than spool_size.
+
+        :param drawing: Drawing defining the image header and size
+        :type drawing: svgwrite.Drawing
+        :param spool_size: Size in characters above which a layer spools to disk
+        :type spool_size: int
+        """
+        self._drawing = drawing
+        self._spool_size = spool_size
+        self._layers = {}
+        self._count = 0
+
+    def __len__(self):
+        """Returns number of elements written"""
+        return self._count
+
+    def add(self, layer, element):
+        """Serializes element to specified layer
+
+        :param layer: Layer name; layers are output in sorted order
+        :type layer: str
+        :param element: Drawing element
+        :type element: svgwrite.base.BaseElement
+        """
+        if layer not in self._layers:
+            self._layers[layer] = tempfile.SpooledTemporaryFile(max_size=self._spool_size, mode="w+", encoding="utf-8")
+        self._layers[layer].write(element.tostring())
+        self._count += 1
+
+    def write(self, fileobj):
+        """Writes image to file-like object"""
+        header = io.StringIO()
+        self._drawing.write(header)
+        header = header.getvalue()
+        # Stream layers into the empty drawing before its closing tag
+        end = header.rindex("</svg>")
+        fileobj.write(header[:end])
+        for layer in sorted(self._layers):
+            spool = self._layers[layer]
+            spool.seek(0)
+            shutil.copyfileobj(spool, fileobj)
+        fileobj.write(header[end:])
+
+    def save(self, output):
+        """Writes image to file path or file-like object and releases layer spools
+
+        :param output: Output file path or file-like object
+        :type output: str
+        """
+        logger.debug("Writing %i elements in %i layers", self._count, len(self._layers))
+        try:
+            if hasattr(output, "write"):
+                self.write(output)
+            else:
+                with io.open(output, mode="w", encoding="utf-8") as fileobj:
+                    self.write(fileobj)
+        finally:
+            self.close()
+
+    def close(self):
+        """Releases layer spools"""
+        for spool in self._layers.values():
+            spool.close()
+        self._layers = {}
@@ -0,0 +1,223 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import logging, io, random
+from .vertex import family_vertex, individual_vertex
+logger = logging.getLogger("genoplot")
+
+GIVEN_NAMES = {
+    "M": ("John", "William", "James", "George", "Charles", "Thomas", "Henry", "Joseph", "Samuel", "David"),
+    "F": ("Mary", "Anna", "Elizabeth", "Margaret", "Sarah", "Emma", "Alice", "Martha", "Clara", "Ruth"),
+}
+SURNAMES = ("Smith", "Miller", "Baker", "Carter", "Turner", "Walker", "Wright", "Hughes", "Foster", "Porter",
+            "Newell", "Barnes", "Fisher", "Harper", "Mason", "Parker", "Reed", "Sawyer", "Tanner", "Weaver")
+MONTHS = ("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC")
+# Latest birth year; GEDCOM years have at most four digits, so deep pedigrees stop ageing here
+MAX_YEAR = 9999
+
+
+class SyntheticPedigree(object):
+    def __init__(self, individuals=1000, depth=None, fanout=3, remarriage_rate=0.1, collapse_rate=0.05,
+                    branches=1, marriage_rate=0.8, seed=None):
+        """
+        SyntheticPedigree - defines a generated pedigree of controlled size and shape
+
+        Each branch starts from a founding couple and grows one generation at a time
+        until it reaches its share of individuals or the specified depth. Every
+        generation has at least one child and one marriage while the branch is below
+        its share, so branches do not die out early.
+
+        :param individuals: Approximate number of individuals
+        :type individuals: int
+        :param depth: Maximum number of generations below the founders; unlimited if not specified
+        :type depth: int
+        :param fanout: Mean number of children per family
+        :type fanout: float
+        :param remarriage_rate: Probability that a married individual has a second family
+        :type remarriage_rate: float
+        :param collapse_rate: Probability that a spouse is a cousin from the same branch (pedigree collapse)
+        :type collapse_rate: float
+        :param branches: Number of disconnected branches
+        :type branches: int
+        :param marriage_rate: Probability that a child marries
+        :type marriage_rate: float
+        :param seed: Random seed
+        :type seed: int
+        """
+        self._random = random.Random(seed)
+        self.fanout = fanout
+        self.remarriage_rate = remarriage_rate
+        self.collapse_rate = collapse_rate
+        self.marriage_rate = marriage_rate
+        # Individuals are [sex, given name, surname, birth year, child-of family, spouse-in families]
+        self._individuals = []
+        # Families are [husband, wife, children]
+        self._families = []
+
+        branches = max(1, branches)
+        for b in range(branches):
+            budget = (individuals - len(self._individuals)) // (branches - b)
+            self._generate_branch(b, budget, depth)
+        logger.info("Generated synthetic pedigree: %i individuals and %i families in %i branches",
+                    len(self._individuals), len(self._families), branches)
+
+    def __len__(self):
+        """Returns number of individuals in pedigree"""
+        return len(self._individuals)
+
+    def family_count(self):
+        """Returns number of families in pedigree"""
+        return len(self._families)
+
+    def vertex_graph(self):
+        """Returns vertex IDs and child vertex IDs of each vertex of the family graph of the pedigree
+
+        Vertices and edges are those FamilyGraph creates from the written GEDCOM, so the
+        graph stages can be benchmarked without parsing it.
+        """
+        vertices = [family_vertex(fid + 1) for fid in range(len(self._families))]
+        vertices.extend(individual_vertex(pid + 1) for pid, person in enumerate(self._individuals) if len(person[5]) == 0)
+        children = dict((vid, []) for vid in vertices)
+        for fid, (husband, wife, family_children) in enumerate(self._families):
+            edges = children[family_vertex(fid + 1)]
+            for child in family_children:
+                fams = self._individuals[child][5]
+                if len(fams) > 0:
+                    edges.extend(family_vertex(f + 1) for f in fams)
+                else:
+                    edges.append(individual_vertex(child + 1))
+        return vertices, children
+
+    def _add_individual(self, sex, surname, year, famc=None):
+        year = min(year, MAX_YEAR)
+        self._individuals.append([sex, self._random.choice(GIVEN_NAMES[sex]), surname, year, famc, []])
+        return len(self._individuals) - 1
+
+    def _add_child(self, fid):
+        husband, wife, family_children = self._families[fid]
+        year = self._individuals[husband][3] + self._random.randint(20, 40)
+        child = self._add_individual(self._random.choice("MF"), self._individuals[husband][2], year, famc=fid)
+        family_children.append(child)
+        return child
+
+    def _add_family(self, husband, wife):
+        self._families.append([husband, wife, []])
+        fid = len(self._families) - 1
+        self._individuals[husband][5].append(fid)
+        self._individuals[wife][5].append(fid)
+        return fid
+
+    def _add_spouse(self, pid, surname):
+        """Adds new spouse from outside of pedigree for individual and returns their family"""
+        person = self._individuals[pid]
+        sex = "F" if person[0] == "M" else "M"
+        spouse = self._add_individual(sex, surname, person[3] + self._random.randint(-5, 5))
+        return self._marry(pid, spouse)
+
+    def _marry(self, pid, spouse):
+        if self._individuals[pid][0] == "M":
+            return self._add_family(pid, spouse)
+        return self._add_family(spouse, pid)
+
+    def _generate_branch(self, branch, budget, depth):
+        start = len(self._individuals)
+        surname = SURNAMES[branch % len(SURNAMES)]
+        year = 1600 + self._random.randint(0, 100)
+        husband = self._add_individual("M", surname, year)
+        wife = self._add_individual("F", self._random.choice(SURNAMES), year + self._random.randint(-5, 5))
+        generation = [self._add_family(husband, wife)]
+
+        g = 0
+        while len(generation) > 0 and (depth is None or g < depth):
+            children = []
+            for fid in generation:
+                count = max(0, int(round(self._random.gauss(self.fanout, 1))))
+                for i in range(count):
+                    if len(self._individuals) - start >= budget:
+                        break
+                    children.append(self._add_child(fid))
+            # A generation without children would end the branch before it reaches its budget
+            if len(children) == 0 and len(self._individuals) - start < budget:
+                children.append(self._add_child(self._random.choice(generation)))
+
+            # Marry children of this generation, to cousins or to new spouses
+            generation = []
+            unmarried = {"M": [], "F": []}
+            for child in children:
+                unmarried[self._individuals[child][0]].append(child)
+            self._random.shuffle(children)
+            for child in children:
+                person = self._individuals[child]
+                if len(person[5]) > 0 or self._random.random() > self.marriage_rate:
+                    continue
+                spouse = None
+                if self._random.random() < self.collapse_rate:
+                    spouse = self._find_cousin(child, unmarried["F" if person[0] == "M" else "M"])
+                if not spouse is None:
+                    generation.append(self._marry(child, spouse))
+                elif len(self._individuals) - start < budget:
+                    generation.append(self._add_spouse(child, self._random.choice(SURNAMES)))
+                if len(person[5]) > 0 and len(self._individuals) - start < budget and \
+                        self._random.random() < self.remarriage_rate:
+                    generation.append(self._add_spouse(child, self._random.choice(SURNAMES)))
+            # Likewise, a generation in which nobody marries would end the branch
+            if len(generation) == 0 and len(self._individuals) - start < budget:
+                generation.append(self._add_spouse(children[0], self._random.choice(SURNAMES)))
+            g += 1
+
+    def _find_cousin(self, pid, candidates, attempts=5):
+        """Returns unmarried candidate from another family of the same generation, if found"""
+        famc = self._individuals[pid][4]
+        for _ in range(min(attempts, len(candidates))):
+            candidate = self._random.choice(candidates)
+            if self._individuals[candidate][4] != famc and len(self._individuals[candidate][5]) == 0:
+                return candidate
+        return None
+
+    def write(self, fileobj):
+        """Writes pedigree as GEDCOM 5.5 to file-like object"""
+        fileobj.write("0 HEAD\n1 SOUR genoplot\n1 GEDC\n2 VERS 5.5\n1 CHAR UTF-8\n")
+        for pid, (sex, given, surname, year, famc, fams) in enumerate(self._individuals):
+            lines = [
+                "0 @P{0}@ INDI".format(pid + 1),
+                "1 NAME {0} /{1}/".format(given, surname),
+                "1 SEX {0}".format(sex),
+                "1 BIRT",
+                "2 DATE {0} {1} {2}".format(pid % 28 + 1, MONTHS[pid % 12], year),
+                "2 PLAC Springfield",
+            ]
+            if not famc is None:
+                lines.append("1 FAMC @F{0}@".format(famc + 1))
+            lines.extend("1 FAMS @F{0}@".format(fid + 1) for fid in fams)
+            fileobj.write("\n".join(lines) + "\n")
+        for fid, (husband, wife, children) in enumerate(self._families):
+            lines = ["0 @F{0}@ FAM".format(fid + 1), "1 HUSB @P{0}@".format(husband + 1), "1 WIFE @P{0}@".format(wife + 1)]
+            lines.extend("1 CHIL @P{0}@".format(child + 1) for child in children)
+            fileobj.write("\n".join(lines) + "\n")
+        fileobj.write("0 TRLR\n")
+
+    def save(self, output):
+        """Writes pedigree as GEDCOM 5.5 to file path or file-like object"""
+        if hasattr(output, "write"):
+            self.write(output)
+        else:
+            with io.open(output, mode="w", encoding="utf-8") as fileobj:
+                self.write(fileobj)
+
+
+def generate_gedcom(output, individuals=1000, **kwargs):
+    """Writes synthetic GEDCOM to file path or file-like object and returns generated SyntheticPedigree
+
+    :param output: Output file path or file-like object
+    :type output: str
+    :param individuals: Approximate number of individuals
+    :type individuals: int
+    """
+    pedigree = SyntheticPedigree(individuals=individuals, **kwargs)
+    pedigree.save(output)
+    return pedigree
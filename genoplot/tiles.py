@@ -0,0 +1,248 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import logging, io, json, math, mmap, os, re, tempfile
+import concurrent.futures
+from array import array
+from .utils import calculate_text_size
+logger = logging.getLogger("genoplot")
+
+TILE_HEADER = ('<?xml version="1.0" encoding="utf-8" ?>\n'
+               '<svg baseProfile="full" height="{height}" version="1.1" viewBox="{x} {y} {w} {h}" width="{width}" '
+               'xmlns="http://www.w3.org/2000/svg" xmlns:ev="http://www.w3.org/2001/xml-events" '
+               'xmlns:xlink="http://www.w3.org/1999/xlink">')
+TILE_FOOTER = "</svg>"
+FONT_SIZE = re.compile(r"font-size:\s*([0-9.]+)px")
+NUMBER = re.compile(r"-?[0-9]*\.?[0-9]+(?:[eE][-+]?[0-9]+)?")
+# Elements without known bounds are drawn on every tile
+UNBOUNDED = (-math.inf, -math.inf, math.inf, math.inf)
+
+
+def _number(value):
+    """Returns first number of SVG attribute value"""
+    if type(value) is str:
+        value = value.split()[0]
+    return float(value)
+
+
+def element_bounds(element):
+    """Returns (x1, y1, x2, y2) bounding box of drawing element from its attributes, or None if unknown
+
+    :param element: Drawing element
+    :type element: svgwrite.base.BaseElement
+    """
+    attribs = element.attribs
+    name = element.elementname
+    try:
+        if name == "rect":
+            x, y = _number(attribs["x"]), _number(attribs["y"])
+            return x, y, x + _number(attribs["width"]), y + _number(attribs["height"])
+        elif name == "ellipse":
+            cx, cy = _number(attribs["cx"]), _number(attribs["cy"])
+            rx, ry = _number(attribs["rx"]), _number(attribs["ry"])
+            return cx - rx, cy - ry, cx + rx, cy + ry
+        elif name == "line":
+            x1, y1, x2, y2 = (_number(attribs[k]) for k in ("x1", "y1", "x2", "y2"))
+            return min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+        elif name == "path":
+            # A quadratic or cubic curve lies within the bounds of its control points
+            # svgwrite keeps path data in commands until the element is serialized
+            d = attribs["d"] if "d" in attribs else " ".join(str(command) for command in element.commands)
+            values = [float(v) for v in NUMBER.findall(d)]
+            xs, ys = values[0::2], values[1::2]
+            return min(xs), min(ys), max(xs), max(ys)
+        elif name == "text":
+            x, y = _number(attribs["x"]), _number(attribs["y"])
+            match = FONT_SIZE.search(attribs.get("style", ""))
+            width, height = calculate_text_size(str(element.text), float(match.group(1)) if match else 10)
+            if "text-anchor: middle" in attribs.get("style", ""):
+                x -= width/2
+            return x, y - height, x + width, y + height*0.25
+    except (KeyError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _write_tiles(task):
+    """Writes tiles from element data file and (tile path, header, element spans) list; returns number written"""
+    data_path, tiles = task
+    with open(data_path, "rb") as data:
+        buffer = mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for path, header, spans in tiles:
+                with io.open(path, mode="wb") as f:
+                    f.write(header.encode("utf-8"))
+                    for offset, length in spans:
+                        f.write(buffer[offset:offset+length])
+                    f.write(TILE_FOOTER.encode("utf-8"))
+        finally:
+            buffer.close()
+    return len(tiles)
+
+
+class SVGTileWriter(object):
+    def __init__(self, drawing, tile_size=512, workers=None, min_feature_size=2, margin=2):
+        """
+        SVGTileWriter - writes drawing elements to a multi-resolution pyramid of SVG tiles
+
+        Accepts elements like SVGLayerWriter. Each element is serialized to a data file
+        as it is added and indexed by its bounding box; on save, each tile is written
+        with the elements which intersect it, in layer order. Level 0 shows the whole
+        drawing in one tile and each following level doubles the scale, up to full
+        size. Elements smaller than min_feature_size pixels at a level's scale are left
+        out of that level. Tiles are written to {output}/{level}/{column}_{row}.svg
+        with a manifest.json describing the pyramid.
+
+        :param drawing: Drawing defining the image size
+        :type drawing: svgwrite.Drawing
+        :param tile_size: Width and height of tiles in pixels
+        :type tile_size: int
+        :param workers: Number of processes used to write tiles; written in this process if not specified
+        :type workers: int
+        :param min_feature_size: Size in pixels below which elements are left out of a level
+        :type min_feature_size: float
+        :param margin: Margin added around element bounds for strokes
+        :type margin: float
+        """
+        self.width = _number(drawing["width"])
+        self.height = _number(drawing["height"])
+        self.tile_size = tile_size
+        self.workers = workers
+        self.min_feature_size = min_feature_size
+        self.margin = margin
+
+        fd, self._data_path = tempfile.mkstemp(suffix=".svgdata")
+        self._data = os.fdopen(fd, "wb")
+        self._offsets = array("q")
+        self._lengths = array("q")
+        self._layers = array("i")
+        self._bounds = array("d")
+        self._layer_names = {}
+
+    def __len__(self):
+        """Returns number of elements written"""
+        return len(self._offsets)
+
+    def add(self, layer, element):
+        """Serializes element to specified layer
+
+        :param layer: Layer name; layers are output in sorted order
+        :type layer: str
+        :param element: Drawing element
+        :type element: svgwrite.base.BaseElement
+        """
+        data = element.tostring().encode("utf-8")
+        self._offsets.append(self._data.tell())
+        self._lengths.append(len(data))
+        self._data.write(data)
+        self._layers.append(self._layer_names.setdefault(layer, len(self._layer_names)))
+        bounds = element_bounds(element)
+        if bounds is None:
+            bounds = UNBOUNDED
+        else:
+            x1, y1, x2, y2 = bounds
+            bounds = (x1 - self.margin, y1 - self.margin, x2 + self.margin, y2 + self.margin)
+        self._bounds.extend(bounds)
+
+    def levels(self):
+        """Returns number of levels in pyramid"""
+        return max(0, int(math.ceil(math.log2(max(self.width, self.height, 1) / self.tile_size)))) + 1
+
+    def _level_tiles(self, level, ranks):
+        """Returns scale, tile size in drawing units, columns, rows and element IDs of each tile of level"""
+        top = self.levels() - 1
+        scale = 2.0**(level - top)
+        span = self.tile_size / scale
+        columns = max(1, int(math.ceil(self.width / span)))
+        rows = max(1, int(math.ceil(self.height / span)))
+        min_size = self.min_feature_size / scale
+        bounds = self._bounds
+
+        tiles = {}
+        for i in range(len(self._offsets)):
+            x1, y1, x2, y2 = bounds[i*4:i*4+4]
+            if level < top and x2 - x1 < min_size and y2 - y1 < min_size:
+                continue
+            c1 = max(0, int(x1 // span)) if x1 > -math.inf else 0
+            c2 = min(columns - 1, int(x2 // span)) if x2 < math.inf else columns - 1
+            r1 = max(0, int(y1 // span)) if y1 > -math.inf else 0
+            r2 = min(rows - 1, int(y2 // span)) if y2 < math.inf else rows - 1
+            for c in range(c1, c2 + 1):
+                for r in range(r1, r2 + 1):
+                    tiles.setdefault((c, r), []).append(i)
+        for ids in tiles.values():
+            ids.sort(key=lambda i: (ranks[self._layers[i]], i))
+        return scale, span, columns, rows, tiles
+
+    def write(self, directory):
+        """Writes tiles and manifest to directory"""
+        self._data.flush()
+        names = sorted(self._layer_names)
+        ranks = [0]*len(names)
+        for rank, name in enumerate(names):
+            ranks[self._layer_names[name]] = rank
+
+        manifest = {
+            "format": "svg",
+            "width": self.width,
+            "height": self.height,
+            "tile_size": self.tile_size,
+            "levels": [],
+        }
+        tasks = []
+        for level in range(self.levels()):
+            scale, span, columns, rows, tiles = self._level_tiles(level, ranks)
+            os.makedirs(os.path.join(directory, str(level)), exist_ok=True)
+            for (c, r), ids in sorted(tiles.items()):
+                x = c*span
+                y = r*span
+                w = min(span, self.width - x)
+                h = min(span, self.height - y)
+                header = TILE_HEADER.format(x=x, y=y, w=w, h=h, width=int(math.ceil(w*scale)), height=int(math.ceil(h*scale)))
+                spans = [(self._offsets[i], self._lengths[i]) for i in ids]
+                tasks.append((os.path.join(directory, str(level), "{0}_{1}.svg".format(c, r)), header, spans))
+            manifest["levels"].append({
+                "level": level,
+                "scale": scale,
+                "columns": columns,
+                "rows": rows,
+                "tiles": sorted([c, r] for c, r in tiles),
+            })
+
+        if len(self._offsets) == 0:
+            count = 0
+        elif self.workers is None or self.workers < 2:
+            count = _write_tiles((self._data_path, tasks))
+        else:
+            # Batch tiles so that each task writes many small files
+            batch = max(1, len(tasks) // (self.workers*8))
+            batches = [(self._data_path, tasks[i:i+batch]) for i in range(0, len(tasks), batch)]
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as executor:
+                count = sum(executor.map(_write_tiles, batches))
+
+        with io.open(os.path.join(directory, "manifest.json"), mode="w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        logger.info("Wrote %i tiles in %i levels from %i elements", count, self.levels(), len(self))
+
+    def save(self, output):
+        """Writes tiles and manifest to output directory and removes element data
+
+        :param output: Output directory path
+        :type output: str
+        """
+        try:
+            self.write(output)
+        finally:
+            self.close()
+
+    def close(self):
+        """Removes element data"""
+        if not self._data.closed:
+            self._data.close()
+        if os.path.exists(self._data_path):
+            os.remove(self._data_path)
@@ -0,0 +1,129 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+"""
+Structured tracing of plot phases
+
+Tracing is off unless a Tracer is started. Hot paths check the module level
+tracer before recording anything, so disabled tracing costs one global lookup:
+
+    if not trace.tracer is None:
+        trace.tracer.count("layout.apportion_iterations", iterations)
+
+Phases are wrapped in span(), which returns a shared no-op context when
+tracing is off.
+"""
+
+import logging, collections, contextlib, io, json, time
+logger = logging.getLogger("genoplot")
+
+# Active Tracer, or None if tracing is off
+tracer = None
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+class Tracer(object):
+    def __init__(self):
+        """
+        Tracer - records nested spans with their timings and attributes, and named counters
+
+        Span start and end times are seconds since the tracer was created.
+        """
+        self.spans = []
+        self.counters = collections.Counter()
+        self._origin = time.perf_counter()
+        self._open = []
+
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        """Records span around the body of a with statement
+
+        :param name: Span name, e.g. "FamilyGraph._layout"
+        :type name: str
+        :param attributes: Values recorded with span
+        :type attributes: dict
+        """
+        record = {
+            "name": name,
+            "parent": self._open[-1] if len(self._open) > 0 else None,
+            "start": time.perf_counter() - self._origin,
+            "end": None,
+            "attributes": attributes,
+        }
+        index = len(self.spans)
+        self.spans.append(record)
+        self._open.append(index)
+        try:
+            yield
+        finally:
+            self._open.pop()
+            record["end"] = time.perf_counter() - self._origin
+
+    def count(self, name, n=1):
+        """Adds n to named counter"""
+        self.counters[name] += n
+
+    def to_dict(self):
+        """Returns spans, with their durations, and counters as a dictionary which can be serialized as JSON"""
+        spans = []
+        for record in self.spans:
+            record = dict(record)
+            record["seconds"] = None if record["end"] is None else record["end"] - record["start"]
+            spans.append(record)
+        return {"spans": spans, "counters": dict(self.counters)}
+
+    def save(self, output):
+        """Writes trace as JSON to file path or file-like object
+
+        :param output: Output file path or file-like object
+        :type output: str
+        """
+        if hasattr(output, "write"):
+            json.dump(self.to_dict(), output, indent=1, default=str)
+        else:
+            with io.open(output, mode="w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, indent=1, default=str)
+
+
+def start():
+    """Starts and returns a new tracer"""
+    global tracer
+    tracer = Tracer()
+    return tracer
+
+
+def stop():
+    """Stops tracing and returns the tracer which was active, if any"""
+    global tracer
+    stopped, tracer = tracer, None
+    return stopped
+
+
+@contextlib.contextmanager
+def tracing():
+    """Traces the body of a with statement and yields its Tracer"""
+    global tracer
+    previous = tracer
+    try:
+        yield start()
+    finally:
+        tracer = previous
+
+
+def span(name, **attributes):
+    """Returns context recording span on the active tracer, or a no-op context if tracing is off"""
+    if tracer is None:
+        return _NO_SPAN
+    return tracer.span(name, **attributes)
+
+
+def count(name, n=1):
+    """Adds n to named counter of the active tracer, if any; hot paths should check trace.tracer instead"""
+    if not tracer is None:
+        tracer.count(name, n)
@@ -39,9 +39,12 @@ def calculate_text_size(text, font_size):
     return max(width, default=0), sum(height)
 
 
+# Tabs and commas become spaces, other punctuation is removed
+_NAME_TRANSLATION = str.maketrans({"\t": " ", ",": " ", "'": None, '"': None, "(": None, ")": None, ".": None})
+
+
 def stripName(name):
     if not type(name) is str:
         return name
-    invalid = "'\"(),."
-    return "".join(c for c in name.replace("\t", " ").replace(",", " ") if c not in invalid)
+    return name.translate(_NAME_TRANSLATION)
 
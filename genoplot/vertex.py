@@ -0,0 +1,47 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+"""
+Family graph vertex IDs
+
+Vertices are identified by integers which carry the element type in their
+lowest bit and the family or individual ID in the remaining bits:
+
+    family_vertex(12) == 25, individual_vertex(12) == 24
+
+Hot loops may test and unpack vertex IDs inline, as vid & FAMILY_TAG and
+vid >> 1, rather than calling these functions.
+"""
+
+# Type tag of family vertex IDs; individual vertex IDs have no tag
+FAMILY_TAG = 1
+
+
+def family_vertex(fid):
+    """Returns vertex ID of family with specified ID"""
+    return (fid << 1) | FAMILY_TAG
+
+
+def individual_vertex(pid):
+    """Returns vertex ID of individual with specified ID"""
+    return pid << 1
+
+
+def is_family_vertex(vid):
+    """Returns whether vertex ID is of a family"""
+    return vid & FAMILY_TAG == FAMILY_TAG
+
+
+def element_id(vid):
+    """Returns family or individual ID of vertex ID"""
+    return vid >> 1
+
+
+def vertex_name(vid):
+    """Returns readable name of vertex ID for log messages, e.g. F12 or P12"""
+    return "{0}{1}".format("F" if vid & FAMILY_TAG else "P", vid >> 1)
@@ -0,0 +1,145 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import io, json, multiprocessing, os
+import networkx
+import pytest
+from genoplot import batch
+from genoplot.synthetic import generate_gedcom
+
+# Worker processes see patched jobs only if they are forked from the test process
+requires_fork = pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="Patched jobs need forked workers")
+requires_networkx1 = pytest.mark.skipif(not hasattr(networkx.DiGraph, "nodes_iter"), reason="Family graph layout uses the networkx 1.x API")
+
+
+def patched_run_job(job, cache_dir=None):
+    """Stands in for run_job in worker processes, failing in the way the job name asks for"""
+    if job["name"] == "crash":
+        os._exit(1)
+    if job["name"] == "unpicklable":
+        return lambda: None
+    if job["name"] == "error":
+        return batch._job_result(job, "failed", seconds=0.0, error="Exception: layout failed")
+    return batch._job_result(job, "ok", seconds=0.0, individuals=len(batch.cache.cached_pedigree(job["gedcom"], cache_dir)))
+
+
+@pytest.fixture
+def gedcom_file(tmp_path):
+    path = str(tmp_path / "family.ged")
+    generate_gedcom(path, individuals=50, seed=2)
+    return path
+
+
+def manifest(tmp_path, data):
+    path = str(tmp_path / "manifest.json")
+    with open(path, "w") as f:
+        json.dump(data, f)
+    return path
+
+
+def test_load_manifest(tmp_path, gedcom_file):
+    jobs = batch.load_manifest(manifest(tmp_path, {
+        "defaults": {"generations": 3, "packing": "row"},
+        "jobs": [
+            {"gedcom": "family.ged", "proband": 12, "output": "charts/family_12.svg"},
+            {"gedcom": "family.ged", "proband": 40, "options": {"generations": 5}},
+            {"gedcom": "family.ged", "name": "Whole family"},
+            {"gedcom": "family.ged", "name": "tiles", "options": {"tile_size": 256}},
+        ],
+    }))
+    assert [job["name"] for job in jobs] == ["family_12", "family_40", "Whole family", "tiles"]
+    assert [job["index"] for job in jobs] == [0, 1, 2, 3]
+    assert all(job["gedcom"] == gedcom_file for job in jobs)
+    assert jobs[0]["output"] == str(tmp_path / "charts" / "family_12.svg")
+    assert jobs[1]["output"] == str(tmp_path / "family_40.svg")
+    assert jobs[2]["output"] == str(tmp_path / "Whole family.svg")
+    # Tiled output is a directory
+    assert jobs[3]["output"] == str(tmp_path / "tiles")
+    assert jobs[0]["options"] == {"generations": 3, "packing": "row"}
+    assert jobs[1]["options"] == {"generations": 5, "packing": "row"}
+
+
+def test_load_manifest_list_from_file_object(tmp_path):
+    jobs = batch.load_manifest(io.StringIO(json.dumps([{"gedcom": "a.ged"}])))
+    assert jobs[0]["gedcom"] == os.path.join(os.getcwd(), "a.ged")
+    assert jobs[0]["name"] == "a"
+
+
+def test_load_manifest_rejects_invalid_jobs(tmp_path):
+    with pytest.raises(Exception, match="no GEDCOM"):
+        batch.load_manifest(manifest(tmp_path, [{"proband": 1}]))
+    with pytest.raises(Exception, match="same output"):
+        batch.load_manifest(manifest(tmp_path, [{"gedcom": "a.ged", "name": "x"}, {"gedcom": "b.ged", "name": "x"}]))
+    with pytest.raises(Exception, match="same output"):
+        batch.load_manifest(manifest(tmp_path, [{"gedcom": "a.ged", "name": "x"}, {"gedcom": "b.ged", "output": "x.svg"}]))
+
+
+def test_run_job_returns_errors(tmp_path):
+    job = batch.load_manifest(manifest(tmp_path, [{"gedcom": "missing.ged"}]))[0]
+    result = batch.run_job(job, cache_dir=str(tmp_path / "cache"))
+    assert result["status"] == "failed"
+    assert result["error"].startswith("FileNotFoundError")
+    assert result["seconds"] >= 0
+
+
+@requires_networkx1
+def test_run_job_creates_output_directory(tmp_path, gedcom_file):
+    job = batch.load_manifest(manifest(tmp_path, [{"gedcom": "family.ged", "output": "charts/family.svg"}]))[0]
+    result = batch.run_job(job, cache_dir=str(tmp_path / "cache"))
+    assert result["status"] == "ok"
+    assert result["individuals"] >= 50
+    with open(str(tmp_path / "charts" / "family.svg")) as f:
+        assert f.read().startswith("<?xml")
+
+
+def test_prepare_pedigrees_reports_unreadable_files(tmp_path, gedcom_file):
+    jobs = batch.load_manifest(manifest(tmp_path, [{"gedcom": "family.ged"}, {"gedcom": "missing.ged"}]))
+    errors = batch.prepare_pedigrees(jobs, str(tmp_path / "cache"))
+    assert list(errors) == [str(tmp_path / "missing.ged")]
+
+
+@requires_fork
+def test_failed_jobs_do_not_stop_batch(tmp_path, gedcom_file, monkeypatch):
+    monkeypatch.setattr(batch, "run_job", patched_run_job)
+    jobs = batch.load_manifest(manifest(tmp_path, [
+        {"gedcom": "family.ged", "name": "first"},
+        {"gedcom": "family.ged", "name": "crash"},
+        {"gedcom": "missing.ged", "name": "missing"},
+        {"gedcom": "family.ged", "name": "error"},
+        {"gedcom": "family.ged", "name": "unpicklable"},
+        {"gedcom": "family.ged", "name": "last"},
+    ]))
+    report = batch.run_batch(jobs, workers=2)
+
+    statuses = [(result["name"], result["status"]) for result in report.results]
+    assert statuses == [("first", "ok"), ("crash", "failed"), ("missing", "failed"), ("error", "failed"),
+                        ("unpicklable", "failed"), ("last", "ok")]
+    failures = dict((result["name"], result["error"]) for result in report.failures())
+    assert failures["crash"].startswith("Worker process died")
+    assert failures["missing"].startswith("FileNotFoundError")
+    assert failures["error"] == "Exception: layout failed"
+    assert report.results[0]["individuals"] == report.results[-1]["individuals"] == 50
+
+    summary = report.summary()
+    assert (summary["jobs"], summary["succeeded"], summary["failed"], summary["individuals"]) == (6, 2, 4, 100)
+
+
+def test_report_output(tmp_path):
+    job = {"index": 0, "name": "a", "gedcom": "a.ged", "proband": None, "output": "a.svg", "options": {}}
+    report = batch.BatchReport([batch._job_result(job, "ok", seconds=1.5, individuals=10),
+                                batch._job_result(dict(job, index=1, name="b"), "failed", error="Exception: x")], 2.0)
+    text = str(report)
+    assert "a.svg" in text and "Exception: x" in text
+    assert "1 of 2 jobs rendered, 1 failed" in text
+
+    path = str(tmp_path / "report.json")
+    report.save(path)
+    with open(path) as f:
+        data = json.load(f)
+    assert data["summary"]["individuals_per_second"] == 5.0
+    assert [job["status"] for job in data["jobs"]] == ["ok", "failed"]
@@ -0,0 +1,135 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import os
+import pytest
+from genoplot import cache
+from genoplot.compact import CompactPedigree
+from genoplot.pedigree import Pedigree
+from genoplot.synthetic import generate_gedcom
+
+
+@pytest.fixture
+def gedcom_file(tmp_path):
+    path = str(tmp_path / "synthetic.ged")
+    generate_gedcom(path, individuals=200, branches=2, seed=3)
+    return path
+
+
+@pytest.fixture
+def counted(monkeypatch):
+    """Counts calls to cache_key and CompactPedigree.from_gedcom"""
+    calls = {"hash": 0, "parse": 0}
+    cache_key = cache.cache_key
+    from_gedcom = CompactPedigree.from_gedcom.__func__
+
+    def counted_cache_key(gedcom_file):
+        calls["hash"] += 1
+        return cache_key(gedcom_file)
+
+    def counted_from_gedcom(cls, gedcom_file):
+        calls["parse"] += 1
+        return from_gedcom(cls, gedcom_file)
+
+    monkeypatch.setattr(cache, "cache_key", counted_cache_key)
+    monkeypatch.setattr(CompactPedigree, "from_gedcom", classmethod(counted_from_gedcom))
+    return calls
+
+
+def individuals(store):
+    return [(view.id, view.name, view.father, view.mother) for view in store.individuals()]
+
+
+def pedigree_state(pedigree):
+    people = sorted((i.id, i.name, i.sex, i.father, i.mother, i.birth, i.birthDate, i.birthPlace, i.death, i.deathDate)
+                    for i in pedigree._individuals.values())
+    families = sorted((f.id, tuple(f.parent_ids()), tuple(f.children_ids())) for f in pedigree._families.values())
+    return people, families
+
+
+def test_warm_start_does_not_hash_unchanged_file(gedcom_file, tmp_path, counted):
+    cache_dir = str(tmp_path / "cache")
+    cold = cache.cached_pedigree(gedcom_file, cache_dir)
+    assert counted == {"hash": 1, "parse": 1}
+
+    warm = cache.cached_pedigree(gedcom_file, cache_dir)
+    assert counted == {"hash": 1, "parse": 1}
+    assert individuals(warm) == individuals(cold)
+
+
+def test_touched_file_is_hashed_but_not_parsed(gedcom_file, tmp_path, counted):
+    cache_dir = str(tmp_path / "cache")
+    cache.cached_pedigree(gedcom_file, cache_dir)
+    stat = os.stat(gedcom_file)
+    os.utime(gedcom_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    cache.cached_pedigree(gedcom_file, cache_dir)
+    assert counted == {"hash": 2, "parse": 1}
+    cache.cached_pedigree(gedcom_file, cache_dir)
+    assert counted == {"hash": 2, "parse": 1}
+
+
+def test_modified_file_invalidates_entry(gedcom_file, tmp_path, counted):
+    cache_dir = str(tmp_path / "cache")
+    before = cache.cached_pedigree(gedcom_file, cache_dir)
+    with open(gedcom_file, "r") as f:
+        content = f.read()
+    with open(gedcom_file, "w") as f:
+        f.write(content.replace("0 TRLR", "0 @P999999@ INDI\n1 NAME Added /Person/\n1 SEX F\n0 TRLR"))
+
+    after = cache.cached_pedigree(gedcom_file, cache_dir)
+    assert counted == {"hash": 2, "parse": 2}
+    assert len(after) == len(before) + 1
+    assert after.individual(999999).name == "Added Person"
+
+
+def test_invalid_entry_is_rebuilt(gedcom_file, tmp_path, counted):
+    cache_dir = str(tmp_path / "cache")
+    cache.cached_pedigree(gedcom_file, cache_dir)
+    with open(cache.cache_path(cache_dir, gedcom_file), "wb") as f:
+        f.write(b"not a cache")
+
+    store = cache.cached_pedigree(gedcom_file, cache_dir)
+    assert counted["parse"] == 2
+    assert len(store) > 0
+
+
+def test_cached_pedigree_matches_streaming_pedigree(gedcom_file, tmp_path):
+    streaming = Pedigree("synthetic", gedcom_file, streaming=True)
+    cold = Pedigree("synthetic", gedcom_file, cache_dir=str(tmp_path / "cache"))
+    warm = Pedigree("synthetic", gedcom_file, cache_dir=str(tmp_path / "cache"))
+    assert pedigree_state(cold) == pedigree_state(warm) == pedigree_state(streaming)
+
+
+def test_cached_pedigree_matches_parsed_pedigree(gedcom_file, tmp_path):
+    pytest.importorskip("gedcom")
+    parsed = Pedigree("synthetic", gedcom_file)
+    cached = Pedigree("synthetic", gedcom_file, cache_dir=str(tmp_path / "cache"))
+    assert pedigree_state(cached) == pedigree_state(parsed)
+
+
+def test_label_height_is_measured_on_first_use(gedcom_file, tmp_path):
+    pedigree = Pedigree("synthetic", gedcom_file, cache_dir=str(tmp_path / "cache"))
+    individual = next(iter(pedigree._individuals.values()))
+    assert individual._first_size is None
+    assert individual.height == individual.size()[1]
+
+
+def test_cached_children_are_in_family_order(gedcom_file, tmp_path, monkeypatch):
+    # Sort by birth date text, so the order of children depends on the sort key
+    def birth_sort_key(birth):
+        return birth or ""
+    monkeypatch.setattr("genoplot.family.birth_sort_key", birth_sort_key)
+    monkeypatch.setattr("genoplot.compact.birth_sort_key", birth_sort_key)
+
+    streaming = Pedigree("synthetic", gedcom_file, streaming=True)
+    cached = Pedigree("synthetic", gedcom_file, cache_dir=str(tmp_path / "cache"))
+    assert pedigree_state(cached) == pedigree_state(streaming)
+    for family in cached._families.values():
+        births = [birth_sort_key(cached.individual(cid).birth) for cid in family.children_ids()]
+        assert births == sorted(births)
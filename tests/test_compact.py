@@ -0,0 +1,69 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import io
+from genoplot import cache
+from genoplot.compact import CompactPedigree
+
+GEDCOM = """0 HEAD
+0 @P1@ INDI
+1 NAME John /Smith/
+1 SEX M
+1 BIRT
+2 DATE 3 MAR 1900
+2 PLAC London
+0 @P2@ INDI
+1 NAME Mary /Jones/
+1 SEX F
+0 @P3@ INDI
+1 NAME Alex /Smith/
+1 SEX X
+0 @P4@ INDI
+1 NAME Sam /Smith/
+1 SEX Ü
+0 @P5@ INDI
+1 NAME Kim /Smith/
+0 @F1@ FAM
+1 HUSB @P1@
+1 WIFE @P2@
+1 CHIL @P3@
+1 CHIL @P4@
+1 CHIL @P5@
+0 TRLR
+"""
+
+
+def store():
+    return CompactPedigree.from_gedcom(io.StringIO(GEDCOM))
+
+
+def test_sex_codes():
+    pedigree = store()
+    assert [pedigree.individual(pid).sex for pid in range(1, 6)] == ["M", "F", "X", "U", "U"]
+    assert [record.sex for record in pedigree.iter_records() if hasattr(record, "sex")] == ["M", "F", "X", "U", "U"]
+
+
+def test_views():
+    pedigree = store()
+    child = pedigree.individual(3)
+    assert child.name == "Alex Smith"
+    assert (child.father, child.mother) == (1, 2)
+    assert pedigree.individual(1).birth == "1900-03-03"
+    family = pedigree.family(1)
+    assert family.children_ids() == [3, 4, 5]
+    assert pedigree.founders() == [1, 2]
+
+
+def test_cache_round_trip(tmp_path):
+    pedigree = store()
+    path = str(tmp_path / "pedigree.gpc")
+    cache.save(pedigree, path)
+    loaded = cache.load(path)
+    assert loaded.columns().keys() == pedigree.columns().keys()
+    for name, column in pedigree.columns().items():
+        assert list(loaded.columns()[name]) == list(column), name
@@ -0,0 +1,100 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import random
+import pytest
+from genoplot.connectors import assign_tracks, ConnectorIndex
+
+
+def random_intervals(rng, count, width=100):
+    intervals = []
+    for _ in range(count):
+        start = rng.randint(0, width)
+        intervals.append((start, start + rng.randint(0, width // 5)))
+    return intervals
+
+
+def overlapping(a, b):
+    return a[0] <= b[1] and b[0] <= a[1]
+
+
+def test_assign_tracks_empty():
+    assert assign_tracks([]) == []
+
+
+def test_assign_tracks_touching_intervals_need_separate_tracks():
+    assert assign_tracks([(0, 10), (10, 20), (21, 30)]) == [0, 1, 0]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_assign_tracks_uses_minimum_tracks_without_overlap(seed):
+    rng = random.Random(seed)
+    intervals = random_intervals(rng, 60)
+    tracks = assign_tracks(intervals)
+    for i in range(len(intervals)):
+        for j in range(i + 1, len(intervals)):
+            if tracks[i] == tracks[j]:
+                assert not overlapping(intervals[i], intervals[j])
+    # Intervals containing a common point need a track each; the most at any start is the minimum
+    depth = max(sum(1 for a, b in intervals if a <= start <= b) for start, _ in intervals)
+    assert max(tracks) + 1 == depth
+
+
+def test_index_contains_segments():
+    index = ConnectorIndex()
+    index.add((0, 5), (10, 5))
+    index.add((0, 5), (10, 5))
+    index.add((3, 0), (3, 9))
+    assert len(index) == 2
+    assert ((3, 0), (3, 9)) in index
+    assert not ((3, 9), (3, 0)) in index
+    assert set(index) == {((0, 5), (10, 5)), ((3, 0), (3, 9))}
+
+
+def test_vertical_segments_do_not_block_horizontal_connectors():
+    index = ConnectorIndex()
+    index.add((3, 0), (3, 9))
+    assert not index.overlaps(0, 10, 0)
+    assert not index.overlaps(0, 10, 9)
+
+
+def test_overlaps_reversed_coordinates_and_endpoints():
+    index = ConnectorIndex()
+    index.add((10, 5), (0, 5))
+    assert index.overlaps(10, 20, 5)
+    assert index.overlaps(-5, 0, 5)
+    assert index.overlaps(8, 2, 5)
+    assert not index.overlaps(11, 20, 5)
+    assert not index.overlaps(0, 10, 6)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_overlaps_matches_brute_force(seed):
+    rng = random.Random(seed)
+    index = ConnectorIndex()
+    segments = []
+    for x1, x2 in random_intervals(rng, 40):
+        y = rng.choice([0, 8, 16])
+        if rng.random() < 0.5:
+            x1, x2 = x2, x1
+        index.add((x1, y), (x2, y))
+        segments.append((min(x1, x2), max(x1, x2), y))
+    for x1, x2 in random_intervals(rng, 200):
+        y = rng.choice([0, 8, 16, 24])
+        expected = any(y == sy and overlapping((x1, x2), (a, b)) for a, b, sy in segments)
+        assert index.overlaps(x1, x2, y) == expected
+
+
+def test_free_y_moves_up_past_occupied_tracks():
+    index = ConnectorIndex()
+    index.add((0, 100), (50, 100))
+    index.add((40, 92), (80, 92))
+    index.add((0, 84), (10, 84))
+    assert index.free_y(20, 60, 100, 8) == 84
+    assert index.free_y(60, 70, 100, 8) == 100
+    assert index.free_y(5, 45, 100, 8) == 76
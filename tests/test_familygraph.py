@@ -0,0 +1,129 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import random, sys
+import networkx
+import pytest
+from genoplot.familygraph import FamilyGraph
+from genoplot.pedigree import Pedigree
+from genoplot.synthetic import SyntheticPedigree
+from genoplot.vertex import family_vertex, individual_vertex
+
+requires_networkx1 = pytest.mark.skipif(not hasattr(networkx.DiGraph, "nodes_iter"), reason="Family graph layout uses the networkx 1.x API")
+
+
+@pytest.fixture
+def synthetic(tmp_path):
+    generated = SyntheticPedigree(individuals=300, branches=4, collapse_rate=0.3, seed=8)
+    path = str(tmp_path / "synthetic.ged")
+    generated.save(path)
+    return generated, Pedigree("synthetic", path, streaming=True)
+
+
+def reference_components(generated, pedigree):
+    """Returns component labels of each individual, from networkx components of the generated vertex graph"""
+    vertices, children = generated.vertex_graph()
+    graph = networkx.Graph()
+    graph.add_nodes_from(vertices)
+    graph.add_edges_from((vid, child) for vid in vertices for child in children[vid])
+    labels = {}
+    for i, component in enumerate(networkx.connected_components(graph)):
+        for vid in component:
+            labels[vid] = i
+
+    components = {}
+    for pid in pedigree._individuals:
+        if individual_vertex(pid) in labels:
+            components[pid] = set([labels[individual_vertex(pid)]])
+        else:
+            components[pid] = set(labels[family_vertex(f.id)] for f in pedigree.individual(pid).families())
+    return components
+
+
+@requires_networkx1
+def test_is_consanguineous_matches_graph_components(synthetic):
+    generated, pedigree = synthetic
+    graph = FamilyGraph(pedigree, 10)
+    components = reference_components(generated, pedigree)
+
+    rng = random.Random(1)
+    pids = sorted(pedigree._individuals)
+    pairs = [(rng.choice(pids), rng.choice(pids)) for _ in range(2000)]
+    # Siblings and spouses
+    for family in pedigree._families.values():
+        pairs.extend(zip(family.children_ids(), family.children_ids()[1:]))
+        pairs.append((family.father_id(), family.mother_id()))
+    for pid1, pid2 in pairs:
+        expected = not components[pid1].isdisjoint(components[pid2])
+        assert graph.is_consanguineous(pid1, pid2) == expected
+
+
+@requires_networkx1
+def test_separate_branches_are_not_consanguineous(synthetic):
+    generated, pedigree = synthetic
+    graph = FamilyGraph(pedigree, 10)
+    components = reference_components(generated, pedigree)
+    founders = [pid for pid in sorted(pedigree._individuals) if pedigree.individual(pid).father is None and
+                len(pedigree.individual(pid).families()) > 0 and pedigree.is_child(pid) is False]
+    apart = [(a, b) for a in founders for b in founders if components[a].isdisjoint(components[b])]
+    assert len(apart) > 0
+    assert not any(graph.is_consanguineous(a, b) for a, b in apart)
+
+
+# Coordinates of SyntheticPedigree(individuals=24, collapse_rate=0, remarriage_rate=0.3, seed=11), laid out by
+# the recursive Walker passes which the iterative passes replaced: vertex ID, prelim, mod, x and y
+KNOWN_LAYOUT = [
+    (3, 491.05, 0, 582.25, 10),
+    (5, 577.4, 585.4, 668.6, 276.0),
+    (7, -52.9, -81.2, 38.3, 276.0),
+    (9, 318.4, 248.6, 409.6, 276.0),
+    (11, 775.0, 790.8, 866.2, 276.0),
+    (13, 988.2, 957.1, 1079.4, 276.0),
+    (15, 77.8, 0, 1126.1, 542.0),
+    (22, 0, 0, 676.6, 542.0),
+    (24, 77.8, 0, 754.4, 542.0),
+    (26, 0, 0, 10.0, 542.0),
+    (28, 77.8, 0, 87.8, 542.0),
+    (30, 160.8, 0, 170.8, 542.0),
+    (32, 0, 0, 339.8, 542.0),
+    (34, 77.8, 0, 417.6, 542.0),
+    (36, 160.8, 0, 500.6, 542.0),
+    (38, 249.0, 0, 588.8, 542.0),
+    (40, 0, 0, 882.0, 542.0),
+    (42, 77.8, 0, 959.8, 542.0),
+    (44, 0, 0, 1048.3, 542.0),
+]
+
+
+@requires_networkx1
+def test_layout_matches_recursive_layout(tmp_path):
+    path = str(tmp_path / "small.ged")
+    SyntheticPedigree(individuals=24, collapse_rate=0, remarriage_rate=0.3, seed=11).save(path)
+    graph = FamilyGraph(Pedigree("small", path, streaming=True), 10, packing="row")
+    layout = [(vid, d["el"].layout_prelim, d["el"].layout_mod, d["el"].x, d["el"].y) for vid, d in sorted(graph.items())]
+    assert [row[0] for row in layout] == [row[0] for row in KNOWN_LAYOUT]
+    for row, known in zip(layout, KNOWN_LAYOUT):
+        assert row == pytest.approx(known)
+
+
+@requires_networkx1
+def test_chain_deeper_than_recursion_limit(tmp_path):
+    generations = 3000
+    assert generations > sys.getrecursionlimit()
+    # Without marriages, one child of each generation marries, so families form a single chain
+    generated = SyntheticPedigree(individuals=10*generations, depth=generations, fanout=1, marriage_rate=0, seed=1)
+    assert generated.family_count() == generations + 1
+    path = str(tmp_path / "chain.ged")
+    generated.save(path)
+
+    graph = FamilyGraph(Pedigree("chain", path, streaming=True), 10)
+    assert len(graph._branches) == 1
+    # Each generation is laid out on its own row, one row height below the last
+    rows = sorted(set(d["el"].y for vid, d in graph.items()))
+    assert len(rows) == generations + 1
+    assert len(set(round(below - above, 6) for above, below in zip(rows, rows[1:]))) == 1
@@ -0,0 +1,93 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import networkx as nx
+import pytest
+from genoplot.forest import Forest
+from genoplot.synthetic import SyntheticPedigree
+
+
+def synthetic_graph(seed):
+    pedigree = SyntheticPedigree(individuals=300, branches=3, collapse_rate=0.2, remarriage_rate=0.2, seed=seed)
+    return pedigree.vertex_graph()
+
+
+def digraph(vertices, children):
+    graph = nx.DiGraph()
+    graph.add_nodes_from(vertices)
+    for vid in vertices:
+        graph.add_edges_from((vid, child) for child in children.get(vid, ()))
+    return graph
+
+
+def forest_edges(forest):
+    return set((u, v) for v, u in forest.parent.items())
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_branching_matches_networkx(seed):
+    vertices, children = synthetic_graph(seed)
+    graph = digraph(vertices, children)
+    forest = Forest(vertices, children)
+
+    assert forest_edges(forest) == set(nx.maximum_branching(graph).edges())
+    assert set(forest.removed_edges) == set(graph.edges()) - forest_edges(forest)
+    assert len(forest.removed_edges) == len(set(forest.removed_edges))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_components_and_trees_match_networkx(seed):
+    vertices, children = synthetic_graph(seed)
+    graph = digraph(vertices, children)
+    forest = Forest(vertices, children)
+
+    labels = forest.components()
+    components = {}
+    for vid, label in labels.items():
+        components.setdefault(label, set()).add(vid)
+    assert sorted(map(sorted, components.values())) == sorted(map(sorted, nx.weakly_connected_components(graph)))
+    # Labelled in order of first vertex
+    firsts = [min((vertices.index(v) for v in component)) for label, component in sorted(components.items())]
+    assert firsts == sorted(firsts)
+
+    branching = digraph(vertices, forest.children)
+    assert sorted(map(sorted, forest.trees())) == sorted(map(sorted, nx.weakly_connected_components(branching)))
+    assert all(nx.is_arborescence(branching.subgraph(tree)) for tree in forest.trees())
+
+
+def test_first_parent_in_vertex_order_is_kept():
+    forest = Forest([1, 2, 3], {2: [3], 1: [3]})
+    assert forest.parent == {3: 1}
+    assert forest.removed_edges == [(2, 3)]
+    assert forest.has_edge(1, 3)
+    assert not forest.has_edge(2, 3)
+
+
+def test_edges_closing_cycles_are_removed():
+    forest = Forest([1, 2, 3], {1: [2], 2: [3], 3: [1]})
+    assert forest_edges(forest) == {(1, 2), (2, 3)}
+    assert forest.removed_edges == [(3, 1)]
+    assert forest.trees() == [[1, 2, 3]]
+
+
+def test_add_leaf_joins_parent_tree_but_not_components():
+    forest = Forest([1, 2, 3], {1: [2]})
+    forest.add_leaf(2, 4)
+    assert 4 in forest
+    assert len(forest) == 4
+    assert forest.has_edge(2, 4)
+    assert forest.children[2] == [4]
+    assert forest.trees() == [[1, 2, 4], [3]]
+    assert not 4 in forest.components()
+
+
+def test_empty_forest():
+    forest = Forest([], {})
+    assert len(forest) == 0
+    assert forest.trees() == []
+    assert forest.components() == {}
@@ -0,0 +1,71 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import pytest
+from genoplot.gedcomdate import parse_date, format_key
+
+
+@pytest.mark.parametrize("value, key", [
+    ("3 MAR 1900", (1900, 3, 3)),
+    ("MAR 1900", (1900, 3, 0)),
+    ("1900", (1900, 0, 0)),
+    ("3 March 1900", (1900, 3, 3)),
+    ("ABT 1900", (1900, 0, 0)),
+    ("~1900", (1900, 0, 0)),
+    ("EST 12 JUN 1850", (1850, 6, 12)),
+    ("BEF 1700", (1700, 0, 0)),
+    ("AFT 1 JAN 1700", (1700, 1, 1)),
+    ("BET 1900 AND 1910", (1900, 0, 0)),
+    ("FROM 1900 TO 1910", (1900, 0, 0)),
+    ("FROM 1900", (1900, 0, 0)),
+    ("TO 1910", (1910, 0, 0)),
+    ("INT 1900 (about nineteen hundred)", (1900, 0, 0)),
+    ("11 FEB 1731/32", (1731, 2, 11)),
+    ("44 BC", (-44, 0, 0)),
+    ("29 FEB 1904", (1904, 2, 29)),
+    ("@#DJULIAN@ 29 FEB 1700", (1700, 2, 29)),
+])
+def test_grammar_keys(value, key):
+    assert parse_date(value).key == key
+
+
+@pytest.mark.parametrize("value", ["31 FEB 1900", "29 FEB 1900", "31 APR 1900", "32 JAN 1900", "0 JAN 1900"])
+def test_day_is_checked_against_month(value):
+    assert parse_date(value).key is None
+
+
+def test_dates_sort_chronologically():
+    values = ["1901", "1 BC", "3 MAR 1900", "MAR 1900", "1900", "ABT 1899"]
+    ordered = sorted(values, key=lambda value: parse_date(value).key)
+    assert ordered == ["1 BC", "ABT 1899", "1900", "MAR 1900", "3 MAR 1900", "1901"]
+
+
+def test_display_keeps_value_unless_normalized():
+    assert parse_date("ABT 3 MAR 1900").display == "ABT 3 MAR 1900"
+    assert parse_date("abt 3 mar 1900", normalize=True).display == "abt. 3 Mar 1900"
+    assert parse_date("BET 1900 AND 1910", normalize=True).display == "bet. 1900 and 1910"
+
+
+@pytest.mark.parametrize("value, key", [
+    ("BET 1900", (1900, 0, 0)),
+    ("Mar. of 1900", (1900, 3, 0)),
+    ("March the 5th, 1900", (1900, 3, 5)),
+])
+def test_free_form_keys_do_not_depend_on_today(value, key):
+    pytest.importorskip("dateparser")
+    assert parse_date(value).key == key
+
+
+def test_unparseable_date_has_no_key():
+    pytest.importorskip("dateparser")
+    assert parse_date("sometime in spring").key is None
+
+
+def test_format_key():
+    assert format_key((1900, 3, 0)) == "1900-03-01"
+    assert format_key((1900, 0, 0)) == "1900-01-01"
@@ -0,0 +1,98 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import random
+import pytest
+from genoplot import individual as individual_module
+from genoplot.pedigree import Pedigree
+from genoplot.synthetic import generate_gedcom
+from genoplot.utils import calculate_text_size
+
+
+@pytest.fixture
+def pedigree(tmp_path):
+    path = str(tmp_path / "synthetic.ged")
+    generate_gedcom(path, individuals=60, seed=11)
+    return Pedigree("synthetic", path, streaming=True)
+
+
+@pytest.fixture
+def measured(monkeypatch):
+    """Counts label measurements"""
+    calls = []
+
+    def counted(text, font_size):
+        calls.append(font_size)
+        return calculate_text_size(text, font_size)
+
+    monkeypatch.setattr(individual_module, "calculate_text_size", counted)
+    return calls
+
+
+def fresh_size(individual):
+    return calculate_text_size(individual.output_text(), individual._font_size)
+
+
+def parent_with_family(pedigree):
+    return next(i for i in pedigree._individuals.values() if len(i.families()) > 0)
+
+
+def test_size_is_cached_until_label_changes(pedigree, measured):
+    individual = parent_with_family(pedigree)
+    individual.size()
+    individual.size()
+    assert len(measured) == 1
+
+    individual.x = 100
+    individual.layout_prelim = 0.5
+    individual.size()
+    assert len(measured) == 1
+
+    individual.layout_prelim = 12345
+    assert individual.size() == fresh_size(individual)
+    assert len(measured) == 2
+
+
+def test_family_layout_fields_invalidate_parent_labels(pedigree, measured):
+    individual = parent_with_family(pedigree)
+    family = individual.families()[0]
+    individual.size()
+
+    family.layout_shift = 0.25
+    individual.size()
+    assert len(measured) == 1
+
+    family.layout_number = 123456789
+    assert individual.size() == fresh_size(individual)
+    assert len(measured) == 2
+
+
+def test_output_fields_and_font_size_invalidate_label(pedigree):
+    individual = parent_with_family(pedigree)
+    size = individual.size()
+    individual._output_fields = ["id", "name"]
+    assert not individual.shows_layout_fields()
+    assert individual.size() != size
+    assert individual.size() == fresh_size(individual)
+
+    individual._font_size = 20
+    assert individual.size() == fresh_size(individual)
+    individual.name = "A much longer name than before"
+    assert individual.size() == fresh_size(individual)
+
+
+def test_cached_size_matches_fresh_size_during_layout_changes(pedigree):
+    rng = random.Random(3)
+    individuals = list(pedigree._individuals.values())
+    families = list(pedigree._families.values())
+    for _ in range(500):
+        el = rng.choice(individuals + families)
+        name = rng.choice(["layout_prelim", "layout_shift", "layout_mod", "layout_number", "layout_ancestor", "layout_branch"])
+        setattr(el, name, rng.choice([0, 1, 2.5, 99999, 1234567]))
+        individual = rng.choice(individuals)
+        assert individual.size() == fresh_size(individual)
@@ -0,0 +1,106 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import io
+import networkx
+import pytest
+from genoplot import trace
+from genoplot.genoplot import GenoPlot
+from genoplot.layoutcache import LayoutCache
+from genoplot.synthetic import SyntheticPedigree, generate_gedcom
+
+requires_networkx1 = pytest.mark.skipif(not hasattr(networkx.DiGraph, "nodes_iter"), reason="Family graph layout uses the networkx 1.x API")
+
+
+@pytest.fixture
+def gedcom_file(tmp_path):
+    path = str(tmp_path / "synthetic.ged")
+    generate_gedcom(path, individuals=300, branches=3, collapse_rate=0.2, seed=7)
+    return path
+
+
+# Labels which do not change size during layout, so branches can be laid out in parallel and cached
+STATIC_FIELDS = ["id", "name"]
+
+
+def render(gedcom_file, **kwargs):
+    output = io.StringIO()
+    GenoPlot("synthetic", gedcom_file, output_file=output, streaming=True, **kwargs).draw()
+    return output.getvalue()
+
+
+def traced_render(gedcom_file, **kwargs):
+    """Returns rendered SVG and spans of each name recorded while rendering it"""
+    with trace.tracing() as tracer:
+        svg = render(gedcom_file, **kwargs)
+    spans = {}
+    for record in tracer.spans:
+        spans.setdefault(record["name"], []).append(record["attributes"])
+    return svg, spans
+
+
+@requires_networkx1
+def test_parallel_layout_matches_serial(gedcom_file):
+    serial, spans = traced_render(gedcom_file, output_fields=STATIC_FIELDS)
+    parallel, parallel_spans = traced_render(gedcom_file, output_fields=STATIC_FIELDS, layout_workers=2)
+    branches = spans["FamilyGraph._layout"][0]["branches"]
+    assert branches > 1
+    assert len(spans["Branch.layout"]) == branches
+    # Every branch is laid out by the process pool
+    assert parallel_spans["FamilyGraph._layout_branches_parallel"] == [{"branches": branches}]
+    assert not "Branch.layout" in parallel_spans
+    assert parallel == serial
+
+
+@requires_networkx1
+def test_branches_showing_layout_fields_are_laid_out_serially(gedcom_file):
+    serial = render(gedcom_file)
+    parallel, spans = traced_render(gedcom_file, layout_workers=2)
+    assert not "FamilyGraph._layout_branches_parallel" in spans
+    assert parallel == serial
+
+
+@requires_networkx1
+def test_cached_layout_matches_fresh_layout(gedcom_file):
+    cache = LayoutCache()
+    cold, spans = traced_render(gedcom_file, output_fields=STATIC_FIELDS, layout_cache=cache)
+    branches = spans["FamilyGraph._layout"][0]["branches"]
+    assert (cache.hits, cache.misses, len(cache)) == (0, branches, branches)
+
+    warm, spans = traced_render(gedcom_file, output_fields=STATIC_FIELDS, layout_cache=cache)
+    assert (cache.hits, cache.misses) == (branches, branches)
+    assert not "Branch.layout" in spans
+    assert warm == cold == render(gedcom_file, output_fields=STATIC_FIELDS)
+
+
+@requires_networkx1
+def test_edit_lays_out_changed_branch_only(tmp_path):
+    generated = SyntheticPedigree(individuals=300, branches=3, collapse_rate=0.2, seed=7)
+    path = str(tmp_path / "synthetic.ged")
+    generated.save(path)
+    cache = LayoutCache()
+    before, spans = traced_render(path, output_fields=STATIC_FIELDS, layout_cache=cache)
+    branches = spans["FamilyGraph._layout"][0]["branches"]
+
+    # Add a child to the first family
+    generated._add_child(0)
+    generated.save(path)
+    after, spans = traced_render(path, output_fields=STATIC_FIELDS, layout_cache=cache)
+    assert spans["FamilyGraph._layout"][0]["branches"] == branches
+    assert (cache.hits, cache.misses) == (branches - 1, branches + 1)
+    assert len(spans["Branch.layout"]) == 1
+    assert after != before
+    assert after == render(path, output_fields=STATIC_FIELDS)
+
+
+@requires_networkx1
+def test_branches_showing_layout_fields_are_not_cached(gedcom_file):
+    cache = LayoutCache()
+    render(gedcom_file, layout_cache=cache)
+    render(gedcom_file, layout_cache=cache)
+    assert (cache.hits, cache.misses, len(cache)) == (0, 0, 0)
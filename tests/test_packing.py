@@ -0,0 +1,79 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import random
+import pytest
+from genoplot.packing import shelf_pack
+
+
+def random_sizes(seed, count=40):
+    rng = random.Random(seed)
+    return [(rng.uniform(10, 300), rng.uniform(10, 200)) for _ in range(count)]
+
+
+def overlapping(a, b):
+    (ax, ay, aw, ah), (bx, by, bw, bh) = a, b
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+
+def test_empty():
+    assert shelf_pack([]) == []
+
+
+def test_single_rectangle_at_origin():
+    assert shelf_pack([(30, 20)], spacing=(5, 5)) == [(0, 0)]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_rectangles_do_not_overlap_and_keep_spacing(seed):
+    sizes = random_sizes(seed)
+    hspace, vspace = 7, 11
+    positions = shelf_pack(sizes, spacing=(hspace, vspace))
+    boxes = [(x, y, w + hspace, h + vspace) for (x, y), (w, h) in zip(positions, sizes)]
+    assert all(x >= 0 and y >= 0 for x, y in positions)
+    for i in range(len(boxes)):
+        for j in range(i + 1, len(boxes)):
+            assert not overlapping(boxes[i], boxes[j])
+
+
+@pytest.mark.parametrize("aspect_ratio", [0.5, 1.0, 2.0, 4.0])
+def test_packed_area_approaches_aspect_ratio(aspect_ratio):
+    sizes = [(100, 100)] * 64
+    positions = shelf_pack(sizes, aspect_ratio=aspect_ratio)
+    width = max(x + w for (x, y), (w, h) in zip(positions, sizes))
+    height = max(y + h for (x, y), (w, h) in zip(positions, sizes))
+    assert aspect_ratio / 2 <= width / height <= aspect_ratio * 2
+
+
+def test_shelves_are_ordered_by_decreasing_height():
+    sizes = random_sizes(3)
+    positions = shelf_pack(sizes)
+    shelves = {}
+    for (x, y), (w, h) in zip(positions, sizes):
+        shelves.setdefault(y, []).append(h)
+    tops = sorted(shelves)
+    for above, below in zip(tops, tops[1:]):
+        assert min(shelves[above]) >= max(shelves[below])
+        # Next shelf starts below the tallest rectangle of the one above
+        assert below == above + max(shelves[above])
+
+
+def test_groups_are_placed_together():
+    sizes = [(50, 10), (50, 90), (50, 20), (50, 80), (50, 30)]
+    groups = [0, 1, 0, 1, 2]
+    positions = shelf_pack(sizes, groups=groups, aspect_ratio=100)
+    order = [i for i, _ in sorted(enumerate(positions), key=lambda p: (p[1][1], p[1][0]))]
+    # Group 1 has the tallest rectangle, so it comes first, then group 2 before group 0
+    assert order == [1, 3, 4, 2, 0]
+    assert len(set(y for x, y in positions)) == 1
+
+
+def test_wide_rectangle_fits_shelf():
+    positions = shelf_pack([(1000, 10), (10, 10), (10, 10)])
+    assert positions[0] == (0, 0)
+    assert all(y > 0 for x, y in positions[1:])
@@ -0,0 +1,126 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import networkx
+import pytest
+from genoplot.family import Family
+from genoplot.pedigree import Pedigree
+from genoplot.vertex import family_vertex, individual_vertex
+
+requires_networkx1 = pytest.mark.skipif(not hasattr(networkx.DiGraph, "nodes_iter"), reason="Family graph layout uses the networkx 1.x API")
+
+# Family ID: husband, wife and children. Proband 3 has two families, 3 and 6;
+# 17 and 18 are grandparents, 7, 10, 12 and 15 marry into the pedigree.
+FAMILIES = {
+    7: (17, 18, [1]),
+    1: (1, 2, [3, 4]),
+    2: (5, 6, [7]),
+    3: (3, 7, [8, 9]),
+    6: (3, 15, [16]),
+    4: (8, 10, [11]),
+    5: (11, 12, [13]),
+}
+FEMALE = set([2, 6, 7, 10, 12, 15, 18])
+PROBAND = 3
+
+
+def write_gedcom(path):
+    lines = ["0 HEAD", "1 GEDC", "2 VERS 5.5", "1 CHAR UTF-8"]
+    for pid in range(1, 19):
+        lines.extend(["0 @P{0}@ INDI".format(pid), "1 NAME Person{0} /Test/".format(pid),
+                      "1 SEX {0}".format("F" if pid in FEMALE else "M"),
+                      "1 BIRT", "2 DATE {0} JAN {1}".format(pid, 1900 + pid)])
+        for fid, (husband, wife, children) in sorted(FAMILIES.items()):
+            if pid in (husband, wife):
+                lines.append("1 FAMS @F{0}@".format(fid))
+            if pid in children:
+                lines.append("1 FAMC @F{0}@".format(fid))
+    for fid, (husband, wife, children) in sorted(FAMILIES.items()):
+        lines.extend(["0 @F{0}@ FAM".format(fid), "1 HUSB @P{0}@".format(husband), "1 WIFE @P{0}@".format(wife)])
+        lines.extend("1 CHIL @P{0}@".format(cid) for cid in children)
+    lines.append("0 TRLR")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+@pytest.fixture
+def gedcom_file(tmp_path):
+    path = str(tmp_path / "family.ged")
+    write_gedcom(path)
+    return path
+
+
+@pytest.fixture
+def pedigree(gedcom_file):
+    return Pedigree("family", gedcom_file, streaming=True)
+
+
+# Individuals and families of proband's neighbourhood for each direction and generation limit
+ANCESTORS = {
+    0: (set([3, 7, 15]), set([3, 6])),
+    1: (set([1, 2, 3, 7, 15]), set([1, 3, 6])),
+    None: (set([1, 2, 3, 7, 15, 17, 18]), set([1, 3, 6, 7])),
+}
+DESCENDANTS = {
+    # Proband's families are kept without their children
+    0: (set([3, 7, 15]), set([3, 6])),
+    # Family 4 of child 8 is at the limit, so it is kept with spouse 10 but without child 11
+    1: (set([3, 7, 8, 9, 10, 15, 16]), set([3, 4, 6])),
+    None: (set([3, 7, 8, 9, 10, 11, 12, 13, 15, 16]), set([3, 4, 5, 6])),
+}
+NEIGHBOURHOODS = [("ancestors", generations, expected) for generations, expected in ANCESTORS.items()]
+NEIGHBOURHOODS.extend(("descendants", generations, expected) for generations, expected in DESCENDANTS.items())
+NEIGHBOURHOODS.extend(("both", generations, (ANCESTORS[generations][0] | DESCENDANTS[generations][0],
+                                             ANCESTORS[generations][1] | DESCENDANTS[generations][1]))
+                      for generations in (0, 1, None))
+
+
+@pytest.mark.parametrize("direction,generations,expected", NEIGHBOURHOODS)
+def test_neighbourhood(pedigree, direction, generations, expected):
+    assert pedigree.neighbourhood(PROBAND, direction, generations) == expected
+
+
+def test_neighbourhood_of_founder_without_family(pedigree):
+    assert pedigree.neighbourhood(14, "both") == (set([14]), set())
+
+
+def test_neighbourhood_rejects_invalid_arguments(pedigree):
+    with pytest.raises(Exception, match="Invalid neighbourhood direction"):
+        pedigree.neighbourhood(PROBAND, "siblings")
+    with pytest.raises(Exception, match="Individual not found"):
+        pedigree.neighbourhood(99)
+
+
+def test_vertices_of_neighbourhood(pedigree):
+    vertices = pedigree.vertices(pedigree.neighbourhood(PROBAND, "descendants", 1))
+    # Families, then individuals who are not parents, in ID order
+    assert [(type(el) is Family, el.id) for el in vertices] == [
+        (True, 3), (True, 4), (True, 6), (False, 9), (False, 16)]
+
+
+def test_vertices_of_whole_pedigree(pedigree):
+    vertices = pedigree.vertices()
+    assert sorted(el.id for el in vertices if type(el) is Family) == sorted(FAMILIES)
+    assert sorted(el.id for el in vertices if not type(el) is Family) == [4, 9, 13, 14, 16]
+
+
+@requires_networkx1
+@pytest.mark.parametrize("direction,generations,expected", NEIGHBOURHOODS)
+def test_proband_graph(pedigree, direction, generations, expected):
+    from genoplot.familygraph import FamilyGraph
+    individuals, families = expected
+    graph = FamilyGraph(pedigree, 10, proband=PROBAND, direction=direction, generations=generations)
+
+    assert set(vid for vid, data in graph.items()) == (
+        set(family_vertex(fid) for fid in families) |
+        set(individual_vertex(pid) for pid in individuals if not pedigree.is_parent(pid)))
+    # Every parent is drawn as part of one of its families
+    for pid in individuals:
+        if pedigree.is_parent(pid):
+            assert any(graph.has_node(family_vertex(family.id))
+                       for family in pedigree.individual_families(pid, role="parent"))
@@ -0,0 +1,159 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import io, json, tracemalloc
+import networkx
+import pytest
+from genoplot import trace
+from genoplot.profiling import ProfileReport, profile_plot, profiling
+from genoplot.synthetic import generate_gedcom
+
+requires_networkx1 = pytest.mark.skipif(not hasattr(networkx.DiGraph, "nodes_iter"), reason="Family graph layout uses the networkx 1.x API")
+requires_reset_peak = pytest.mark.skipif(not hasattr(tracemalloc, "reset_peak"), reason="Peak memory of spans needs Python 3.9")
+
+MB = 2**20
+
+
+def check_peaks(spans):
+    """Checks that the peak memory of each span is at least that of its nested spans"""
+    if not hasattr(tracemalloc, "reset_peak"):
+        assert all(span["peak_bytes"] is None for span in spans)
+        return
+    for span in spans:
+        if not span["parent"] is None:
+            assert spans[span["parent"]]["peak_bytes"] >= span["peak_bytes"]
+
+
+@requires_reset_peak
+def test_peak_memory_of_nested_spans():
+    assert not tracemalloc.is_tracing()
+    with profiling() as profiler:
+        assert trace.tracer is profiler
+        with trace.span("outer"):
+            with trace.span("large"):
+                data = bytearray(8*MB)
+                del data
+            with trace.span("small"):
+                with trace.span("inner"):
+                    data = bytearray(MB)
+                    del data
+    assert trace.tracer is None
+    assert not tracemalloc.is_tracing()
+
+    spans = dict((span["name"], span) for span in profiler.spans)
+    assert spans["large"]["peak_bytes"] >= 8*MB
+    assert MB <= spans["inner"]["peak_bytes"] < 8*MB
+    assert spans["small"]["peak_bytes"] >= spans["inner"]["peak_bytes"]
+    # The peak of the first nested span is kept after the second resets the traced peak
+    assert spans["outer"]["peak_bytes"] >= 8*MB
+    check_peaks(profiler.spans)
+    assert all(span["cpu_seconds"] >= 0 for span in profiler.spans)
+
+
+@pytest.mark.skipif(hasattr(tracemalloc, "reset_peak"), reason="Python 3.9 can trace peak memory")
+def test_memory_is_not_traced_without_reset_peak():
+    with profiling() as profiler:
+        assert not tracemalloc.is_tracing()
+        with trace.span("phase"):
+            pass
+    assert not profiler.trace_memory
+    assert profiler.spans[0]["peak_bytes"] is None
+
+
+def test_profiling_without_memory():
+    with profiling(trace_memory=False) as profiler:
+        with trace.span("phase"):
+            pass
+    assert not tracemalloc.is_tracing()
+    span, = profiler.spans
+    assert span["peak_bytes"] is None
+    assert span["cpu_seconds"] >= 0
+
+
+def span(name, parent, seconds, **attributes):
+    return {"name": name, "parent": parent, "start": 0.0, "end": seconds, "seconds": seconds,
+            "cpu_seconds": seconds, "peak_bytes": MB, "attributes": attributes}
+
+
+@pytest.fixture
+def report():
+    spans = [
+        span("GenoPlot.draw", None, 3.0),
+        span("FamilyGraph._layout", 0, 2.0, branches=3),
+        span("Branch.layout", 1, 0.5, branch=0, nodes=10),
+        span("Branch.layout", 1, 1.2, branch=1, nodes=40),
+        span("Branch.layout", 1, 0.1, branch=2, nodes=2),
+        span("GenoPlot.write", 0, 0.7, elements=99),
+    ]
+    return ProfileReport({"spans": spans, "counters": {"layout.subtree_moves": 7}}, counts={"scene.individuals": 52})
+
+
+def test_report_phases_and_branches(report):
+    assert [span["name"] for span in report.phases()] == ["GenoPlot.draw", "FamilyGraph._layout", "GenoPlot.write"]
+    assert [span["attributes"]["branch"] for span in report.branches()] == [1, 0, 2]
+    assert report.phase("GenoPlot.write")["attributes"] == {"elements": 99}
+    assert report.phase("Pedigree.parse") is None
+
+
+def test_report_table(report):
+    lines = str(report).split("\n")
+    assert lines[0].split() == ["phase", "wall", "(s)", "cpu", "(s)", "peak", "(MB)"]
+    assert lines[1].split() == ["GenoPlot.draw", "3.000", "3.000", "1.0"]
+    assert lines[2].startswith("  FamilyGraph._layout ")
+    assert lines[3].startswith("  GenoPlot.write ")
+    # Branches, slowest first, below the phases
+    assert lines[4].startswith("  Branch 1 (40 nodes) ")
+    assert lines[5].startswith("  Branch 0 (10 nodes) ")
+    assert lines[6].startswith("  Branch 2 (2 nodes) ")
+    assert lines[7].split() == ["scene.individuals", "52"]
+    assert lines[8].split() == ["layout.subtree_moves", "7"]
+
+
+def test_report_save(report, tmp_path):
+    path = str(tmp_path / "profile.json")
+    report.save(path)
+    with open(path) as f:
+        data = json.load(f)
+    assert [span["name"] for span in data["phases"]] == ["GenoPlot.draw", "FamilyGraph._layout", "GenoPlot.write"]
+    assert [span["attributes"]["branch"] for span in data["branches"]] == [1, 0, 2]
+    assert data["counters"] == {"layout.subtree_moves": 7}
+    assert data["counts"] == {"scene.individuals": 52}
+
+
+@requires_networkx1
+def test_profile_plot(tmp_path):
+    gedcom_file = str(tmp_path / "synthetic.ged")
+    generate_gedcom(gedcom_file, individuals=120, branches=3, seed=6)
+    output = io.StringIO()
+    report = profile_plot("synthetic", gedcom_file, output=output, output_file=str(tmp_path / "plot.svg"), streaming=True)
+
+    names = [span["name"] for span in report.phases()]
+    assert names == ["GenoPlot.__init__", "Pedigree._setup", "GenoPlot.draw", "GenoPlot.scene", "FamilyGraph._create",
+                     "FamilyGraph._layout", "GenoPlot.render", "GenoPlot.write"]
+    parents = dict((span["name"], report.spans[span["parent"]]["name"]) for span in report.spans if not span["parent"] is None)
+    assert parents == {"Pedigree._setup": "GenoPlot.__init__", "GenoPlot.scene": "GenoPlot.draw",
+                       "FamilyGraph._create": "GenoPlot.scene", "FamilyGraph._layout": "GenoPlot.scene",
+                       "Branch.layout": "FamilyGraph._layout", "GenoPlot.render": "GenoPlot.draw",
+                       "GenoPlot.write": "GenoPlot.draw"}
+    assert all(span["cpu_seconds"] >= 0 for span in report.spans)
+    check_peaks(report.spans)
+
+    counts = report.counts
+    # Duplicates of individuals linked across branches are added to the pedigree
+    assert counts["pedigree.individuals"] == 120 + counts["graph.branch_links"]
+    assert counts["graph.branches"] == report.phase("FamilyGraph._layout")["attributes"]["branches"]
+    assert len(report.branches()) == counts["graph.branches"]
+    assert sum(span["attributes"]["nodes"] for span in report.branches()) == counts["graph.nodes"]
+    assert counts["scene.individuals"] >= 120
+    assert counts["drawing.elements"] == report.phase("GenoPlot.write")["attributes"]["elements"]
+    seconds = [span["seconds"] for span in report.branches()]
+    assert seconds == sorted(seconds, reverse=True)
+
+    text = str(report)
+    assert "Branch 0 (" in text and "pedigree.individuals" in text
+    assert json.loads(output.getvalue())["counts"] == counts
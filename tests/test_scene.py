@@ -0,0 +1,76 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import io
+import networkx
+import pytest
+from genoplot.genoplot import GenoPlot
+from genoplot.scene import Scene, VIRTUAL_ID
+from genoplot.synthetic import generate_gedcom
+
+requires_networkx1 = pytest.mark.skipif(not hasattr(networkx.DiGraph, "nodes_iter"), reason="Family graph layout uses the networkx 1.x API")
+
+
+def small_scene():
+    scene = Scene(400, 300.5, symbol_size=20, font_size=12)
+    scene.add_branch((0, 380, 0, 250.5))
+    scene.add_individual(1, 10, 20, "M", "#F2E6D2", ["1", "John Smith"], (62.6, 28.8))
+    scene.add_individual(2, 60.5, 20, "F", "#F2E6D2", ["2", "Mary Jones"], (62.6, 28.8))
+    scene.add_individual(VIRTUAL_ID, 110, 20, "F")
+    scene.add_individual(3, 35.25, 80, "U", "#D2E6F2", ["3", "Ünal Smith"], (62.6, 28.8))
+    scene.add_connector((30, 30), (60.5, 30))
+    scene.add_connector((45.25, 30), (45.25, 80))
+    scene.add_duplicate("M", (10, 20), (200, 20))
+    return scene
+
+
+def saved(scene):
+    output = io.StringIO()
+    scene.save(output)
+    return output.getvalue()
+
+
+def rendered(scene):
+    output = io.StringIO()
+    GenoPlot("scene", None, output_file=output, scene=scene).draw()
+    return output.getvalue()
+
+
+def test_round_trip_is_byte_identical():
+    scene = small_scene()
+    data = saved(scene)
+    loaded = Scene.load(io.StringIO(data))
+    assert saved(loaded) == data
+    assert list(loaded.individuals()) == list(scene.individuals())
+    assert [loaded.label_size(i) for i in range(len(loaded))] == [(62.6, 28.8), (62.6, 28.8), (0, 0), (62.6, 28.8)]
+    assert list(loaded.connector_segments()) == list(scene.connector_segments())
+    assert list(loaded.duplicate_links()) == list(scene.duplicate_links())
+    assert loaded.branch_extremes() == scene.branch_extremes()
+
+
+def test_loaded_scene_renders_identically():
+    scene = small_scene()
+    assert rendered(Scene.load(io.StringIO(saved(scene)))) == rendered(scene)
+
+
+def test_other_versions_are_rejected():
+    data = small_scene().to_dict()
+    data["version"] = 1
+    with pytest.raises(Exception):
+        Scene.from_dict(data)
+
+
+@requires_networkx1
+def test_exported_scene_has_label_sizes(tmp_path):
+    path = str(tmp_path / "synthetic.ged")
+    generate_gedcom(path, individuals=100, seed=5)
+    plot = GenoPlot("synthetic", path, output_file=io.StringIO(), streaming=True)
+    scene = plot.scene()
+    for i, (pid, x, y, sex, color, labels) in enumerate(scene.individuals()):
+        if pid != VIRTUAL_ID:
+            assert scene.label_size(i) == plot._pedigree.individual(pid).size()
@@ -0,0 +1,84 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import math, random
+import pytest
+from genoplot.spatial import SpatialIndex
+
+
+def random_index(seed, count=80, cell_size=50):
+    rng = random.Random(seed)
+    index = SpatialIndex(cell_size=cell_size)
+    boxes = []
+    for i in range(count):
+        x, y = rng.uniform(-500, 500), rng.uniform(-300, 300)
+        box = (x, y, x + rng.uniform(0, 120), y + rng.uniform(0, 60))
+        index.add("item{0}".format(i), *box)
+        boxes.append(box)
+    return rng, index, boxes
+
+
+def intersects(box, x1, y1, x2, y2):
+    return box[0] <= x2 and box[2] >= x1 and box[1] <= y2 and box[3] >= y1
+
+
+def distance(box, x, y):
+    return math.hypot(max(box[0] - x, 0, x - box[2]), max(box[1] - y, 0, y - box[3]))
+
+
+def test_empty_index():
+    index = SpatialIndex()
+    assert len(index) == 0
+    assert index.at(0, 0) == []
+    assert index.within(0, 0, 10, 10) == []
+    assert index.nearest(0, 0) is None
+
+
+def test_add_normalizes_bounds():
+    index = SpatialIndex(cell_size=10)
+    index.add("a", 30, 40, 10, 20)
+    assert index.bounds(0) == (10, 20, 30, 40)
+    assert list(index) == ["a"]
+    assert index.at(10, 40) == ["a"]
+    assert index.at(31, 40) == []
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_queries_match_brute_force(seed):
+    rng, index, boxes = random_index(seed)
+    items = list(index)
+    for _ in range(100):
+        x, y = rng.uniform(-700, 700), rng.uniform(-500, 500)
+        assert index.at(x, y) == [items[i] for i, box in enumerate(boxes) if intersects(box, x, y, x, y)]
+
+        x2, y2 = x + rng.uniform(-200, 200), y + rng.uniform(-200, 200)
+        expected = [items[i] for i, box in enumerate(boxes)
+                    if intersects(box, min(x, x2), min(y, y2), max(x, x2), max(y, y2))]
+        assert index.within(x, y, x2, y2) == expected
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_nearest_matches_brute_force(seed):
+    rng, index, boxes = random_index(seed)
+    items = list(index)
+    for _ in range(100):
+        x, y = rng.uniform(-1500, 1500), rng.uniform(-1000, 1000)
+        distances = [distance(box, x, y) for box in boxes]
+        best = min(range(len(boxes)), key=lambda i: (distances[i], i))
+        assert index.nearest(x, y) == items[best]
+
+        max_distance = rng.uniform(0, 100)
+        expected = items[best] if distances[best] <= max_distance else None
+        assert index.nearest(x, y, max_distance=max_distance) == expected
+
+
+def test_nearest_ties_resolve_by_insertion_order():
+    index = SpatialIndex(cell_size=10)
+    index.add("right", 20, 0, 30, 10)
+    index.add("left", -30, 0, -20, 10)
+    assert index.nearest(0, 5) == "right"
@@ -0,0 +1,148 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import io, os, random, tempfile
+import pytest
+import svgwrite
+from genoplot.svgstream import SVGLayerWriter
+
+
+def random_elements(drawing, seed, count=300):
+    """Returns layer and element of each of count random elements"""
+    rng = random.Random(seed)
+    elements = []
+    for i in range(count):
+        x, y = rng.uniform(0, 1000), rng.uniform(0, 1000)
+        layer = rng.choice(["2:text", "0:connectors", "1:individuals", "10:last"])
+        if layer == "2:text":
+            element = drawing.text("Person {0} é".format(i), insert=(x, y), style="font-size: 10px")
+        elif layer == "1:individuals":
+            element = drawing.rect((x, y), (25, 25), fill="#F2E6D2", stroke="black")
+        else:
+            element = drawing.line((x, y), (x + 50, y), stroke="black")
+        elements.append((layer, element))
+    return elements
+
+
+def expected_svg(seed):
+    """Returns SVG of drawing with the elements added directly, in layer order"""
+    drawing = svgwrite.Drawing(size=(1000, 1000))
+    elements = random_elements(drawing, seed)
+    for layer in sorted(set(layer for layer, element in elements)):
+        [drawing.add(element) for l, element in elements if l == layer]
+    output = io.StringIO()
+    drawing.write(output)
+    return output.getvalue()
+
+
+def layer_writer(seed, **kwargs):
+    drawing = svgwrite.Drawing(size=(1000, 1000))
+    writer = SVGLayerWriter(drawing, **kwargs)
+    for layer, element in random_elements(drawing, seed):
+        writer.add(layer, element)
+    return writer
+
+
+class FailingOutput(object):
+    """File-like object which fails after some writes"""
+    def __init__(self, writes):
+        self.writes = writes
+
+    def write(self, text):
+        self.writes -= 1
+        if self.writes < 0:
+            raise IOError("Disk full")
+
+
+def test_output_matches_drawing():
+    writer = layer_writer(1)
+    assert len(writer) == 300
+    output = io.StringIO()
+    writer.save(output)
+    assert output.getvalue() == expected_svg(1)
+
+
+def test_layers_are_written_in_sorted_order():
+    drawing = svgwrite.Drawing(size=(10, 10))
+    writer = SVGLayerWriter(drawing)
+    writer.add("b", drawing.line((0, 0), (1, 1), id="b1"))
+    writer.add("a", drawing.line((0, 0), (1, 1), id="a1"))
+    writer.add("b", drawing.line((0, 0), (1, 1), id="b2"))
+    writer.add("a", drawing.line((0, 0), (1, 1), id="a2"))
+    output = io.StringIO()
+    writer.save(output)
+    svg = output.getvalue()
+    positions = [svg.index('id="{0}"'.format(name)) for name in ("a1", "a2", "b1", "b2")]
+    assert positions == sorted(positions)
+
+
+def test_empty_drawing():
+    output = io.StringIO()
+    SVGLayerWriter(svgwrite.Drawing(size=(10, 10))).save(output)
+    empty = io.StringIO()
+    svgwrite.Drawing(size=(10, 10)).write(empty)
+    assert output.getvalue() == empty.getvalue()
+
+
+def test_large_layers_spool_to_disk():
+    writer = layer_writer(2, spool_size=1024)
+    spools = dict(writer._layers)
+    assert all(spool._rolled for spool in spools.values())
+    output = io.StringIO()
+    writer.save(output)
+    assert output.getvalue() == expected_svg(2)
+
+    small = layer_writer(2)
+    assert not any(spool._rolled for spool in small._layers.values())
+    small.close()
+
+
+def test_save_to_path(tmp_path):
+    path = str(tmp_path / "plot.svg")
+    layer_writer(3, spool_size=1024).save(path)
+    with io.open(path, encoding="utf-8") as f:
+        assert f.read() == expected_svg(3)
+
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    """Directory of temporary files, so that spools left behind can be found"""
+    path = tmp_path / "spools"
+    path.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(path))
+    return str(path)
+
+
+def test_spools_are_released_after_save(spool_dir):
+    writer = layer_writer(4, spool_size=1024)
+    spools = list(writer._layers.values())
+    files = [spool._file for spool in spools]
+    writer.save(io.StringIO())
+    assert writer._layers == {}
+    assert all(spool.closed for spool in spools)
+    assert all(f.closed for f in files)
+    assert os.listdir(spool_dir) == []
+
+
+@pytest.mark.parametrize("writes", [0, 3])
+def test_spools_are_released_after_failed_save(spool_dir, writes):
+    writer = layer_writer(5, spool_size=1024)
+    files = [spool._file for spool in writer._layers.values()]
+    with pytest.raises(IOError, match="Disk full"):
+        writer.save(FailingOutput(writes))
+    assert writer._layers == {}
+    assert all(f.closed for f in files)
+    assert os.listdir(spool_dir) == []
+
+
+def test_spools_are_released_when_output_cannot_be_opened(tmp_path):
+    writer = layer_writer(6, spool_size=1024)
+    files = [spool._file for spool in writer._layers.values()]
+    with pytest.raises(IOError):
+        writer.save(str(tmp_path / "missing" / "plot.svg"))
+    assert all(f.closed for f in files)
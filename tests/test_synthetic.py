@@ -0,0 +1,59 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import io
+import pytest
+from genoplot.compact import CompactPedigree
+from genoplot.gedcomdate import parse_date
+from genoplot.synthetic import MAX_YEAR, SyntheticPedigree
+
+
+@pytest.mark.parametrize("seed", list(range(60)))
+def test_branches_reach_requested_size(seed):
+    assert len(SyntheticPedigree(individuals=500, seed=seed)) == 500
+
+
+@pytest.mark.parametrize("seed", [4, 50, 52])
+def test_sparse_branches_reach_requested_size(seed):
+    pedigree = SyntheticPedigree(individuals=1000, branches=4, fanout=1, marriage_rate=0.2, seed=seed)
+    assert len(pedigree) == 1000
+
+
+def test_depth_limits_generations():
+    pedigree = SyntheticPedigree(individuals=1000, depth=2, seed=1)
+    assert len(pedigree) < 1000
+    # Founders, two generations of children and their spouses
+    assert all(person[3] <= 1700 + 2*40 + 5 for person in pedigree._individuals)
+
+
+def test_deep_pedigree_has_valid_birth_dates():
+    pedigree = SyntheticPedigree(individuals=2000, depth=500, fanout=1, marriage_rate=0, seed=1)
+    assert pedigree.family_count() == 501
+    assert max(person[3] for person in pedigree._individuals) == MAX_YEAR
+    output = io.StringIO()
+    pedigree.write(output)
+    dates = [line[7:] for line in output.getvalue().split("\n") if line.startswith("2 DATE ")]
+    assert len(dates) == len(pedigree)
+    assert all(not parse_date(date).key is None for date in dates[-10:])
+
+
+def test_same_seed_writes_same_gedcom():
+    first, second = io.StringIO(), io.StringIO()
+    SyntheticPedigree(individuals=300, branches=2, seed=9).write(first)
+    SyntheticPedigree(individuals=300, branches=2, seed=9).write(second)
+    assert first.getvalue() == second.getvalue()
+
+
+def test_written_gedcom_has_all_individuals():
+    pedigree = SyntheticPedigree(individuals=300, branches=3, collapse_rate=0.2, seed=2)
+    output = io.StringIO()
+    pedigree.write(output)
+    output.seek(0)
+    store = CompactPedigree.from_gedcom(output)
+    assert len(store) == len(pedigree)
+    assert store.family_count() == pedigree.family_count()
@@ -0,0 +1,133 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import json, os, random
+import svgwrite
+from genoplot.genoplot import GenoPlot
+from genoplot.scene import Scene
+from genoplot.tiles import SVGTileWriter, element_bounds
+
+
+def read_tree(directory):
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, directory)] = f.read()
+    return files
+
+
+def test_element_bounds():
+    drawing = svgwrite.Drawing(size=(100, 100))
+    assert element_bounds(drawing.rect((10, 20), (30, 40))) == (10, 20, 40, 60)
+    assert element_bounds(drawing.ellipse((50, 50), (5, 10))) == (45, 40, 55, 60)
+    assert element_bounds(drawing.line((30, 5), (10, 25))) == (10, 5, 30, 25)
+    assert element_bounds(drawing.path(d="M 0 10 Q 20 -5 40 10")) == (0, -5, 40, 10)
+    assert element_bounds(drawing.path(d="M0 10 Q 20 -5, 40 10")) == (0, -5, 40, 10)
+    x1, y1, x2, y2 = element_bounds(drawing.text("abc", insert=(10, 50), style="font-size: 10px; text-anchor: middle"))
+    assert x1 < 10 < x2 and y1 < 50 < y2
+    assert element_bounds(drawing.g()) is None
+
+
+def test_levels():
+    for size, levels in ((100, 1), (512, 1), (513, 2), (2048, 3), (2049, 4)):
+        writer = SVGTileWriter(svgwrite.Drawing(size=(size, 10)), tile_size=512)
+        try:
+            assert writer.levels() == levels
+        finally:
+            writer.close()
+
+
+def random_writer(seed, workers=None):
+    rng = random.Random(seed)
+    drawing = svgwrite.Drawing(size=(3000, 2000))
+    writer = SVGTileWriter(drawing, tile_size=256, workers=workers)
+    for i in range(300):
+        x, y = rng.uniform(0, 2950), rng.uniform(0, 1950)
+        if i % 3 == 0:
+            writer.add("1:individuals", drawing.rect((x, y), (rng.uniform(0.5, 40), rng.uniform(0.5, 40))))
+        elif i % 3 == 1:
+            writer.add("0:connectors", drawing.line((x, y), (x + rng.uniform(-300, 300), y)))
+        else:
+            writer.add("2:labels", drawing.text("P{0}".format(i), insert=(x, y), style="font-size: 10px"))
+    writer.add("0:connectors", drawing.g())
+    return writer
+
+
+def test_tiles_hold_elements_which_intersect_them(tmp_path):
+    writer = random_writer(1)
+    bounds = [tuple(writer._bounds[i*4:i*4+4]) for i in range(len(writer))]
+    writer.save(str(tmp_path))
+    with open(str(tmp_path / "manifest.json")) as f:
+        manifest = json.load(f)
+    assert len(manifest["levels"]) == writer.levels()
+
+    top = manifest["levels"][-1]
+    span = writer.tile_size / top["scale"]
+    for c, r in top["tiles"]:
+        with open(str(tmp_path / str(top["level"]) / "{0}_{1}.svg".format(c, r))) as f:
+            tile = f.read()
+        expected = sum(1 for x1, y1, x2, y2 in bounds
+                       if x1 < (c + 1)*span and x2 >= c*span and y1 < (r + 1)*span and y2 >= r*span)
+        assert tile.count("<rect") + tile.count("<line") + tile.count("<text") + tile.count("<g") == expected
+        assert 'viewBox="{0} {1} '.format(c*span, r*span) in tile
+
+    # The group has no bounds and is drawn on every tile
+    for level in manifest["levels"]:
+        assert level["columns"]*level["rows"] == len(level["tiles"])
+
+
+def test_elements_are_written_in_layer_order(tmp_path):
+    writer = random_writer(2)
+    top = writer.levels() - 1
+    writer.save(str(tmp_path))
+    checked = 0
+    for name in os.listdir(str(tmp_path / str(top))):
+        with open(str(tmp_path / str(top) / name)) as f:
+            tile = f.read()
+        if "<line" in tile and "<rect" in tile and "<text" in tile:
+            assert tile.rindex("<line") < tile.index("<rect")
+            assert tile.rindex("<rect") < tile.index("<text")
+            checked += 1
+    assert checked > 0
+
+
+def test_small_elements_are_left_out_of_lower_levels(tmp_path):
+    drawing = svgwrite.Drawing(size=(4096, 4096))
+    writer = SVGTileWriter(drawing, tile_size=512, margin=0)
+    writer.add("1:individuals", drawing.rect((100, 100), (1, 1)))
+    writer.add("1:individuals", drawing.rect((200, 200), (100, 100)))
+    writer.save(str(tmp_path))
+    with open(str(tmp_path / "0" / "0_0.svg")) as f:
+        assert f.read().count("<rect") == 1
+    with open(str(tmp_path / "3" / "0_0.svg")) as f:
+        assert f.read().count("<rect") == 2
+
+
+def test_parallel_tiles_match_serial_tiles(tmp_path):
+    random_writer(3).save(str(tmp_path / "serial"))
+    random_writer(3, workers=2).save(str(tmp_path / "parallel"))
+    serial = read_tree(str(tmp_path / "serial"))
+    assert len(serial) > 10
+    assert read_tree(str(tmp_path / "parallel")) == serial
+
+
+def test_plot_tiles_from_scene(tmp_path):
+    scene = Scene(2000, 1200, symbol_size=20, font_size=10)
+    rng = random.Random(4)
+    for i in range(50):
+        x, y = rng.uniform(0, 1900), rng.uniform(0, 1100)
+        scene.add_individual(i + 1, x, y, rng.choice("MFU"), "#F2E6D2", [str(i + 1)], (6, 12))
+        scene.add_connector((x, y), (x + 50, y))
+    scene.add_duplicate("M", (10, 10), (1500, 900))
+    for workers, name in ((None, "serial"), (2, "parallel")):
+        GenoPlot("scene", None, output_file=str(tmp_path / name), scene=scene, tile_size=256, tile_workers=workers).draw()
+    serial = read_tree(str(tmp_path / "serial"))
+    assert "manifest.json" in serial
+    assert read_tree(str(tmp_path / "parallel")) == serial
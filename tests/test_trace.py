@@ -0,0 +1,167 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import io, json
+import networkx
+import pytest
+from genoplot import trace
+from genoplot.genoplot import GenoPlot
+from genoplot.pedigree import Pedigree
+from genoplot.scene import Scene
+from genoplot.synthetic import generate_gedcom
+
+requires_networkx1 = pytest.mark.skipif(not hasattr(networkx.DiGraph, "nodes_iter"), reason="Family graph layout uses the networkx 1.x API")
+
+
+@pytest.fixture(autouse=True)
+def no_tracer():
+    """Leaves tracing off after each test, even if it fails"""
+    yield
+    trace.stop()
+
+
+@pytest.fixture
+def gedcom_file(tmp_path):
+    path = str(tmp_path / "synthetic.ged")
+    generate_gedcom(path, individuals=150, branches=2, collapse_rate=0.2, seed=5)
+    return path
+
+
+def test_nested_spans():
+    tracer = trace.start()
+    with trace.span("outer", size=3):
+        with trace.span("first"):
+            pass
+        with trace.span("second", branch=1):
+            with trace.span("inner"):
+                pass
+    with trace.span("after"):
+        pass
+
+    assert [(s["name"], s["parent"]) for s in tracer.spans] == [
+        ("outer", None), ("first", 0), ("second", 0), ("inner", 2), ("after", None)]
+    assert tracer.spans[0]["attributes"] == {"size": 3}
+    assert tracer.spans[2]["attributes"] == {"branch": 1}
+    for record in tracer.spans:
+        assert record["end"] >= record["start"] >= 0
+        if not record["parent"] is None:
+            parent = tracer.spans[record["parent"]]
+            assert parent["start"] <= record["start"] and record["end"] <= parent["end"]
+    first, second = tracer.spans[1], tracer.spans[2]
+    assert first["end"] <= second["start"]
+    assert tracer.spans[0]["end"] <= tracer.spans[4]["start"]
+
+
+def test_span_ends_when_body_raises():
+    tracer = trace.start()
+    with pytest.raises(ValueError):
+        with trace.span("outer"):
+            with trace.span("failing"):
+                raise ValueError()
+    with trace.span("next"):
+        pass
+    assert all(not record["end"] is None for record in tracer.spans)
+    # Open spans are closed, so the next span has no parent
+    assert tracer.spans[2]["parent"] is None
+
+
+def test_counters():
+    tracer = trace.start()
+    trace.count("a")
+    trace.count("a", 4)
+    tracer.count("b", 2)
+    assert tracer.counters == {"a": 5, "b": 2}
+
+
+def test_tracing_off():
+    assert trace.tracer is None
+    assert trace.span("ignored", size=1) is trace._NO_SPAN
+    assert trace.span("other") is trace._NO_SPAN
+    with trace.span("ignored"):
+        trace.count("ignored")
+    assert trace.stop() is None
+
+
+def test_tracing_restores_previous_tracer():
+    with trace.tracing() as outer:
+        assert trace.tracer is outer
+        with trace.tracing() as inner:
+            assert trace.tracer is inner and not inner is outer
+            trace.count("inner")
+        assert trace.tracer is outer
+        trace.count("outer")
+    assert trace.tracer is None
+    assert (outer.counters, inner.counters) == ({"outer": 1}, {"inner": 1})
+
+    with pytest.raises(ValueError):
+        with trace.tracing():
+            raise ValueError()
+    assert trace.tracer is None
+
+
+def test_start_and_stop():
+    tracer = trace.start()
+    assert trace.tracer is tracer
+    assert trace.stop() is tracer
+    assert trace.tracer is None
+
+
+def test_save(tmp_path):
+    with trace.tracing() as tracer:
+        with trace.span("phase", elements=10):
+            trace.count("items", 3)
+    output = io.StringIO()
+    tracer.save(output)
+    data = json.loads(output.getvalue())
+    assert data["counters"] == {"items": 3}
+    span, = data["spans"]
+    assert (span["name"], span["parent"], span["attributes"]) == ("phase", None, {"elements": 10})
+    assert span["seconds"] == pytest.approx(span["end"] - span["start"])
+
+    path = str(tmp_path / "trace.json")
+    tracer.save(path)
+    with open(path) as f:
+        assert json.load(f) == data
+
+
+def test_individual_drawn_in_three_places_has_three_duplicate_links(gedcom_file):
+    pedigree = Pedigree("synthetic", gedcom_file, streaming=True)
+    individual = pedigree.individual(1)
+    positions = [(10, 20), (300, 20), (600, 120)]
+    for x, y in positions:
+        individual.set_coordinates(x, y)
+
+    plot = GenoPlot("scene", scene=Scene(1000, 500))
+    plot._draw_duplicate_person_link(individual)
+    links = list(plot.scene().duplicate_links())
+    assert len(links) == 3
+    assert sorted(tuple(sorted((start, end))) for sex, start, end in links) == [
+        (positions[0], positions[1]), (positions[0], positions[2]), (positions[1], positions[2])]
+    assert all(sex == individual.sex for sex, start, end in links)
+
+
+@requires_networkx1
+def test_plot_phases_and_counters(gedcom_file):
+    with trace.tracing() as tracer:
+        GenoPlot("synthetic", gedcom_file, output_file=io.StringIO(), streaming=True).draw()
+    names = [record["name"] for record in tracer.spans]
+    for name in ("GenoPlot.draw", "GenoPlot.scene", "Pedigree._setup", "FamilyGraph._create", "FamilyGraph._layout",
+                 "Branch.layout", "GenoPlot.render", "GenoPlot.write"):
+        assert name in names
+    parents = dict((record["name"], tracer.spans[record["parent"]]["name"])
+                   for record in tracer.spans if not record["parent"] is None)
+    assert parents["Branch.layout"] == "FamilyGraph._layout"
+    assert parents["GenoPlot.render"] == "GenoPlot.draw"
+    branches = tracer.spans[names.index("FamilyGraph._layout")]["attributes"]["branches"]
+    assert names.count("Branch.layout") == branches
+
+    counters = tracer.counters
+    assert counters["layout.apportion_calls"] > 0
+    assert counters["layout.apportion_iterations"] > 0
+    assert counters["layout.subtree_moves"] > 0
+    assert 0 < counters["connectors.tracks"] <= counters["connectors.routed"]
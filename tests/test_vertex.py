@@ -0,0 +1,31 @@
+# Copyright (c) 2017 by Welded Anvil Technologies (David D. Newell). All Rights Reserved.
+# This software is the confidential and proprietary information of
+# Welded Anvil Technologies (David D. Newell) ("Confidential Information").
+# You shall not disclose such Confidential Information and shall use it
+# only in accordance with the terms of the license agreement you entered
+# into with Welded Anvil Technologies (David D. Newell).
+# @author david@newell.at
+
+import pytest
+from genoplot.vertex import FAMILY_TAG, family_vertex, individual_vertex, is_family_vertex, element_id, vertex_name
+
+
+@pytest.mark.parametrize("eid", [0, 1, 12, 2**40 + 3])
+def test_vertex_ids_round_trip(eid):
+    assert is_family_vertex(family_vertex(eid))
+    assert not is_family_vertex(individual_vertex(eid))
+    assert element_id(family_vertex(eid)) == eid
+    assert element_id(individual_vertex(eid)) == eid
+    assert family_vertex(eid) & FAMILY_TAG and not individual_vertex(eid) & FAMILY_TAG
+
+
+def test_families_and_individuals_with_same_id_are_distinct():
+    vertices = set(family_vertex(eid) for eid in range(100)) | set(individual_vertex(eid) for eid in range(100))
+    assert len(vertices) == 200
+
+
+def test_documented_values_and_names():
+    assert family_vertex(12) == 25
+    assert individual_vertex(12) == 24
+    assert vertex_name(25) == "F12"
+    assert vertex_name(24) == "P12"